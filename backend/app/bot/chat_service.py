@@ -0,0 +1,163 @@
+import asyncio
+from typing import List, Optional
+
+from app.bot.intencoes import detectar_intencao, VENCIMENTOS, ESTOQUE_PRODUTO, RESUMO_ESTOQUE
+from app.bot.sessao import ContextoSessao, SessaoStore
+from app.configs.config import settings
+from app.models.base_conhecimento import ConhecimentoMatch
+from app.models.bot import RespostaBot
+
+MENSAGEM_SEM_RESPOSTA = (
+    "Nenhuma resposta relevante encontrada. Tente reformular sua pergunta "
+    "ou escolha uma das opções sugeridas."
+)
+
+class ChatBot:
+    """
+    Assistente virtual: responde pela base de conhecimento e, para perguntas sobre dados
+    ("quais lotes vencem esta semana?"), consulta produtos e dashboard em paralelo.
+
+    As consultas ao MongoDB (síncronas) rodam no threadpool via `asyncio.to_thread`,
+    então várias sessões compartilham o mesmo event loop sem uma thread por sessão.
+    """
+
+    def __init__(self, services):
+        self.services = services
+
+    async def responder(self, contexto: ContextoSessao, mensagem: str) -> RespostaBot:
+        contexto.mensagens.append(mensagem)
+        intencao, parametros = detectar_intencao(mensagem)
+
+        # Perguntas de continuação ("e no próximo mês?") reaproveitam a última intenção
+        if intencao is None and contexto.ultima_intencao == VENCIMENTOS and parametros["periodo_dias"] is not None:
+            intencao = VENCIMENTOS
+        elif intencao is None and contexto.ultima_intencao == ESTOQUE_PRODUTO and parametros["codigo_lm"] is not None:
+            intencao = ESTOQUE_PRODUTO
+
+        if intencao == VENCIMENTOS:
+            resposta = await self._responder_vencimentos(contexto, mensagem, parametros["periodo_dias"])
+        elif intencao == ESTOQUE_PRODUTO:
+            resposta = await self._responder_estoque_produto(contexto, mensagem, parametros["codigo_lm"])
+        elif intencao == RESUMO_ESTOQUE:
+            resposta = await self._responder_resumo(contexto, mensagem)
+        else:
+            return await self._responder_conhecimento(contexto, mensagem)
+
+        contexto.ultima_intencao = intencao
+        return resposta
+
+    def _buscar_relacionados(self, mensagem: str) -> List[ConhecimentoMatch]:
+        return self.services.base_conhecimento_service.buscar_resposta(mensagem, max_resultados=3)
+
+    @staticmethod
+    def _titulos(relacionados: List[ConhecimentoMatch]) -> List[str]:
+        return [r.conhecimento.titulo for r in relacionados]
+
+    async def _responder_conhecimento(self, contexto: ContextoSessao, mensagem: str) -> RespostaBot:
+        resultado: Optional[ConhecimentoMatch] = await asyncio.to_thread(
+            self.services.base_conhecimento_service.get_melhor_resposta, mensagem
+        )
+
+        if not resultado:
+            return RespostaBot(sessao_id=contexto.sessao_id, tipo="sem_resposta", texto=MENSAGEM_SEM_RESPOSTA)
+
+        return RespostaBot(
+            sessao_id=contexto.sessao_id,
+            tipo="conhecimento",
+            texto=resultado.conhecimento.resposta,
+            dados=resultado.conhecimento.model_dump(),
+            score=resultado.score
+        )
+
+    async def _responder_vencimentos(self, contexto: ContextoSessao, mensagem: str, dias: Optional[int]) -> RespostaBot:
+        dias = dias if dias is not None else (contexto.ultimo_periodo_dias or 7)
+        contexto.ultimo_periodo_dias = dias
+
+        vencendo, relacionados = await asyncio.gather(
+            asyncio.to_thread(self.services.dashboard_service.get_lotes_vencendo, dias),
+            asyncio.to_thread(self._buscar_relacionados, mensagem)
+        )
+        lotes = vencendo["items"]
+        periodo = "hoje" if dias <= 0 else f"nos próximos {dias} dias"
+
+        if not lotes:
+            texto = f"Nenhum lote ativo vence {periodo}."
+        else:
+            linhas = [
+                f"- {l.nome_produto} (LM {l.codigo_lm}, lote {l.numero_lote}): vence em {l.data_validade}"
+                for l in lotes[:5]
+            ]
+            texto = f"{vencendo['total']} lote(s) vencem {periodo}:\n" + "\n".join(linhas)
+
+        return RespostaBot(
+            sessao_id=contexto.sessao_id,
+            tipo="dados",
+            texto=texto,
+            dados=[l.model_dump() for l in lotes],
+            sugestoes=self._titulos(relacionados)
+        )
+
+    async def _responder_estoque_produto(self, contexto: ContextoSessao, mensagem: str, codigo_lm: int) -> RespostaBot:
+        contexto.ultimo_codigo_lm = codigo_lm
+
+        produto, status_lotes = await asyncio.gather(
+            asyncio.to_thread(self.services.produto_service.get_by_codigo_lm, codigo_lm),
+            asyncio.to_thread(self.services.dashboard_service.get_products_lote_status, [codigo_lm])
+        )
+
+        if not produto:
+            return RespostaBot(
+                sessao_id=contexto.sessao_id,
+                tipo="dados",
+                texto=f"Produto com código LM {codigo_lm} não encontrado."
+            )
+
+        distribuicao = status_lotes[0] if status_lotes else None
+        texto = (
+            f"{produto.nome_produto} (LM {produto.codigo_lm}): estoque calculado {produto.estoque_calculado}, "
+            f"reportado {produto.estoque_reportado if produto.estoque_reportado is not None else '-'}."
+        )
+        if distribuicao:
+            texto += (
+                f" Unidades vencendo em até 30 dias: {distribuicao.em_30_dias}; "
+                f"31-60 dias: {distribuicao.em_60_dias}; 61-90 dias: {distribuicao.em_90_dias}."
+            )
+
+        return RespostaBot(
+            sessao_id=contexto.sessao_id,
+            tipo="dados",
+            texto=texto,
+            dados={
+                "codigo_lm": produto.codigo_lm,
+                "nome_produto": produto.nome_produto,
+                "estoque_calculado": produto.estoque_calculado,
+                "estoque_reportado": produto.estoque_reportado,
+                "distribuicao": distribuicao.model_dump() if distribuicao else None
+            }
+        )
+
+    async def _responder_resumo(self, contexto: ContextoSessao, mensagem: str) -> RespostaBot:
+        kpis, relacionados = await asyncio.gather(
+            asyncio.to_thread(self.services.kpis_compartilhados.get_dashboard_kpis),
+            asyncio.to_thread(self._buscar_relacionados, mensagem)
+        )
+
+        risco = kpis.valor_em_risco
+        texto = (
+            f"Valor total em estoque: R$ {kpis.valor_total_estoque:,.2f}. "
+            f"Valor em risco: R$ {risco.dias_0_30:,.2f} (0-30 dias), R$ {risco.dias_31_60:,.2f} (31-60 dias), "
+            f"R$ {risco.dias_61_90:,.2f} (61-90 dias). Perdas: R$ {kpis.valor_total_perdido:,.2f}."
+        )
+
+        return RespostaBot(
+            sessao_id=contexto.sessao_id,
+            tipo="dados",
+            texto=texto,
+            dados=kpis.model_dump(),
+            sugestoes=self._titulos(relacionados)
+        )
+
+sessoes = SessaoStore(
+    max_sessoes=settings.BOT_SESSOES_MAX,
+    ttl_segundos=settings.BOT_SESSAO_TTL_MINUTOS * 60
+)
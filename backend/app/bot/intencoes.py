@@ -0,0 +1,57 @@
+import re
+from typing import Optional, Tuple
+from app.services.busca_bm25 import normalizar_texto
+
+VENCIMENTOS = "vencimentos"
+ESTOQUE_PRODUTO = "estoque_produto"
+RESUMO_ESTOQUE = "resumo_estoque"
+
+PERIODOS = {
+    "hoje": 0,
+    "amanha": 1,
+    "semana": 7,
+    "quinzena": 15,
+    "mes": 30,
+    "trimestre": 90,
+}
+
+PALAVRAS_VENCIMENTO = {"vence", "vencem", "vencer", "vencendo", "vencimento", "vencimentos", "vencidos"}
+PALAVRAS_CONSULTA = {"quais", "quantos", "quantas", "quanto", "lista", "listar", "mostre", "mostrar", "ver"}
+PALAVRAS_RESUMO = {"resumo", "risco", "perdas", "perdido", "kpis", "indicadores"}
+
+def extrair_periodo_dias(texto_normalizado: str) -> Optional[int]:
+    """Extrai um período em dias ("7 dias", "esta semana", "proximo mes")."""
+    numero = re.search(r"\b(\d{1,3})\s*dias?\b", texto_normalizado)
+    if numero:
+        return int(numero.group(1))
+    for palavra, dias in PERIODOS.items():
+        if re.search(rf"\b{palavra}\b", texto_normalizado):
+            return dias
+    return None
+
+def extrair_codigo_lm(texto_normalizado: str) -> Optional[int]:
+    codigo = re.search(r"\b(\d{5,8})\b", texto_normalizado)
+    return int(codigo.group(1)) if codigo else None
+
+def detectar_intencao(mensagem: str) -> Tuple[Optional[str], dict]:
+    """
+    Identifica perguntas sobre dados do estoque.
+
+    Returns:
+        (intenção ou None, parâmetros extraídos da mensagem)
+    """
+    texto = normalizar_texto(mensagem)
+    palavras = set(texto.split())
+    parametros = {
+        "periodo_dias": extrair_periodo_dias(texto),
+        "codigo_lm": extrair_codigo_lm(texto),
+    }
+
+    if palavras & PALAVRAS_VENCIMENTO and (palavras & PALAVRAS_CONSULTA or parametros["periodo_dias"] is not None):
+        return VENCIMENTOS, parametros
+    if "estoque" in palavras and parametros["codigo_lm"] is not None:
+        return ESTOQUE_PRODUTO, parametros
+    if palavras & PALAVRAS_RESUMO and ("estoque" in palavras or palavras & PALAVRAS_CONSULTA):
+        return RESUMO_ESTOQUE, parametros
+
+    return None, parametros
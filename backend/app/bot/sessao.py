@@ -0,0 +1,53 @@
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Optional
+
+class ContextoSessao:
+    """Contexto leve de uma sessão de chat (últimas mensagens e última intenção de dados)."""
+
+    def __init__(self, sessao_id: str, max_mensagens: int = 10):
+        self.sessao_id = sessao_id
+        self.mensagens: Deque[str] = deque(maxlen=max_mensagens)
+        self.ultima_intencao: Optional[str] = None
+        self.ultimo_periodo_dias: Optional[int] = None
+        self.ultimo_codigo_lm: Optional[int] = None
+        self.ultimo_acesso = time.monotonic()
+
+class SessaoStore:
+    """
+    Armazena contextos de sessão em memória, com limite de tamanho (LRU) e expiração por TTL.
+
+    Usado apenas a partir do event loop, portanto não precisa de lock.
+    """
+
+    def __init__(self, max_sessoes: int, ttl_segundos: float):
+        self.max_sessoes = max_sessoes
+        self.ttl_segundos = ttl_segundos
+        self._sessoes: "OrderedDict[str, ContextoSessao]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessoes)
+
+    def _remover_expiradas(self, agora: float):
+        while self._sessoes:
+            sessao_id, contexto = next(iter(self._sessoes.items()))
+            if agora - contexto.ultimo_acesso < self.ttl_segundos:
+                break
+            del self._sessoes[sessao_id]
+
+    def obter(self, sessao_id: Optional[str] = None) -> ContextoSessao:
+        """Retorna o contexto da sessão (criando um novo se não existir ou tiver expirado)."""
+        agora = time.monotonic()
+        self._remover_expiradas(agora)
+
+        contexto = self._sessoes.get(sessao_id) if sessao_id else None
+        if contexto is None:
+            contexto = ContextoSessao(sessao_id or uuid.uuid4().hex)
+            self._sessoes[contexto.sessao_id] = contexto
+            while len(self._sessoes) > self.max_sessoes:
+                self._sessoes.popitem(last=False)
+
+        contexto.ultimo_acesso = agora
+        self._sessoes.move_to_end(contexto.sessao_id)
+        return contexto
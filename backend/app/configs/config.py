@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,5 +13,31 @@ class Settings:
     PROCESSED_FOLDER: str = os.getenv("PROCESSED_FOLDER", os.path.join(BASE_IMPORT_PATH, "processed"))
     ERROR_FOLDER: str = os.getenv("ERROR_FOLDER", os.path.join(BASE_IMPORT_PATH, "errors"))
     PROCESSING_FOLDER: str = os.getenv("PROCESSING_FOLDER", os.path.join(BASE_IMPORT_PATH, "processing"))
+    HISTORICO_INTERVALO_MINUTOS: int = int(os.getenv("HISTORICO_INTERVALO_MINUTOS") or 60)
+    ALERTAS_INTERVALO_MINUTOS: int = int(os.getenv("ALERTAS_INTERVALO_MINUTOS") or 15)
+    BOT_SESSOES_MAX: int = int(os.getenv("BOT_SESSOES_MAX") or 1000)
+    BOT_SESSAO_TTL_MINUTOS: int = int(os.getenv("BOT_SESSAO_TTL_MINUTOS") or 30)
+    VISUALIZACOES_FLUSH_SEGUNDOS: float = float(os.getenv("VISUALIZACOES_FLUSH_SEGUNDOS") or 10)
+    CACHE_RESPOSTAS_TAMANHO: int = int(os.getenv("CACHE_RESPOSTAS_TAMANHO") or 256)
+    DASHBOARD_STREAM_DEBOUNCE_SEGUNDOS: float = float(os.getenv("DASHBOARD_STREAM_DEBOUNCE_SEGUNDOS") or 2)
+    DASHBOARD_STREAM_FALLBACK_SEGUNDOS: float = float(os.getenv("DASHBOARD_STREAM_FALLBACK_SEGUNDOS") or 30)
+    ARQUIVAMENTO_IDADE_DIAS: int = int(os.getenv("ARQUIVAMENTO_IDADE_DIAS") or 90)
+    ARQUIVAMENTO_INTERVALO_MINUTOS: int = int(os.getenv("ARQUIVAMENTO_INTERVALO_MINUTOS") or 360)
+    CACHE_COMPARTILHADO_DIR: str = os.getenv("CACHE_COMPARTILHADO_DIR") or os.path.join(tempfile.gettempdir(), "sgep-cache")
+    KPIS_CACHE_SEGUNDOS: float = float(os.getenv("KPIS_CACHE_SEGUNDOS") or 30)
+    KPIS_SECOES_CACHE_SEGUNDOS: float = float(os.getenv("KPIS_SECOES_CACHE_SEGUNDOS") or 300)
+    CACHE_FACETAS_TTL_SEGUNDOS: float = float(os.getenv("CACHE_FACETAS_TTL_SEGUNDOS") or 300)
+    PROFILER_CONSULTAS_ATIVO: bool = (os.getenv("PROFILER_CONSULTAS_ATIVO") or "false").lower() in ("1", "true", "sim")
+    PROFILER_LIMITE_MS: float = float(os.getenv("PROFILER_LIMITE_MS") or 100)
+    PROFILER_AMOSTRAGEM: float = float(os.getenv("PROFILER_AMOSTRAGEM") or 1.0)
+    PROFILER_MAX_ENTRADAS: int = int(os.getenv("PROFILER_MAX_ENTRADAS") or 200)
+    DEBUG_TOKEN: str = os.getenv("DEBUG_TOKEN")
+    READ_PREFERENCE_DASHBOARD: str = os.getenv("READ_PREFERENCE_DASHBOARD") or "secondaryPreferred"
+    READ_PREFERENCE_HISTORICO: str = os.getenv("READ_PREFERENCE_HISTORICO") or "secondaryPreferred"
+    READ_PREFERENCE_RELATORIOS: str = os.getenv("READ_PREFERENCE_RELATORIOS") or "secondaryPreferred"
+    READ_MAX_STALENESS_SEGUNDOS: int = int(os.getenv("READ_MAX_STALENESS_SEGUNDOS") or 90)
+    ANALISE_COLUNAR_ATIVA: bool = (os.getenv("ANALISE_COLUNAR_ATIVA") or "false").lower() in ("1", "true", "sim")
+    ANALISE_COLUNAR_INTERVALO_SEGUNDOS: float = float(os.getenv("ANALISE_COLUNAR_INTERVALO_SEGUNDOS") or 30)
+    ANALISE_COLUNAR_RECONSTRUCAO_MINUTOS: int = int(os.getenv("ANALISE_COLUNAR_RECONSTRUCAO_MINUTOS") or 60)
 
 settings = Settings()
\ No newline at end of file
@@ -1,28 +1,94 @@
+import os
+import threading
 from pymongo import MongoClient
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 from app.configs.config import settings
+from app.database.metricas_consultas import metricas_consultas
 from typing import Optional
 
 client: Optional[MongoClient] = None
 db = None
+_bancos_por_perfil: dict = {}
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+MODOS_LEITURA = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Perfis de leitura dos serviços analíticos; CRUD e escritas usam o banco padrão (primário)
+PERFIS_LEITURA = {
+    "dashboard": settings.READ_PREFERENCE_DASHBOARD,
+    "historico": settings.READ_PREFERENCE_HISTORICO,
+    "relatorios": settings.READ_PREFERENCE_RELATORIOS,
+}
+
+def _read_preference(modo: str):
+    if modo not in MODOS_LEITURA:
+        raise ValueError(f"Read preference inválida: '{modo}'. Use uma de: {', '.join(MODOS_LEITURA)}.")
+    if modo == "primary":
+        return Primary()
+    return MODOS_LEITURA[modo](max_staleness=settings.READ_MAX_STALENESS_SEGUNDOS)
 
 def connect_to_mongo():
-    """Estabelece a conexão com o MongoDB."""
-    global client, db
+    """Estabelece a conexão com o MongoDB (um cliente por processo)."""
+    global client, db, _bancos_por_perfil, _pid
     try:
-        client = MongoClient(settings.DB_URI)
-        client.admin.command('ping') 
+        event_listeners = [metricas_consultas]
+        if settings.PROFILER_CONSULTAS_ATIVO:
+            from app.database.profiler_consultas import profiler_consultas
+            event_listeners.append(profiler_consultas)
+        client = MongoClient(settings.DB_URI, event_listeners=event_listeners)
+        client.admin.command('ping')
+        _bancos_por_perfil = {
+            perfil: client.get_database(settings.DB_NAME, read_preference=_read_preference(modo))
+            for perfil, modo in PERFIS_LEITURA.items()
+        }
         db = client[settings.DB_NAME]
-        print(f"MongoDB conectado com sucesso ao banco: {settings.DB_NAME}")
+        _pid = os.getpid()
+        print(f"MongoDB conectado com sucesso ao banco: {settings.DB_NAME} (pid {_pid})")
     except Exception as e:
         print(f"ERRO DE CONEXÃO COM MONGODB: {e}")
 
 def close_mongo_connection():
     """Fecha a conexão com o MongoDB."""
     global client
-    if client:
+    if client and _pid == os.getpid():
         client.close()
         print("MongoDB desconectado.")
 
-def get_database():
-    """Retorna a instância do banco de dados (db)."""
-    return db
\ No newline at end of file
+def _descartar_conexao_herdada():
+    """
+    Executado no processo filho após um fork (ex.: gunicorn com `--preload`).
+
+    O MongoClient não é fork-safe: o cliente herdado do processo pai é descartado
+    (sem fechar, pois os sockets ainda pertencem ao pai) e um novo é criado sob demanda.
+    """
+    global client, db, _bancos_por_perfil, _lock
+    client = None
+    db = None
+    _bancos_por_perfil = {}
+    _lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_descartar_conexao_herdada)
+
+def get_database(perfil: Optional[str] = None):
+    """
+    Retorna a instância do banco de dados (db), reconectando se o processo foi criado por fork.
+
+    Args:
+        perfil: Perfil de leitura ("dashboard", "historico" ou "relatorios"); o banco retornado
+            usa a read preference configurada para o perfil. Sem perfil, todas as operações vão ao primário.
+    """
+    if _pid is not None and _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                connect_to_mongo()
+    if perfil is None or db is None:
+        return db
+    return _bancos_por_perfil[perfil]
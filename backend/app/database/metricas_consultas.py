@@ -0,0 +1,83 @@
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from pymongo import monitoring
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+DATABASE_DIR = str(Path(__file__).resolve().parent)
+
+COMANDOS_CONTABILIZADOS = {"find", "aggregate", "count", "distinct", "insert", "update", "delete", "findAndModify"}
+
+def metodo_origem() -> str:
+    """Primeiro método da aplicação (fora de `app/database`) na pilha da thread que emitiu a consulta."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if arquivo.startswith(APP_DIR) and not arquivo.startswith(DATABASE_DIR):
+            instancia = frame.f_locals.get("self")
+            dono = type(instancia).__name__ if instancia is not None else Path(arquivo).stem
+            return f"{dono}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "desconhecido"
+
+def _tipo_servidor(endereco) -> str:
+    """Papel do servidor no replica set segundo a topologia conhecida pelo cliente (RSPrimary, RSSecondary...)."""
+    from app.database import client as cliente_mongo
+
+    if cliente_mongo.client is None:
+        return "Unknown"
+    descricao = cliente_mongo.client.topology_description.server_descriptions().get(endereco)
+    return descricao.server_type_name if descricao is not None else "Unknown"
+
+class MetricasConsultas(monitoring.CommandListener):
+    """
+    Contagem, por worker, de onde cada comando foi executado (primário, secundário ou
+    standalone) e de qual serviço partiu, para conferir o roteamento das read preferences.
+    """
+
+    def __init__(self):
+        self._por_servidor: Counter = Counter()
+        self._por_origem: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name not in COMANDOS_CONTABILIZADOS:
+            return
+        servidor = f"{event.connection_id[0]}:{event.connection_id[1]}"
+        tipo = _tipo_servidor(event.connection_id)
+        servico = metodo_origem().split(".")[0]
+        with self._lock:
+            self._por_servidor[(servidor, tipo)] += 1
+            self._por_origem[(servico, tipo)] += 1
+
+    def failed(self, event):
+        pass
+
+    def resumo(self) -> dict:
+        with self._lock:
+            por_servidor = dict(self._por_servidor)
+            por_origem = dict(self._por_origem)
+
+        origens = {}
+        for (servico, tipo), quantidade in por_origem.items():
+            origens.setdefault(servico, {})[tipo] = quantidade
+
+        return {
+            "por_servidor": [
+                {"servidor": servidor, "tipo": tipo, "comandos": quantidade}
+                for (servidor, tipo), quantidade in sorted(por_servidor.items())
+            ],
+            "por_origem": origens
+        }
+
+    def limpar(self):
+        with self._lock:
+            self._por_servidor.clear()
+            self._por_origem.clear()
+
+metricas_consultas = MetricasConsultas()
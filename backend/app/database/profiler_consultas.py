@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import Primary, Secondary
+
+from app.configs.config import settings
+from app.database.metricas_consultas import _tipo_servidor, metodo_origem
+
+COMANDOS_PERFILADOS = {"find", "aggregate", "count", "distinct"}
+
+# Campos de sessão/roteamento que o driver adiciona e que não podem ir para o `explain`
+CAMPOS_DRIVER = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "signature", "$readConcern"}
+
+# Examinados por retornado acima disto (e com volume relevante) indica índice ausente ou pouco seletivo
+RAZAO_EXAMINADOS_ALERTA = 100
+MINIMO_EXAMINADOS_ALERTA = 1000
+
+# Uma mesma consulta (método + comando + coleção) só é explicada de novo após este intervalo
+REEXPLICAR_APOS_SEGUNDOS = 300
+
+def analisar_explain(explain: dict) -> dict:
+    """
+    Extrai do resultado de `explain` os estágios do plano vencedor, os totais examinados
+    e os alertas: COLLSCAN, ordenação em memória e razão examinados/retornados alta.
+    """
+    estagios = set()
+    estatisticas = {"docs_examinados": 0, "chaves_examinadas": 0, "retornados": None}
+    ordenacao_pipeline = False
+
+    def visitar(no):
+        nonlocal ordenacao_pipeline
+        if isinstance(no, list):
+            for item in no:
+                visitar(item)
+            return
+        if not isinstance(no, dict):
+            return
+        if "stage" in no:
+            estagios.add(no["stage"])
+        if "$sort" in no:
+            ordenacao_pipeline = True
+        if "totalDocsExamined" in no:
+            estatisticas["docs_examinados"] += no.get("totalDocsExamined", 0)
+            estatisticas["chaves_examinadas"] += no.get("totalKeysExamined", 0)
+            if estatisticas["retornados"] is None:
+                estatisticas["retornados"] = no.get("nReturned", 0)
+        for chave, valor in no.items():
+            # Planos rejeitados e o eco do comando não descrevem o que foi executado
+            if chave not in ("rejectedPlans", "allPlansExecution", "command", "originalCommand"):
+                visitar(valor)
+
+    visitar(explain)
+
+    alertas = []
+    if "COLLSCAN" in estagios:
+        alertas.append("COLLSCAN")
+    if "SORT" in estagios or ordenacao_pipeline:
+        alertas.append("SORT_EM_MEMORIA")
+
+    examinados = max(estatisticas["docs_examinados"], estatisticas["chaves_examinadas"])
+    razao = examinados / max(estatisticas["retornados"] or 0, 1)
+    estatisticas["razao_examinados_retornados"] = round(razao, 1)
+    if examinados >= MINIMO_EXAMINADOS_ALERTA and razao > RAZAO_EXAMINADOS_ALERTA:
+        alertas.append("RAZAO_EXAMINADOS_ALTA")
+
+    estatisticas["estagios"] = sorted(estagios)
+    return {"alertas": alertas, "estatisticas": estatisticas}
+
+class ProfilerConsultas(monitoring.CommandListener):
+    """
+    Profiler opcional de consultas lentas (PROFILER_CONSULTAS_ATIVO).
+
+    Registrado como listener de comandos do MongoClient: consultas acima de
+    `PROFILER_LIMITE_MS` são amostradas, marcadas com o método do serviço que as emitiu e
+    explicadas (`executionStats`) em uma thread separada, para não somar latência à requisição.
+    O `explain` segue o papel do servidor que executou a consulta: consultas roteadas para
+    secundários são explicadas em um secundário, sem devolver a carga ao primário.
+    As entradas ficam em memória, por worker, limitadas a `PROFILER_MAX_ENTRADAS`.
+    """
+
+    def __init__(self, limite_ms: float, amostragem: float, max_entradas: int):
+        self.limite_ms = limite_ms
+        self.amostragem = amostragem
+        self.max_entradas = max_entradas
+        self._comandos: dict = {}
+        self._entradas: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def started(self, event):
+        if event.command_name in COMANDOS_PERFILADOS:
+            self._comandos[event.request_id] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        origem = self._comandos.pop(event.request_id, None)
+        if origem is None:
+            return
+        duracao_ms = event.duration_micros / 1000
+        if duracao_ms < self.limite_ms or random.random() > self.amostragem:
+            return
+        self._registrar(origem, event.command_name, duracao_ms, metodo_origem(), _tipo_servidor(event.connection_id))
+
+    def failed(self, event):
+        self._comandos.pop(event.request_id, None)
+
+    def _registrar(self, origem: tuple, comando: str, duracao_ms: float, metodo: str, tipo_servidor: str):
+        banco, documento = origem
+        colecao = documento.get(comando)
+        chave = (metodo, comando, colecao)
+        agora = time.time()
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                entrada = {
+                    "metodo": metodo,
+                    "comando": comando,
+                    "colecao": colecao,
+                    "ocorrencias": 0,
+                    "duracao_max_ms": 0.0,
+                    "explicado_em": None
+                }
+                self._entradas[chave] = entrada
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+            else:
+                self._entradas.move_to_end(chave)
+
+            entrada["ocorrencias"] += 1
+            entrada["tipo_servidor"] = tipo_servidor
+            entrada["ultima_duracao_ms"] = round(duracao_ms, 1)
+            entrada["duracao_max_ms"] = round(max(entrada["duracao_max_ms"], duracao_ms), 1)
+            entrada["ultima_ocorrencia"] = datetime.now(timezone.utc).isoformat()
+
+            reexplicar = entrada["explicado_em"] is None or agora - entrada["explicado_em"] > REEXPLICAR_APOS_SEGUNDOS
+            if reexplicar:
+                entrada["explicado_em"] = agora
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler-consultas")
+
+        if reexplicar:
+            comando_explain = {campo: valor for campo, valor in documento.items() if campo not in CAMPOS_DRIVER}
+            self._executor.submit(self._explicar, chave, banco, comando_explain, tipo_servidor)
+
+    def _explicar(self, chave: tuple, banco: str, comando: dict, tipo_servidor: str):
+        from app.database.client import get_database
+
+        db = get_database()
+        if db is None:
+            return
+        if tipo_servidor == "RSSecondary":
+            read_preference = Secondary(max_staleness=settings.READ_MAX_STALENESS_SEGUNDOS)
+        else:
+            read_preference = Primary()
+        try:
+            try:
+                explain = db.client[banco].command(
+                    {"explain": comando, "verbosity": "executionStats"}, read_preference=read_preference
+                )
+            except PyMongoError:
+                # Pipelines com $out/$merge não aceitam executionStats
+                explain = db.client[banco].command(
+                    {"explain": comando, "verbosity": "queryPlanner"}, read_preference=read_preference
+                )
+            analise = analisar_explain(explain)
+        except PyMongoError as e:
+            analise = {"alertas": [], "estatisticas": {}, "erro": str(e)}
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                entrada.update(analise)
+                entrada["consulta"] = {
+                    campo: comando[campo]
+                    for campo in ("filter", "pipeline", "sort", "query", "key")
+                    if campo in comando
+                }
+
+    def listar(self, apenas_alertas: bool = False) -> list:
+        with self._lock:
+            entradas = [dict(entrada) for entrada in reversed(self._entradas.values())]
+        if apenas_alertas:
+            entradas = [entrada for entrada in entradas if entrada.get("alertas")]
+        for entrada in entradas:
+            entrada.pop("explicado_em", None)
+        return entradas
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+profiler_consultas = ProfilerConsultas(
+    settings.PROFILER_LIMITE_MS,
+    settings.PROFILER_AMOSTRAGEM,
+    settings.PROFILER_MAX_ENTRADAS
+)
@@ -0,0 +1,33 @@
+import asyncio
+from typing import Callable, List
+
+from app.services.cache_compartilhado import cache_compartilhado
+
+async def executar_periodicamente(nome: str, intervalo_segundos: float, tarefa: Callable[[], object]):
+    """Executa uma tarefa síncrona em loop, numa thread separada, a cada intervalo."""
+    while True:
+        try:
+            await asyncio.to_thread(tarefa)
+        except Exception as e:
+            print(f"Erro na tarefa agendada '{nome}': {e}")
+        await asyncio.sleep(intervalo_segundos)
+
+def agendar(nome: str, intervalo_segundos: float, tarefa: Callable[[], object]) -> asyncio.Task:
+    """Agenda uma tarefa periódica no event loop atual."""
+    return asyncio.create_task(executar_periodicamente(nome, intervalo_segundos, tarefa), name=nome)
+
+def agendar_no_lider(nome: str, intervalo_segundos: float, tarefa: Callable[[], object]) -> asyncio.Task:
+    """
+    Agenda uma tarefa periódica que só executa no worker líder do host, para que
+    agregações e varreduras no banco não se multipliquem com o número de workers.
+    """
+    def executar_se_lider():
+        if cache_compartilhado.eh_lider():
+            return tarefa()
+    return agendar(nome, intervalo_segundos, executar_se_lider)
+
+async def cancelar_tarefas(tarefas: List[asyncio.Task]):
+    """Cancela as tarefas agendadas e aguarda o encerramento."""
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
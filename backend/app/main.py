@@ -1,14 +1,56 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.configs.config import settings
-from app.database.client import connect_to_mongo, close_mongo_connection
-from app.routes import fornecedor_router, produto_router, base_conhecimento_router, dashboard_router
+from app.services.perfil_inicializacao import perfil_inicializacao
+
+with perfil_inicializacao.medir("importacoes"):
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from app.configs.config import settings
+    from app.database.client import connect_to_mongo, close_mongo_connection
+    from app.jobs.scheduler import agendar, agendar_no_lider, cancelar_tarefas
+    from app.routes import fornecedor_router, produto_router, base_conhecimento_router, dashboard_router, alerta_router, bot_router, sistema_router, debug_router
+    from app.services.container import ServiceContainer
+    from app.services.dashboard_stream_service import dashboard_stream
+    from app.services.visualizacoes_buffer import buffer_visualizacoes
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    connect_to_mongo()
+    with perfil_inicializacao.medir("conexao_mongo"):
+        connect_to_mongo()
+    try:
+        with perfil_inicializacao.medir("servicos"):
+            services = ServiceContainer()
+        with perfil_inicializacao.medir("indices"):
+            services.criar_indices()
+    except ConnectionError as e:
+        print(f"Serviços indisponíveis: {e}")
+        services = None
+    app.state.services = services
+
+    tarefas = []
+    if services:
+        tarefas = [
+            agendar_no_lider("snapshot_historico", settings.HISTORICO_INTERVALO_MINUTOS * 60, services.historico_service.gerar_snapshot),
+            agendar_no_lider("alertas_vencimento", settings.ALERTAS_INTERVALO_MINUTOS * 60, services.alerta_service.verificar_vencimentos),
+            agendar("flush_visualizacoes", settings.VISUALIZACOES_FLUSH_SEGUNDOS, buffer_visualizacoes.flush),
+            agendar("kpis_compartilhados", settings.KPIS_CACHE_SEGUNDOS, services.kpis_compartilhados.atualizar),
+            agendar_no_lider(
+                "arquivamento_lotes",
+                settings.ARQUIVAMENTO_INTERVALO_MINUTOS * 60,
+                lambda: services.arquivamento_service.arquivar_lotes_inativos(settings.ARQUIVAMENTO_IDADE_DIAS)
+            ),
+        ]
+        if services.analise_colunar:
+            tarefas.append(
+                agendar("analise_colunar", settings.ANALISE_COLUNAR_INTERVALO_SEGUNDOS, services.analise_colunar.atualizar)
+            )
+        with perfil_inicializacao.medir("dashboard_stream"):
+            await dashboard_stream.iniciar(services.kpis_compartilhados)
+    perfil_inicializacao.marcar_pronto()
     yield
+    await dashboard_stream.parar()
+    await cancelar_tarefas(tarefas)
+    if services:
+        services.fechar()
     close_mongo_connection()
 
 app = FastAPI(
@@ -32,4 +74,8 @@ app.add_middleware(
 app.include_router(fornecedor_router.router)
 app.include_router(produto_router.router)
 app.include_router(base_conhecimento_router.router)
-app.include_router(dashboard_router.router)
\ No newline at end of file
+app.include_router(dashboard_router.router)
+app.include_router(alerta_router.router)
+app.include_router(bot_router.router)
+app.include_router(sistema_router.router)
+app.include_router(debug_router.router)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class Alerta(BaseModel):
+    """Alerta de lote que cruzou um limiar de vencimento (30, 15 ou 7 dias)."""
+    id: Optional[str] = None
+    codigo_lm: int
+    nome_produto: str
+    codigo_lote: str
+    data_validade: datetime
+    quantidade_lote: int
+    valor_lote: float
+    limiar_dias: int
+    dias_para_vencer: int
+    criado_em: datetime
+    lido: bool = False
@@ -0,0 +1,15 @@
+from typing import Any, List, Optional
+from pydantic import BaseModel, Field
+
+class MensagemBot(BaseModel):
+    """Mensagem enviada pelo usuário ao assistente virtual."""
+    mensagem: str = Field(..., min_length=1, max_length=500)
+
+class RespostaBot(BaseModel):
+    """Resposta do assistente virtual para uma mensagem da sessão."""
+    sessao_id: str
+    tipo: str
+    texto: str
+    dados: Optional[Any] = None
+    score: Optional[float] = None
+    sugestoes: List[str] = []
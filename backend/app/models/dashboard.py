@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 class ValorRiscoVencimento(BaseModel):
     """Valores em risco de vencimento por faixa de dias."""
@@ -14,6 +15,15 @@ class StatusLotesDistribuicao(BaseModel):
     em_60_dias: int = 0
     em_30_dias: int = 0
 
+class StatusLotesProduto(StatusLotesDistribuicao):
+    """Distribuição de lotes de um produto, identificada pelo código LM."""
+    codigo_lm: int
+    nome_produto: str
+
+class StatusProdutosRequest(BaseModel):
+    """Lista de códigos LM para consulta de status em lote."""
+    codigos_lm: List[int] = Field(..., min_length=1, max_length=500)
+
 class ProdutoVencimentoProximo(BaseModel):
     """Produto com lote próximo ao vencimento."""
     codigo_lm: str
@@ -48,4 +58,60 @@ class DashboardData(BaseModel):
     status_lotes_distribuicao: StatusLotesDistribuicao
     
     produtos_vencimento_proximo: List[ProdutoVencimentoProximo] = []
-    produtos_falta_lote: List[ProdutoFaltanteLote] = []
\ No newline at end of file
+    produtos_falta_lote: List[ProdutoFaltanteLote] = []
+
+class KpisAgrupamento(BaseModel):
+    """KPIs de um agrupamento do catálogo (seção ou subseção)."""
+    valor_total_estoque: float = 0.0
+    valor_total_perdido: float = 0.0
+    estatisticas: EstatisticasEstoque = Field(default_factory=EstatisticasEstoque)
+    valor_em_risco: ValorRiscoVencimento = Field(default_factory=ValorRiscoVencimento)
+    status_lotes_distribuicao: StatusLotesDistribuicao = Field(default_factory=StatusLotesDistribuicao)
+    produtos_com_discrepancia: int = 0
+    discrepancia_absoluta: int = 0
+    valor_discrepancia: float = 0.0
+
+class KpisSubsecao(KpisAgrupamento):
+    """KPIs de uma subseção (perdas de lotes arquivados são contabilizadas apenas na seção)."""
+    cod_subsecao: Optional[int] = None
+    subsecao: Optional[str] = None
+
+class KpisSecao(KpisAgrupamento):
+    """KPIs de uma seção, com o detalhamento por subseção."""
+    cod_secao: Optional[int] = None
+    secao: Optional[str] = None
+    subsecoes: List[KpisSubsecao] = []
+
+class FaixaVencimento(BaseModel):
+    """Lotes ativos e valor com vencimento entre `de_dias` (exclusivo) e `ate_dias` (inclusivo)."""
+    de_dias: int
+    ate_dias: Optional[int] = None
+    lotes: int = 0
+    valor: float = 0.0
+
+class KpisAnaliseColunar(BaseModel):
+    """KPIs calculados pelo motor analítico em memória, com janelas de vencimento livres."""
+    gerado_em: datetime
+    data_referencia: datetime
+    cod_secao: Optional[int] = None
+    valor_total_estoque: float = 0.0
+    valor_total_perdido: float = 0.0
+    estatisticas: EstatisticasEstoque = Field(default_factory=EstatisticasEstoque)
+    faixas_vencimento: List[FaixaVencimento] = []
+    lotes_vencidos: int = 0
+    valor_vencido: float = 0.0
+
+class PontoHistorico(BaseModel):
+    """Ponto da série histórica diária (ou agregado semanal/mensal) de estoque e valor."""
+    data: datetime
+    tipo: str
+    chave: str
+    dias: int = 1
+    estoque_reportado: float = 0.0
+    estoque_calculado: float = 0.0
+    valor_estoque: float = 0.0
+    valor_calculado: float = 0.0
+    risco_0_30: float = 0.0
+    risco_31_60: float = 0.0
+    risco_61_90: float = 0.0
+    valor_perdido: float = 0.0
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class Fornecedor(BaseModel):
     cnpj: str = Field(..., max_length=14)
@@ -20,4 +21,34 @@ class Fornecedor(BaseModel):
                 }
             ]
         }
-    }
\ No newline at end of file
+    }
+
+class FornecedorBulkRequest(BaseModel):
+    """Lista de fornecedores para cadastro/atualização em massa (validados linha a linha)."""
+    fornecedores: List[Dict[str, Any]] = Field(..., min_length=1, max_length=5000)
+
+class FornecedorLookupRequest(BaseModel):
+    """Lista de CNPJs para consulta em lote."""
+    cnpjs: List[str] = Field(..., min_length=1, max_length=5000)
+
+class LoteDevolucao(BaseModel):
+    """Lote ativo que ainda pode ser devolvido ao fornecedor."""
+    codigo_lm: int
+    nome_produto: str
+    codigo_lote: str
+    data_validade: datetime
+    prazo_devolucao: datetime
+    dias_para_prazo: int
+    quantidade_lote: int
+    valor_lote: float
+
+class DevolucaoFornecedor(BaseModel):
+    """Lotes devolvíveis de um fornecedor, ordenados pelo prazo de devolução."""
+    cnpj: str
+    nome: str
+    politica_devolucao: int
+    contato: Optional[str] = None
+    proximo_prazo: datetime
+    quantidade_lotes: int
+    valor_recuperavel: float
+    lotes: List[LoteDevolucao]
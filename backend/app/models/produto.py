@@ -11,6 +11,7 @@ class Lote(BaseModel):
     ativo: bool = Field(default=True)
     data_alteracao_status: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     valor_lote: float
+    motivo_inativacao: Optional[str] = None
 
 class Produto(BaseModel):
     nome_produto: str = Field(..., max_length=200)
@@ -101,4 +102,54 @@ class Produto(BaseModel):
                 }
             ]
         }
-    }
\ No newline at end of file
+    }
+
+class MovimentoConsumo(BaseModel):
+    """Saída de estoque (venda ou retirada) de um produto."""
+    codigo_lm: int
+    quantidade: int = Field(..., gt=0)
+
+class ConsumoRequest(BaseModel):
+    """Lote de movimentos de saída a serem baixados em ordem FEFO."""
+    movimentos: List[MovimentoConsumo] = Field(..., min_length=1)
+
+class LoteVencimentoProximo(BaseModel):
+    """Lote ativo de vencimento mais próximo de um produto."""
+    codigo_lote: str
+    data_validade: datetime
+    quantidade_lote: int
+
+class ProdutoEan(BaseModel):
+    """Registro enxuto de produto retornado pela consulta por EAN (leitura de código de barras)."""
+    ean: int
+    codigo_lm: int
+    nome_produto: str
+    estoque_calculado: int = 0
+    estoque_reportado: Optional[int] = None
+    lote_vencimento_proximo: Optional[LoteVencimentoProximo] = None
+
+class EanLookupRequest(BaseModel):
+    """Lote de EANs lidos (por exemplo, durante uma contagem de inventário)."""
+    eans: List[int] = Field(..., min_length=1, max_length=5000)
+
+class ItemReconciliacao(BaseModel):
+    """Linha da lista de reconciliação de estoque (reportado x calculado por lotes)."""
+    codigo_lm: int
+    nome_produto: str
+    cod_secao: Optional[int] = None
+    secao: Optional[str] = None
+    preco_unit: float = 0.0
+    estoque_reportado: Optional[int] = None
+    estoque_calculado: int = 0
+    discrepancia_estoque: int = 0
+    valor_estoque_calculado: float = 0.0
+    valor_estoque_total: Optional[float] = None
+    valor_discrepancia: float = 0.0
+
+class LoteArquivado(Lote):
+    """Lote inativo movido do produto para a coleção de arquivo."""
+    codigo_lm: int
+    nome_produto: Optional[str] = None
+    cod_secao: Optional[int] = None
+    valor_perdido: float = 0.0
+    arquivado_em: datetime
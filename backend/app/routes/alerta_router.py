@@ -0,0 +1,32 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from app.services.alerta_service import AlertaService
+from app.services.container import ServiceContainer, get_services
+
+router = APIRouter(prefix="/alertas", tags=["Alertas de Vencimento"])
+
+def get_alerta_service(services: ServiceContainer = Depends(get_services)) -> AlertaService:
+    return services.alerta_service
+
+@router.get("/", response_model=dict)
+def get_alertas(
+    skip: int = 0,
+    limit: int = 50,
+    limiar_dias: Optional[int] = None,
+    apenas_nao_lidos: bool = False,
+    service: AlertaService = Depends(get_alerta_service)
+):
+    """Retorna os alertas de vencimento, mais recentes primeiro."""
+    return service.get_all(skip=skip, limit=limit, limiar_dias=limiar_dias, apenas_nao_lidos=apenas_nao_lidos)
+
+@router.post("/verificar", status_code=status.HTTP_200_OK)
+def verificar_vencimentos(service: AlertaService = Depends(get_alerta_service)):
+    """Executa manualmente a varredura incremental de vencimentos."""
+    return service.verificar_vencimentos()
+
+@router.put("/{id}/lido", status_code=status.HTTP_204_NO_CONTENT)
+def marcar_alerta_como_lido(id: str, service: AlertaService = Depends(get_alerta_service)):
+    """Marca um alerta como lido."""
+    if not service.marcar_como_lido(id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Alerta com ID {id} não encontrado")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Response, status
 from typing import List, Optional
 from app.models.base_conhecimento import BaseConhecimento, ConhecimentoMatch 
 from app.services.base_conhecimento_service import BaseConhecimentoService
+from app.services.container import ServiceContainer, get_services
 
 router = APIRouter(prefix="/base-conhecimento", tags=["Base de Conhecimento"])
 
-def get_base_conhecimento_service() -> BaseConhecimentoService:
-    return BaseConhecimentoService()
+def get_base_conhecimento_service(services: ServiceContainer = Depends(get_services)) -> BaseConhecimentoService:
+    return services.base_conhecimento_service
 
 @router.get("/", response_model=List[BaseConhecimento])
 def get_all_conhecimentos(
@@ -16,6 +17,11 @@ def get_all_conhecimentos(
     """Retorna todos os itens da base de conhecimento."""
     return service.get_all(apenas_ativos=apenas_ativos)
 
+@router.get("/cache/estatisticas", response_model=dict)
+def get_estatisticas_cache(service: BaseConhecimentoService = Depends(get_base_conhecimento_service)):
+    """Retorna os contadores de hit/miss do cache de respostas."""
+    return service.get_estatisticas_cache()
+
 @router.get("/{id}", response_model=BaseConhecimento)
 def get_conhecimento_by_id(
     id: str, 
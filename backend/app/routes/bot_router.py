@@ -0,0 +1,55 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from app.bot.chat_service import sessoes
+from app.models.bot import MensagemBot, RespostaBot
+
+router = APIRouter(prefix="/bot", tags=["Assistente Virtual"])
+
+def _ler_mensagem(texto: str) -> MensagemBot:
+    """Aceita `{"mensagem": "..."}` ou o texto puro da mensagem."""
+    try:
+        payload = json.loads(texto)
+    except json.JSONDecodeError:
+        payload = texto
+    if isinstance(payload, dict):
+        return MensagemBot(**payload)
+    return MensagemBot(mensagem=str(payload))
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, sessao_id: Optional[str] = None):
+    """Chat com o assistente virtual; o contexto da sessão é mantido entre mensagens."""
+    await websocket.accept()
+    services = getattr(websocket.app.state, "services", None)
+    if services is None:
+        await websocket.close(code=1011, reason="Falha na conexão com o MongoDB.")
+        return
+
+    contexto = sessoes.obter(sessao_id)
+    await websocket.send_json({"tipo": "sessao", "sessao_id": contexto.sessao_id})
+
+    try:
+        while True:
+            texto = await websocket.receive_text()
+            contexto = sessoes.obter(contexto.sessao_id)
+
+            try:
+                mensagem = _ler_mensagem(texto)
+                resposta = await services.chat_bot.responder(contexto, mensagem.mensagem)
+            except ValidationError:
+                resposta = RespostaBot(
+                    sessao_id=contexto.sessao_id,
+                    tipo="erro",
+                    texto="Mensagem inválida. Envie um texto entre 1 e 500 caracteres."
+                )
+            except Exception as e:
+                resposta = RespostaBot(
+                    sessao_id=contexto.sessao_id,
+                    tipo="erro",
+                    texto=f"Erro ao processar a mensagem: {str(e)}"
+                )
+
+            await websocket.send_json(resposta.model_dump(mode="json"))
+    except WebSocketDisconnect:
+        pass
@@ -1,19 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from app.services.analise_colunar import AnaliseColunar
 from app.services.dashboard_service import DashboardService
-from app.models.dashboard import DashboardData, StatusLotesDistribuicao
+from app.services.dashboard_stream_service import dashboard_stream
+from app.services.historico_service import HistoricoService
+from app.services.kpis_compartilhados import KpisCompartilhados
+from app.services.container import ServiceContainer, get_services
+from app.models.dashboard import DashboardData, StatusLotesDistribuicao, StatusLotesProduto, StatusProdutosRequest, PontoHistorico, KpisSecao, KpisAnaliseColunar
+from app.models.produto import ItemReconciliacao
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard & KPIs"])
 
-def get_dashboard_service() -> DashboardService:
-    return DashboardService()
+def get_dashboard_service(services: ServiceContainer = Depends(get_services)) -> DashboardService:
+    return services.dashboard_service
+
+def get_kpis_compartilhados(services: ServiceContainer = Depends(get_services)) -> KpisCompartilhados:
+    return services.kpis_compartilhados
+
+def get_historico_service(services: ServiceContainer = Depends(get_services)) -> HistoricoService:
+    return services.historico_service
+
+def get_analise_colunar(services: ServiceContainer = Depends(get_services)) -> AnaliseColunar:
+    if services.analise_colunar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Motor analítico desabilitado.")
+    return services.analise_colunar
 
 @router.get("/kpis", response_model=DashboardData, status_code=status.HTTP_200_OK)
 async def get_dashboard_kpis(
-    service: DashboardService = Depends(get_dashboard_service)
+    service: KpisCompartilhados = Depends(get_kpis_compartilhados)
 ):
-    """Retorna KPIs consolidados do dashboard."""
+    """Retorna KPIs consolidados do dashboard (calculados pelo worker líder e compartilhados)."""
     try:
-        return service.get_dashboard_kpis()
+        return await asyncio.to_thread(service.get_dashboard_kpis)
     except ConnectionError as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -25,6 +46,64 @@ async def get_dashboard_kpis(
             detail=f"Erro ao calcular KPIs do dashboard: {str(e)}"
         )
         
+@router.get("/secoes", response_model=List[KpisSecao])
+def get_kpis_secoes(service: DashboardService = Depends(get_dashboard_service)):
+    """
+    KPIs do dashboard por seção, com detalhamento por subseção.
+
+    Calculados em uma única agregação agrupada e mantidos em cache por seção;
+    escritas em produtos invalidam apenas as seções afetadas.
+    """
+    try:
+        return service.get_kpis_secoes()
+    except ConnectionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Erro de conexão com banco de dados: {str(e)}"
+        )
+
+@router.get("/secoes/{cod_secao}", response_model=KpisSecao)
+def get_kpis_secao(cod_secao: int, service: DashboardService = Depends(get_dashboard_service)):
+    """KPIs de uma seção, com detalhamento por subseção."""
+    kpis = service.get_kpis_secao(cod_secao)
+    if kpis is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seção não encontrada.")
+    return kpis
+
+@router.get("/analise/kpis", response_model=KpisAnaliseColunar)
+def get_kpis_analise(
+    janelas: List[int] = Query(default=[30, 60, 90], description="Limites (em dias) das faixas de vencimento"),
+    cod_secao: Optional[int] = Query(default=None),
+    data_referencia: Optional[datetime] = Query(default=None, description="Data a partir da qual os vencimentos são contados"),
+    service: AnaliseColunar = Depends(get_analise_colunar)
+):
+    """
+    KPIs calculados sobre o snapshot colunar em memória (ANALISE_COLUNAR_ATIVA), sem consultar o banco.
+    Aceita janelas de vencimento e data de referência arbitrárias para simulações.
+    """
+    try:
+        return service.get_kpis(janelas, cod_secao, data_referencia)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/analise/discrepancias", response_model=List[ItemReconciliacao])
+def get_discrepancias_analise(
+    tipo: str = Query(default="todas", description="falta, sobra ou todas"),
+    limite: int = Query(default=20, ge=1, le=1000),
+    cod_secao: Optional[int] = Query(default=None),
+    service: AnaliseColunar = Depends(get_analise_colunar)
+):
+    """Ranking das maiores discrepâncias de estoque a partir do snapshot colunar."""
+    try:
+        return service.get_ranking_discrepancia(tipo, limite, cod_secao)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/analise/status")
+def get_status_analise(service: AnaliseColunar = Depends(get_analise_colunar)):
+    """Tamanho, idade e última atualização do snapshot colunar deste worker."""
+    return service.get_status()
+
 @router.get("/status-produto/{nome_produto}", response_model=StatusLotesDistribuicao)
 async def get_product_status(
     nome_produto: str,
@@ -37,4 +116,69 @@ async def get_product_status(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao buscar status do produto: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/status-produtos", response_model=List[StatusLotesProduto])
+async def get_products_status(
+    request: StatusProdutosRequest,
+    service: DashboardService = Depends(get_dashboard_service)
+):
+    """Retorna a distribuição de lotes de vários produtos em uma única consulta."""
+    try:
+        return service.get_products_lote_status(request.codigos_lm)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar status dos produtos: {str(e)}"
+        )
+
+@router.get("/historico", response_model=List[PontoHistorico])
+def get_historico(
+    granularidade: str = "dia",
+    tipo: str = "loja",
+    chave: Optional[str] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    service: HistoricoService = Depends(get_historico_service)
+):
+    """Retorna a série histórica de estoque, valor e risco (diária, semanal ou mensal)."""
+    try:
+        return service.get_historico(granularidade, tipo, chave, inicio, fim)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/historico/snapshot", status_code=status.HTTP_200_OK)
+def gerar_snapshot_historico(service: HistoricoService = Depends(get_historico_service)):
+    """Gera manualmente o snapshot do dia (ignorado se já existir)."""
+    return service.gerar_snapshot()
+
+@router.get("/stream")
+async def stream_dashboard_kpis(request: Request):
+    """Envia os KPIs do dashboard via Server-Sent Events sempre que o estoque muda."""
+    try:
+        fila = await dashboard_stream.assinar()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Erro ao calcular KPIs do dashboard: {str(e)}"
+        )
+
+    async def eventos():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    mensagem = await asyncio.wait_for(fila.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if mensagem is None:
+                    break
+                yield f"event: kpis\ndata: {mensagem}\n\n"
+        finally:
+            dashboard_stream.cancelar_assinatura(fila)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.configs.config import settings
+from app.database.profiler_consultas import profiler_consultas
+
+router = APIRouter(prefix="/debug", tags=["Depuração"])
+
+def verificar_token_debug(x_debug_token: Optional[str] = Header(None)):
+    """Endpoints de depuração só existem com DEBUG_TOKEN configurado e exigem o header X-Debug-Token."""
+    if not settings.DEBUG_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Endpoint de depuração desabilitado.")
+    if not x_debug_token or not secrets.compare_digest(x_debug_token, settings.DEBUG_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de depuração inválido.")
+
+@router.get("/queries", dependencies=[Depends(verificar_token_debug)])
+def get_consultas_lentas(apenas_alertas: bool = False):
+    """
+    Consultas acima de PROFILER_LIMITE_MS amostradas por este worker, das mais recentes para
+    as mais antigas, com o método de origem, o resumo do `explain` e os alertas
+    (COLLSCAN, SORT_EM_MEMORIA, RAZAO_EXAMINADOS_ALTA).
+    """
+    return {
+        "ativo": settings.PROFILER_CONSULTAS_ATIVO,
+        "limite_ms": settings.PROFILER_LIMITE_MS,
+        "worker_pid": os.getpid(),
+        "consultas": profiler_consultas.listar(apenas_alertas)
+    }
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(verificar_token_debug)])
+def limpar_consultas_lentas():
+    """Descarta as consultas registradas neste worker."""
+    profiler_consultas.limpar()
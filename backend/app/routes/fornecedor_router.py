@@ -1,18 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from typing import List, Optional
-from app.models.fornecedor import Fornecedor
+from app.models.fornecedor import Fornecedor, FornecedorBulkRequest, FornecedorLookupRequest
 from app.services.fornecedor_service import FornecedorService
+from app.services.container import ServiceContainer, get_services
 
 router = APIRouter(prefix="/fornecedores", tags=["Fornecedores"])
 
-def get_fornecedor_service() -> FornecedorService:
-    return FornecedorService()
+def get_fornecedor_service(services: ServiceContainer = Depends(get_services)) -> FornecedorService:
+    return services.fornecedor_service
 
 @router.get("/", response_model=list[Fornecedor])
 def get_all_fornecedores(service: FornecedorService = Depends(get_fornecedor_service)):
     """Retorna a lista de todos os fornecedores cadastrados."""
     return service.get_all()
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+def upsert_fornecedores_em_massa(request: FornecedorBulkRequest, service: FornecedorService = Depends(get_fornecedor_service)):
+    """Cadastra ou atualiza fornecedores em massa, com erros reportados por linha."""
+    return service.upsert_em_massa(request.fornecedores)
+
+@router.post("/lookup", status_code=status.HTTP_200_OK)
+def lookup_fornecedores(request: FornecedorLookupRequest, service: FornecedorService = Depends(get_fornecedor_service)):
+    """Busca vários fornecedores pelo CNPJ em uma única consulta."""
+    return service.get_by_cnpjs(request.cnpjs)
+
+@router.get("/devolucao-pendente")
+def get_devolucao_pendente(
+    skip: int = 0,
+    limit: int = 20,
+    horizonte_dias: Optional[int] = Query(None, ge=0, description="Considera apenas prazos de devolução até N dias"),
+    lotes_por_fornecedor: int = Query(50, ge=1, le=500),
+    service: FornecedorService = Depends(get_fornecedor_service)
+):
+    """Lotes que ainda podem ser devolvidos, agrupados por fornecedor e ordenados pelo prazo de devolução."""
+    return service.get_devolucao_pendente(
+        skip=skip,
+        limit=limit,
+        horizonte_dias=horizonte_dias,
+        lotes_por_fornecedor=lotes_por_fornecedor
+    )
+
 @router.get("/{cnpj}", response_model=Fornecedor)
 def get_fornecedor_by_id(cnpj: str, service: FornecedorService = Depends(get_fornecedor_service)):
     """Retorna um fornecedor pelo CNPJ."""
@@ -1,12 +1,24 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
-from app.models.produto import Produto, Lote
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File
+from app.models.produto import Produto, Lote, ConsumoRequest, ProdutoEan, EanLookupRequest
 from app.services.produto_service import ProdutoService
+from app.services.arquivamento_service import ArquivamentoService
+from app.configs.config import settings
+from app.services.container import ServiceContainer, get_services
 
 router = APIRouter(prefix="/produtos", tags=["Produtos e Lotes"])
 
-def get_produto_service() -> ProdutoService:
-    return ProdutoService()
+def get_produto_service(services: ServiceContainer = Depends(get_services)) -> ProdutoService:
+    return services.produto_service
+
+def get_arquivamento_service(services: ServiceContainer = Depends(get_services)) -> ArquivamentoService:
+    return services.arquivamento_service
+
+def parse_fields(fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: codigo_lm,nome_produto,preco_unit)")) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    return [campo.strip() for campo in fields.split(",") if campo.strip()]
 
 @router.post("/", response_model=Produto, status_code=status.HTTP_201_CREATED)
 def create_produto(produto: Produto, service: ProdutoService = Depends(get_produto_service)):
@@ -16,20 +28,115 @@ def create_produto(produto: Produto, service: ProdutoService = Depends(get_produ
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.post("/consumo", status_code=status.HTTP_200_OK)
+def consumir_estoque(consumo: ConsumoRequest, service: ProdutoService = Depends(get_produto_service)):
+    """Baixa saídas de estoque em lote, consumindo os lotes ativos em ordem FEFO."""
+    return service.consumir_estoque(consumo.movimentos)
+
 @router.get("/", response_model=dict)
 def get_produtos(
     skip: int = 0,
     limit: int = 50,
     termo: Optional[str] = None,
+    secao: Optional[List[str]] = Query(None),
+    subsecao: Optional[List[str]] = Query(None),
+    marca: Optional[List[str]] = Query(None),
+    fornecedor: Optional[List[str]] = Query(None, description="CNPJ do fornecedor"),
+    avs: Optional[bool] = None,
+    facets: bool = Query(False, description="Inclui as contagens por valor de cada faceta"),
+    include_lotes: bool = Query(False, description="Inclui o array de lotes (sem `fields`, retorna o produto completo)"),
+    fields: Optional[List[str]] = Depends(parse_fields),
+    service: ProdutoService = Depends(get_produto_service)
+):
+    """
+    Retorna a lista de produtos cadastrados, com filtros e facetas opcionais.
+    A listagem padrão é enxuta (sem lotes); use `fields` e `include_lotes` para ajustar.
+    """
+    try:
+        return service.get_all(
+            termo_busca=termo,
+            skip=skip,
+            limit=limit,
+            secao=secao,
+            subsecao=subsecao,
+            marca=marca,
+            fornecedor_cnpj=fornecedor,
+            avs=avs,
+            facetas=facets,
+            campos=fields,
+            incluir_lotes=include_lotes
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/reconciliacao", response_model=dict)
+def get_reconciliacao(
+    tipo: str = Query("todas", description="'falta', 'sobra' ou 'todas'"),
+    discrepancia_minima: int = Query(1, ge=1),
+    cod_secao: Optional[int] = None,
+    ordenar_por: Optional[str] = Query(None, description="discrepancia_absoluta, discrepancia_estoque, valor_estoque_calculado ou valor_estoque_total"),
+    skip: int = 0,
+    limit: int = 50,
     service: ProdutoService = Depends(get_produto_service)
 ):
-    """Retorna a lista de todos os produtos cadastrados."""
-    return service.get_all(termo_busca=termo, skip=skip, limit=limit)
+    """Lista de reconciliação de estoque (reportado x calculado), paginada e ordenada no servidor."""
+    try:
+        return service.get_reconciliacao(
+            tipo=tipo,
+            discrepancia_minima=discrepancia_minima,
+            cod_secao=cod_secao,
+            ordenar_por=ordenar_por,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/lotes-arquivados", response_model=dict)
+def get_lotes_arquivados(
+    codigo_lm: Optional[int] = None,
+    codigo_lote: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    service: ArquivamentoService = Depends(get_arquivamento_service)
+):
+    """Consulta os lotes inativos movidos para o arquivo."""
+    return service.get_lotes_arquivados(codigo_lm=codigo_lm, codigo_lote=codigo_lote, skip=skip, limit=limit)
 
-@router.get("/{codigo_lm}", response_model=Produto)
-def get_produto_by_id(codigo_lm: int, service: ProdutoService = Depends(get_produto_service)):
-    """Retorna um produto pelo código LM."""
-    produto = service.get_by_codigo_lm(codigo_lm)
+@router.post("/lotes/arquivar", status_code=status.HTTP_200_OK)
+def arquivar_lotes_inativos(
+    idade_dias: int = Query(settings.ARQUIVAMENTO_IDADE_DIAS, ge=0),
+    service: ArquivamentoService = Depends(get_arquivamento_service)
+):
+    """Executa manualmente o arquivamento de lotes inativos há mais de `idade_dias` dias."""
+    return service.arquivar_lotes_inativos(idade_dias)
+
+@router.get("/ean/{ean}", response_model=ProdutoEan)
+def get_produto_by_ean(ean: int, service: ProdutoService = Depends(get_produto_service)):
+    """Retorna o registro enxuto (nome, código, estoque e lote ativo de vencimento mais próximo) de um produto pelo EAN."""
+    produto = service.get_by_ean(ean)
+    if not produto:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado")
+    return produto
+
+@router.post("/ean/lookup", response_model=dict)
+def lookup_eans(request: EanLookupRequest, service: ProdutoService = Depends(get_produto_service)):
+    """Consulta em lote de EANs (até 5000), para contagens de inventário por leitor de código de barras."""
+    return service.get_by_eans(request.eans)
+
+@router.get("/{codigo_lm}", response_model=Union[Produto, Dict[str, Any]])
+def get_produto_by_id(
+    codigo_lm: int,
+    include_lotes: Optional[bool] = Query(None, description="Padrão: inclui os lotes quando `fields` não é informado"),
+    fields: Optional[List[str]] = Depends(parse_fields),
+    service: ProdutoService = Depends(get_produto_service)
+):
+    """Retorna um produto pelo código LM (completo, ou apenas os campos pedidos)."""
+    incluir_lotes = include_lotes if include_lotes is not None else fields is None
+    try:
+        produto = service.get_produto(codigo_lm, campos=fields, incluir_lotes=incluir_lotes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     if not produto:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado")
     return produto
@@ -49,6 +156,24 @@ def delete_produto(codigo_lm: int, service: ProdutoService = Depends(get_produto
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado para exclusão")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+@router.get("/{codigo_lm}/lotes", response_model=dict)
+def listar_lotes(
+    codigo_lm: int,
+    ativo: Optional[bool] = None,
+    vence_ate: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    service: ProdutoService = Depends(get_produto_service)
+):
+    """Lista os lotes de um produto por ordem de validade, com filtros e paginação por cursor."""
+    try:
+        pagina = service.listar_lotes(codigo_lm, ativo=ativo, vence_ate=vence_ate, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if pagina is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto não encontrado")
+    return pagina
+
 @router.post("/{codigo_lm}/lotes", response_model=Produto, status_code=status.HTTP_201_CREATED)
 def add_lote_to_produto(codigo_lm: int, lote: Lote, service: ProdutoService = Depends(get_produto_service)):
     """Adiciona um novo lote a um produto e atualiza o estoque."""
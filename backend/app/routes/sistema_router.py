@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.database.metricas_consultas import metricas_consultas
+from app.services.perfil_inicializacao import perfil_inicializacao
+
+router = APIRouter(prefix="/sistema", tags=["Sistema"])
+
+@router.get("/inicializacao")
+def get_perfil_inicializacao():
+    """Tempos de inicialização do worker por etapa e do primeiro uso de dependências pesadas."""
+    return perfil_inicializacao.resumo()
+
+@router.get("/consultas")
+def get_metricas_consultas():
+    """Comandos executados por este worker, agrupados por servidor (primário/secundário) e por serviço de origem."""
+    return metricas_consultas.resumo()
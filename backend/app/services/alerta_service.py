@@ -0,0 +1,206 @@
+from typing import Optional
+from pymongo.collection import Collection
+from pymongo import UpdateOne, DESCENDING
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+
+from app.models.alerta import Alerta
+from app.database.client import get_database
+
+LIMIARES_DIAS = [30, 15, 7]
+JOB_ID = "alertas_vencimento"
+
+class AlertaService:
+    """Serviço de alertas de vencimento de lotes com varredura incremental."""
+
+    def __init__(self):
+        self.db = get_database()
+        if self.db is None:
+            raise ConnectionError("Falha na conexão com o MongoDB.")
+        self.produtos_collection: Collection = self.db['produtos']
+        self.collection: Collection = self.db['alertas']
+        self.jobs_collection: Collection = self.db['jobs_estado']
+
+    def criar_indices(self):
+        """Cria os índices usados pela varredura e pela listagem (executado uma vez na inicialização)."""
+        self.produtos_collection.create_index([("lotes.data_validade", 1), ("lotes.ativo", 1)])
+        self.collection.create_index([("codigo_lm", 1), ("codigo_lote", 1), ("limiar_dias", 1)], unique=True)
+        self.collection.create_index([("criado_em", DESCENDING)])
+
+    def _janelas(self, ultima_execucao: Optional[datetime], agora: datetime) -> dict:
+        """
+        Intervalo de validade que cruzou cada limiar desde a última execução:
+        (ultima_execucao + limiar, agora + limiar]. Na primeira execução, considera
+        todos os lotes ainda não vencidos dentro do limiar.
+        """
+        janelas = {}
+        for limiar in LIMIARES_DIAS:
+            inicio = ultima_execucao + timedelta(days=limiar) if ultima_execucao else agora
+            janelas[limiar] = (max(inicio, agora), agora + timedelta(days=limiar))
+        return janelas
+
+    @staticmethod
+    def _alterado_desde(lote: dict, desde: datetime) -> bool:
+        return any(
+            lote.get(campo) is not None and lote[campo] > desde
+            for campo in ("data_atualizacao_ativo", "data_alteracao_status")
+        )
+
+    def verificar_vencimentos(self) -> dict:
+        """
+        Gera alertas para os lotes ativos que cruzaram um limiar desde a última execução.
+
+        A consulta usa o índice em `lotes.data_validade` e examina apenas os lotes das
+        janelas recém-cruzadas e os lotes criados, editados ou reativados desde a última
+        execução que já estão dentro de algum limiar (por exemplo, um lote cadastrado
+        faltando 5 dias para vencer); os alertas são deduplicados pelo índice único
+        (produto, lote, limiar).
+        """
+        # UTC sem fuso, como as datas devolvidas pelo PyMongo (inclusive `ultima_execucao`)
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        estado = self.jobs_collection.find_one({"_id": JOB_ID}) or {}
+        ultima_execucao = estado.get("ultima_execucao")
+        janelas = self._janelas(ultima_execucao, agora)
+
+        janelas_validas = [(inicio, fim) for inicio, fim in janelas.values() if inicio < fim]
+
+        limite_limiares = agora + timedelta(days=max(LIMIARES_DIAS))
+
+        condicoes_lote = [
+            {"ativo": True, "data_validade": {"$gt": inicio, "$lte": fim}}
+            for inicio, fim in janelas_validas
+        ]
+        condicoes_filtro = [
+            {"$and": [
+                {"$gt": ["$$lote.data_validade", inicio]},
+                {"$lte": ["$$lote.data_validade", fim]}
+            ]}
+            for inicio, fim in janelas_validas
+        ]
+        if ultima_execucao:
+            condicoes_lote.append({
+                "ativo": True,
+                "data_validade": {"$gt": agora, "$lte": limite_limiares},
+                "$or": [
+                    {"data_atualizacao_ativo": {"$gt": ultima_execucao}},
+                    {"data_alteracao_status": {"$gt": ultima_execucao}}
+                ]
+            })
+            condicoes_filtro.append({"$and": [
+                {"$gt": ["$$lote.data_validade", agora]},
+                {"$lte": ["$$lote.data_validade", limite_limiares]},
+                {"$or": [
+                    {"$gt": ["$$lote.data_atualizacao_ativo", ultima_execucao]},
+                    {"$gt": ["$$lote.data_alteracao_status", ultima_execucao]}
+                ]}
+            ]})
+
+        operacoes = []
+        if condicoes_lote:
+            pipeline = [
+                {
+                    "$match": {
+                        "$or": [{"lotes": {"$elemMatch": condicao}} for condicao in condicoes_lote]
+                    }
+                },
+                {
+                    "$project": {
+                        "codigo_lm": 1,
+                        "nome_produto": 1,
+                        "lotes": {
+                            "$filter": {
+                                "input": "$lotes",
+                                "as": "lote",
+                                "cond": {
+                                    "$and": [
+                                        {"$eq": ["$$lote.ativo", True]},
+                                        {"$or": condicoes_filtro}
+                                    ]
+                                }
+                            }
+                        }
+                    }
+                }
+            ]
+
+            for produto in self.produtos_collection.aggregate(pipeline):
+                for lote in produto.get("lotes", []):
+                    validade = lote["data_validade"]
+                    cruzados = [l for l, (inicio, fim) in janelas.items() if inicio < validade <= fim]
+                    if not cruzados and ultima_execucao and self._alterado_desde(lote, ultima_execucao):
+                        cruzados = [l for l in LIMIARES_DIAS if agora < validade <= agora + timedelta(days=l)]
+                    if not cruzados:
+                        continue
+                    limiar = min(cruzados)
+
+                    alerta = Alerta(
+                        codigo_lm=produto["codigo_lm"],
+                        nome_produto=produto.get("nome_produto", ""),
+                        codigo_lote=lote["codigo_lote"],
+                        data_validade=validade,
+                        quantidade_lote=lote.get("quantidade_lote", 0),
+                        valor_lote=lote.get("valor_lote", 0.0),
+                        limiar_dias=limiar,
+                        dias_para_vencer=max(0, (validade - agora).days),
+                        criado_em=agora
+                    )
+                    operacoes.append(
+                        UpdateOne(
+                            {"codigo_lm": alerta.codigo_lm, "codigo_lote": alerta.codigo_lote, "limiar_dias": limiar},
+                            {"$setOnInsert": alerta.model_dump(exclude={"id"})},
+                            upsert=True
+                        )
+                    )
+
+        alertas_criados = 0
+        if operacoes:
+            resultado = self.collection.bulk_write(operacoes, ordered=False)
+            alertas_criados = resultado.upserted_count
+
+        self.jobs_collection.update_one(
+            {"_id": JOB_ID},
+            {"$set": {"ultima_execucao": agora}},
+            upsert=True
+        )
+
+        return {"executado_em": agora, "lotes_no_limiar": len(operacoes), "alertas_criados": alertas_criados}
+
+    def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        limiar_dias: Optional[int] = None,
+        apenas_nao_lidos: bool = False
+    ) -> dict:
+        """Retorna os alertas mais recentes primeiro, com paginação."""
+        query = {}
+        if limiar_dias is not None:
+            query["limiar_dias"] = limiar_dias
+        if apenas_nao_lidos:
+            query["lido"] = False
+
+        total = self.collection.count_documents(query)
+        cursor = self.collection.find(query).sort("criado_em", DESCENDING).skip(skip)
+
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        alertas = []
+        for data in cursor:
+            data["id"] = str(data.pop("_id"))
+            alertas.append(Alerta(**data))
+
+        return {
+            "alertas": alertas,
+            "total": total,
+            "skip": skip,
+            "limit": limit if limit > 0 else total
+        }
+
+    def marcar_como_lido(self, id: str) -> bool:
+        """Marca um alerta como lido."""
+        try:
+            result = self.collection.update_one({"_id": ObjectId(id)}, {"$set": {"lido": True}})
+            return result.matched_count == 1
+        except Exception:
+            return False
@@ -0,0 +1,349 @@
+import calendar
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo.collection import Collection
+
+from app.configs.config import settings
+from app.database.client import get_database
+from app.models.dashboard import EstatisticasEstoque, FaixaVencimento, KpisAnaliseColunar
+from app.models.produto import ItemReconciliacao
+from app.services.arquivamento_service import ArquivamentoService
+from app.services.cache_compartilhado import CacheCompartilhado
+from app.services.perfil_inicializacao import perfil_inicializacao
+
+SEM_SECAO = -1
+
+CHAVE_SNAPSHOT = "analise_colunar_snapshot"
+CHAVE_PUBLICACAO = "analise_colunar_publicacao"
+
+PROJECAO_SNAPSHOT = {
+    "_id": 0,
+    "codigo_lm": 1,
+    "nome_produto": 1,
+    "preco_unit": 1,
+    "estoque_reportado": 1,
+    "estoque_calculado": 1,
+    "cod_secao": 1,
+    "secao": 1,
+    "lotes.quantidade_lote": 1,
+    "lotes.data_validade": 1,
+    "lotes.ativo": 1,
+    "lotes.motivo_inativacao": 1
+}
+
+COLUNAS_PRODUTOS = ("codigo_lm", "nome_produto", "secao", "preco", "estoque_reportado", "estoque_calculado", "cod_secao")
+COLUNAS_LOTES = ("codigo_lm", "valor", "validade", "ativo", "inativo", "perdido", "cod_secao")
+
+def _carregar_numpy():
+    with perfil_inicializacao.medir_primeiro_uso("numpy"):
+        import numpy as np
+    return np
+
+def _epoch(data: Optional[datetime]) -> float:
+    """Segundos desde a época; datas sem fuso são tratadas como UTC, como as devolvidas pelo PyMongo."""
+    if data is None:
+        return math.nan
+    return float(calendar.timegm(data.utctimetuple()))
+
+def _montar_colunas(np, documentos: list) -> dict:
+    """Converte documentos de produtos (com lotes embutidos) em colunas NumPy de produtos e de lotes."""
+    produtos = {coluna: [] for coluna in COLUNAS_PRODUTOS}
+    lotes = {coluna: [] for coluna in COLUNAS_LOTES}
+
+    for documento in documentos:
+        codigo_lm = documento["codigo_lm"]
+        preco = float(documento.get("preco_unit") or 0.0)
+        cod_secao = documento.get("cod_secao")
+        cod_secao = SEM_SECAO if cod_secao is None else int(cod_secao)
+        reportado = documento.get("estoque_reportado")
+
+        produtos["codigo_lm"].append(codigo_lm)
+        produtos["nome_produto"].append(documento.get("nome_produto") or "")
+        produtos["secao"].append(documento.get("secao"))
+        produtos["preco"].append(preco)
+        produtos["estoque_reportado"].append(math.nan if reportado is None else float(reportado))
+        produtos["estoque_calculado"].append(float(documento.get("estoque_calculado") or 0))
+        produtos["cod_secao"].append(cod_secao)
+
+        for lote in documento.get("lotes") or []:
+            inativo = lote.get("ativo") is False
+            lotes["codigo_lm"].append(codigo_lm)
+            lotes["valor"].append(preco * (lote.get("quantidade_lote") or 0))
+            lotes["validade"].append(_epoch(lote.get("data_validade")))
+            lotes["ativo"].append(lote.get("ativo") is True)
+            lotes["inativo"].append(inativo)
+            lotes["perdido"].append(inativo and lote.get("motivo_inativacao") != "consumido")
+            lotes["cod_secao"].append(cod_secao)
+
+    tipos = {
+        "codigo_lm": np.int64, "cod_secao": np.int64,
+        "nome_produto": object, "secao": object,
+        "ativo": bool, "inativo": bool, "perdido": bool
+    }
+    return {
+        "produtos": {coluna: np.array(valores, dtype=tipos.get(coluna, np.float64)) for coluna, valores in produtos.items()},
+        "lotes": {coluna: np.array(valores, dtype=tipos.get(coluna, np.float64)) for coluna, valores in lotes.items()}
+    }
+
+class AnaliseColunar:
+    """
+    Motor analítico opcional (ANALISE_COLUNAR_ATIVA): mantém no processo da API um snapshot
+    colunar de produtos e lotes em arrays NumPy e responde às perguntas do dashboard (valor em
+    risco, faixas de vencimento, perdas, ranking de discrepâncias) com operações vetorizadas,
+    inclusive com janelas de dias e data de referência arbitrárias, sem consultar o banco.
+
+    A atualização periódica é incremental: só os produtos com `atualizado_em` recente são relidos
+    e substituídos nas colunas, e os excluídos (marcas em `produtos_excluidos`) são removidos.
+    Divergência na contagem de produtos e o intervalo ANALISE_COLUNAR_RECONSTRUCAO_MINUTOS
+    disparam uma reconstrução completa.
+
+    Só o worker líder do host consulta o banco: ele publica o snapshot no cache compartilhado
+    e os demais workers carregam a versão publicada, sem repetir as leituras.
+    """
+
+    def __init__(self, cache: CacheCompartilhado, arquivamento_service: Optional[ArquivamentoService] = None):
+        # Leitura analítica: segue a read preference do perfil "dashboard"
+        self.db = get_database("dashboard")
+        if self.db is None:
+            raise ConnectionError("Falha na conexão com o MongoDB.")
+        self.produtos_collection: Collection = self.db['produtos']
+        self.excluidos_collection: Collection = self.db['produtos_excluidos']
+        self.arquivamento_service = arquivamento_service or ArquivamentoService()
+        self.cache = cache
+        self._snapshot: Optional[dict] = None
+        self._publicado_em: Optional[float] = None
+        self._lock = threading.Lock()
+        self.ultima_atualizacao: dict = {}
+
+    def atualizar(self) -> dict:
+        """Tarefa periódica: o líder atualiza e publica o snapshot; os demais carregam o publicado."""
+        if self.cache.eh_lider():
+            self._atualizar_do_banco(publicar=True)
+        else:
+            self._carregar_publicado()
+        return self.ultima_atualizacao
+
+    def _carregar_publicado(self) -> bool:
+        """Substitui o snapshot local pelo publicado pelo líder, se houver um mais novo."""
+        encontrado, ultima_atualizacao, publicado_em = self.cache.get(CHAVE_PUBLICACAO)
+        if not encontrado or publicado_em == self._publicado_em:
+            return False
+        encontrado, snapshot, _ = self.cache.get_objeto(CHAVE_SNAPSHOT)
+        if not encontrado:
+            return False
+        with self._lock:
+            self._snapshot = snapshot
+            self._publicado_em = publicado_em
+            self.ultima_atualizacao = ultima_atualizacao
+        return True
+
+    def _atualizar_do_banco(self, publicar: bool):
+        """Aplica ao snapshot as alterações desde a última atualização (ou o reconstrói)."""
+        np = _carregar_numpy()
+        with self._lock:
+            inicio = time.perf_counter()
+            agora = datetime.now(timezone.utc)
+            atual = self._snapshot
+
+            reconstruir = (
+                atual is None
+                or time.time() - atual["reconstruido_em"] > settings.ANALISE_COLUNAR_RECONSTRUCAO_MINUTOS * 60
+            )
+            alterados = None
+            if not reconstruir:
+                # A margem cobre o atraso de replicação dos secundários e a diferença de relógio com o servidor
+                desde = atual["marca_dagua"] - timedelta(seconds=settings.READ_MAX_STALENESS_SEGUNDOS)
+                documentos = list(self.produtos_collection.find({"atualizado_em": {"$gte": desde}}, PROJECAO_SNAPSHOT))
+                excluidos = [item["_id"] for item in self.excluidos_collection.find({"excluido_em": {"$gte": desde}}, {"_id": 1})]
+                alterados = len(documentos) + len(excluidos)
+                novo = self._mesclar(np, atual, documentos, excluidos)
+                reconstruir = len(novo["produtos"]["codigo_lm"]) != self.produtos_collection.estimated_document_count()
+
+            if reconstruir:
+                novo = _montar_colunas(np, list(self.produtos_collection.find({}, PROJECAO_SNAPSHOT)))
+                novo["reconstruido_em"] = time.time()
+            else:
+                novo["reconstruido_em"] = atual["reconstruido_em"]
+
+            novo["marca_dagua"] = agora
+            novo["gerado_em"] = agora
+            novo["perdas_arquivadas"] = {
+                (SEM_SECAO if cod_secao is None else cod_secao): totais
+                for cod_secao, totais in self.arquivamento_service.get_perdas_por_secao().items()
+            }
+            self._snapshot = novo
+
+            self.ultima_atualizacao = {
+                "tipo": "completa" if reconstruir else "incremental",
+                "produtos_alterados": alterados,
+                "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1),
+                "gerado_em": agora.isoformat()
+            }
+            if publicar:
+                self.cache.set_objeto(CHAVE_SNAPSHOT, novo)
+                self.cache.set(CHAVE_PUBLICACAO, self.ultima_atualizacao)
+
+    @staticmethod
+    def _mesclar(np, atual: dict, documentos: list, excluidos: list) -> dict:
+        """
+        Remove das colunas os produtos relidos e os excluídos (com todos os seus lotes) e
+        acrescenta as linhas relidas; um produto excluído e recriado volta pelos relidos.
+        """
+        if not documentos and not excluidos:
+            return {"produtos": atual["produtos"], "lotes": atual["lotes"]}
+
+        novos = _montar_colunas(np, documentos)
+        codigos = np.concatenate([novos["produtos"]["codigo_lm"], np.array(excluidos, dtype=np.int64)])
+        resultado = {}
+        for tabela in ("produtos", "lotes"):
+            manter = ~np.isin(atual[tabela]["codigo_lm"], codigos)
+            resultado[tabela] = {
+                coluna: np.concatenate([valores[manter], novos[tabela][coluna]])
+                for coluna, valores in atual[tabela].items()
+            }
+        return resultado
+
+    def _obter_snapshot(self) -> dict:
+        if self._snapshot is None:
+            self.atualizar()
+        if self._snapshot is None:
+            # O líder ainda não publicou: monta um snapshot local até a primeira publicação
+            self._atualizar_do_banco(publicar=False)
+        return self._snapshot
+
+    def get_kpis(
+        self,
+        janelas_dias: Optional[List[int]] = None,
+        cod_secao: Optional[int] = None,
+        data_referencia: Optional[datetime] = None
+    ) -> KpisAnaliseColunar:
+        """
+        KPIs do dashboard a partir do snapshot, com faixas de vencimento definidas por `janelas_dias`
+        (padrão 30/60/90) e vencimentos contados a partir de `data_referencia` (padrão: agora).
+        """
+        np = _carregar_numpy()
+        janelas = sorted(set(janelas_dias or [30, 60, 90]))
+        if janelas[0] <= 0:
+            raise ValueError("As janelas devem ser números positivos de dias.")
+
+        snapshot = self._obter_snapshot()
+        produtos, lotes = snapshot["produtos"], snapshot["lotes"]
+        referencia = data_referencia or datetime.now(timezone.utc)
+
+        filtro_produtos = slice(None)
+        filtro_lotes = slice(None)
+        arquivados = snapshot["perdas_arquivadas"].values()
+        if cod_secao is not None:
+            filtro_produtos = produtos["cod_secao"] == cod_secao
+            filtro_lotes = lotes["cod_secao"] == cod_secao
+            arquivados = [snapshot["perdas_arquivadas"].get(cod_secao, {})]
+
+        reportado = produtos["estoque_reportado"][filtro_produtos]
+        preco = produtos["preco"][filtro_produtos]
+        valor_lote = lotes["valor"][filtro_lotes]
+        ativo = lotes["ativo"][filtro_lotes]
+
+        restante = lotes["validade"][filtro_lotes][ativo] - _epoch(referencia)
+        valor_ativo = valor_lote[ativo]
+        vigentes = restante >= 0
+        vencidos = restante < 0
+
+        # Índice da faixa: (limite anterior, limite], a primeira inclui o próprio dia de referência
+        limites = np.array(janelas, dtype=np.float64) * 86400
+        faixa = np.searchsorted(limites, restante[vigentes], side="left")
+        contagens = np.bincount(faixa, minlength=len(janelas) + 1)
+        valores = np.bincount(faixa, weights=valor_ativo[vigentes], minlength=len(janelas) + 1)
+
+        inicios = [0, *janelas]
+        fins = [*janelas, None]
+        faixas = [
+            FaixaVencimento(de_dias=de, ate_dias=ate, lotes=int(contagem), valor=round(float(valor), 2))
+            for de, ate, contagem, valor in zip(inicios, fins, contagens, valores)
+        ]
+
+        lotes_arquivados = sum(totais.get("lotes_arquivados", 0) for totais in arquivados)
+        lotes_perdidos_arquivados = sum(totais.get("lotes_perdidos", 0) for totais in arquivados)
+        valor_perdido_arquivado = sum(totais.get("valor_perdido", 0.0) for totais in arquivados)
+
+        return KpisAnaliseColunar(
+            gerado_em=snapshot["gerado_em"],
+            data_referencia=referencia,
+            cod_secao=cod_secao,
+            valor_total_estoque=round(float(np.nansum(preco * reportado)), 2),
+            valor_total_perdido=round(float(valor_lote[lotes["inativo"][filtro_lotes]].sum()) + valor_perdido_arquivado, 2),
+            estatisticas=EstatisticasEstoque(
+                total_produtos=len(preco),
+                total_lotes=len(valor_lote) + lotes_arquivados,
+                produtos_em_estoque=int(np.count_nonzero(reportado > 0)),
+                lotes_perdidos=int(np.count_nonzero(lotes["perdido"][filtro_lotes])) + lotes_perdidos_arquivados
+            ),
+            faixas_vencimento=faixas,
+            lotes_vencidos=int(np.count_nonzero(vencidos)),
+            valor_vencido=round(float(valor_ativo[vencidos].sum()), 2)
+        )
+
+    def get_ranking_discrepancia(
+        self,
+        tipo: str = "todas",
+        limite: int = 20,
+        cod_secao: Optional[int] = None
+    ) -> List[ItemReconciliacao]:
+        """Maiores discrepâncias entre estoque reportado e calculado, com a mesma semântica de `get_reconciliacao`."""
+        if tipo not in ("falta", "sobra", "todas"):
+            raise ValueError("Tipo deve ser 'falta', 'sobra' ou 'todas'.")
+        np = _carregar_numpy()
+        produtos = self._obter_snapshot()["produtos"]
+
+        reportado = produtos["estoque_reportado"]
+        discrepancia = np.where(np.isnan(reportado), 0, reportado - produtos["estoque_calculado"])
+        chave = {"falta": discrepancia, "sobra": -discrepancia, "todas": np.abs(discrepancia)}[tipo]
+
+        candidatos = chave > 0
+        if cod_secao is not None:
+            candidatos &= produtos["cod_secao"] == cod_secao
+        indices = np.flatnonzero(candidatos)
+
+        if len(indices) > limite:
+            indices = indices[np.argpartition(-chave[indices], limite)[:limite]]
+        indices = indices[np.argsort(-chave[indices], kind="stable")]
+
+        itens = []
+        for i in indices:
+            preco = float(produtos["preco"][i])
+            calculado = int(produtos["estoque_calculado"][i])
+            estoque_reportado = None if np.isnan(reportado[i]) else int(reportado[i])
+            cod = int(produtos["cod_secao"][i])
+            itens.append(ItemReconciliacao(
+                codigo_lm=int(produtos["codigo_lm"][i]),
+                nome_produto=produtos["nome_produto"][i],
+                cod_secao=None if cod == SEM_SECAO else cod,
+                secao=produtos["secao"][i],
+                preco_unit=preco,
+                estoque_reportado=estoque_reportado,
+                estoque_calculado=calculado,
+                discrepancia_estoque=int(discrepancia[i]),
+                valor_estoque_calculado=round(preco * calculado, 2),
+                valor_estoque_total=None if estoque_reportado is None else preco * estoque_reportado,
+                valor_discrepancia=round(preco * int(discrepancia[i]), 2)
+            ))
+        return itens
+
+    def get_status(self) -> dict:
+        """Tamanho e idade do snapshot e dados da última atualização."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"carregado": False}
+        return {
+            "carregado": True,
+            "produtos": len(snapshot["produtos"]["codigo_lm"]),
+            "lotes": len(snapshot["lotes"]["codigo_lm"]),
+            "memoria_bytes": sum(
+                coluna.nbytes for tabela in ("produtos", "lotes") for coluna in snapshot[tabela].values()
+            ),
+            "gerado_em": snapshot["gerado_em"],
+            "ultima_atualizacao": self.ultima_atualizacao
+        }
@@ -0,0 +1,200 @@
+from typing import Optional
+from pymongo.collection import Collection
+from pymongo import ReplaceOne, DESCENDING
+from datetime import datetime, timedelta, timezone
+
+from app.models.produto import LoteArquivado
+from app.database.client import get_database
+
+TAMANHO_LOTE_ARQUIVAMENTO = 500
+
+class ArquivamentoService:
+    """
+    Compactação dos documentos de produtos: move lotes inativos antigos para a coleção
+    `lotes_arquivados` e mantém, por produto, os totais de perdas já arquivadas em
+    `perdas_arquivadas` (usados pelo dashboard e pelo histórico).
+    """
+
+    def __init__(self):
+        self.db = get_database()
+        if self.db is None:
+            raise ConnectionError("Falha na conexão com o MongoDB.")
+        self.produtos_collection: Collection = self.db['produtos']
+        self.collection: Collection = self.db['lotes_arquivados']
+        self.perdas_collection: Collection = self.db['perdas_arquivadas']
+
+    def criar_indices(self):
+        """Cria os índices das coleções de arquivo e o índice de busca do job."""
+        self.collection.create_index([("codigo_lm", 1), ("codigo_lote", 1)], unique=True)
+        self.collection.create_index("codigo_lote")
+        self.collection.create_index([("arquivado_em", DESCENDING)])
+        self.produtos_collection.create_index([("lotes.ativo", 1), ("lotes.data_alteracao_status", 1)])
+
+    def arquivar_lotes_inativos(self, idade_dias: int) -> dict:
+        """
+        Move para `lotes_arquivados` os lotes inativos há mais de `idade_dias` dias.
+
+        Cada bloco de produtos é processado em três passos idempotentes: cópia dos lotes
+        para o arquivo (upsert), recálculo dos totais de perdas dos produtos afetados a
+        partir do arquivo (`$merge`) e só então remoção do array do produto (`$pull`). Uma
+        execução interrompida deixa os lotes nos produtos e é refeita por inteiro na próxima,
+        sem duplicar lotes nem totais.
+        """
+        agora = datetime.now(timezone.utc)
+        limite = agora - timedelta(days=idade_dias)
+        condicao_lote = {"ativo": False, "data_alteracao_status": {"$lt": limite}}
+
+        cursor = self.produtos_collection.find(
+            {"lotes": {"$elemMatch": condicao_lote}},
+            {
+                "_id": 0,
+                "codigo_lm": 1,
+                "nome_produto": 1,
+                "cod_secao": 1,
+                "preco_unit": 1,
+                "lotes": {
+                    "$filter": {
+                        "input": "$lotes",
+                        "as": "lote",
+                        "cond": {
+                            "$and": [
+                                {"$eq": ["$$lote.ativo", False]},
+                                {"$lt": ["$$lote.data_alteracao_status", limite]}
+                            ]
+                        }
+                    }
+                }
+            }
+        )
+
+        produtos_afetados = 0
+        lotes_arquivados = 0
+        bloco = []
+
+        for produto in cursor:
+            bloco.append(produto)
+            if len(bloco) >= TAMANHO_LOTE_ARQUIVAMENTO:
+                lotes_arquivados += self._arquivar_bloco(bloco, limite, agora)
+                produtos_afetados += len(bloco)
+                bloco = []
+
+        if bloco:
+            lotes_arquivados += self._arquivar_bloco(bloco, limite, agora)
+            produtos_afetados += len(bloco)
+
+        if lotes_arquivados:
+            print(f"Arquivamento: {lotes_arquivados} lotes inativos movidos de {produtos_afetados} produtos.")
+
+        return {"produtos_afetados": produtos_afetados, "lotes_arquivados": lotes_arquivados}
+
+    def _arquivar_bloco(self, produtos: list, limite: datetime, agora: datetime) -> int:
+        operacoes = []
+        for produto in produtos:
+            preco_unit = produto.get("preco_unit") or 0.0
+            for lote in produto.get("lotes", []):
+                operacoes.append(
+                    ReplaceOne(
+                        {"codigo_lm": produto["codigo_lm"], "codigo_lote": lote["codigo_lote"]},
+                        {
+                            **lote,
+                            "codigo_lm": produto["codigo_lm"],
+                            "nome_produto": produto.get("nome_produto"),
+                            "cod_secao": produto.get("cod_secao"),
+                            "valor_perdido": round(preco_unit * (lote.get("quantidade_lote") or 0), 2),
+                            "arquivado_em": agora
+                        },
+                        upsert=True
+                    )
+                )
+
+        if not operacoes:
+            return 0
+
+        self.collection.bulk_write(operacoes, ordered=False)
+
+        codigos = [produto["codigo_lm"] for produto in produtos]
+        self.collection.aggregate([
+            {"$match": {"codigo_lm": {"$in": codigos}}},
+            {
+                "$group": {
+                    "_id": "$codigo_lm",
+                    "cod_secao": {"$last": "$cod_secao"},
+                    "lotes_arquivados": {"$sum": 1},
+                    "lotes_perdidos": {
+                        "$sum": {"$cond": [{"$ne": ["$motivo_inativacao", "consumido"]}, 1, 0]}
+                    },
+                    "valor_perdido": {"$sum": "$valor_perdido"}
+                }
+            },
+            {"$merge": {"into": self.perdas_collection.name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ])
+
+        self.produtos_collection.update_many(
+            {"codigo_lm": {"$in": codigos}},
+            {
+                "$pull": {"lotes": {"ativo": False, "data_alteracao_status": {"$lt": limite}}},
+                "$currentDate": {"atualizado_em": True}
+            }
+        )
+
+        return len(operacoes)
+
+    def get_totais_perdas(self) -> dict:
+        """Totais de lotes e perdas já arquivados (somados aos KPIs dos lotes em produtos)."""
+        resultado = next(self.perdas_collection.aggregate([
+            {
+                "$group": {
+                    "_id": None,
+                    "lotes_arquivados": {"$sum": "$lotes_arquivados"},
+                    "lotes_perdidos": {"$sum": "$lotes_perdidos"},
+                    "valor_perdido": {"$sum": "$valor_perdido"}
+                }
+            }
+        ]), {})
+        return {
+            "lotes_arquivados": resultado.get("lotes_arquivados", 0),
+            "lotes_perdidos": resultado.get("lotes_perdidos", 0),
+            "valor_perdido": resultado.get("valor_perdido", 0.0)
+        }
+
+    def get_perdas_por_secao(self, cod_secoes: Optional[list] = None) -> dict:
+        """Totais de lotes e perdas arquivados por seção (`cod_secao` -> totais), opcionalmente restritos às seções informadas."""
+        pipeline = []
+        if cod_secoes is not None:
+            pipeline.append({"$match": {"cod_secao": {"$in": cod_secoes}}})
+        pipeline.append({
+            "$group": {
+                "_id": "$cod_secao",
+                "lotes_arquivados": {"$sum": "$lotes_arquivados"},
+                "lotes_perdidos": {"$sum": "$lotes_perdidos"},
+                "valor_perdido": {"$sum": "$valor_perdido"}
+            }
+        })
+        return {resultado.pop("_id"): resultado for resultado in self.perdas_collection.aggregate(pipeline)}
+
+    def get_lotes_arquivados(
+        self,
+        codigo_lm: Optional[int] = None,
+        codigo_lote: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50
+    ) -> dict:
+        """Consulta os lotes arquivados, dos mais recentemente arquivados para os mais antigos."""
+        query = {}
+        if codigo_lm is not None:
+            query["codigo_lm"] = codigo_lm
+        if codigo_lote is not None:
+            query["codigo_lote"] = codigo_lote
+
+        total = self.collection.count_documents(query)
+        cursor = self.collection.find(query, {"_id": 0}).sort("arquivado_em", DESCENDING).skip(skip)
+
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        return {
+            "items": [LoteArquivado(**data) for data in cursor],
+            "total": total,
+            "skip": skip,
+            "limit": limit
+        }
@@ -1,10 +1,20 @@
-from typing import List, Optional, Tuple
+import threading
+import uuid
+from typing import List, Optional
 from pymongo.collection import Collection
+from pymongo import UpdateOne
 from bson import ObjectId
-import re
-import unicodedata
 from app.database.client import get_database
+from app.configs.config import settings
 from app.models.base_conhecimento import BaseConhecimento, ConhecimentoMatch
+from app.services import busca_bm25
+from app.services.busca_bm25 import IndiceBM25
+from app.services.visualizacoes_buffer import buffer_visualizacoes
+from app.services.cache_lru import CacheLRU
+from app.services.cache_compartilhado import cache_compartilhado
+
+# Versão da base publicada a cada escrita, para que os demais workers descartem índice e respostas locais
+CHAVE_VERSAO_BASE = "base_conhecimento_versao"
 
 class BaseConhecimentoService:
     def __init__(self):
@@ -12,6 +22,14 @@ class BaseConhecimentoService:
         if self.db is None:
             raise ConnectionError("Falha na conexão com o MongoDB.")
         self.collection: Collection = self.db['base_conhecimento']
+        self.cache_respostas = CacheLRU(settings.CACHE_RESPOSTAS_TAMANHO)
+        self._indice: Optional[IndiceBM25] = None
+        self._versao = 0
+        self._versao_publicada: Optional[str] = None
+        self._lock_indice = threading.Lock()
+    
+    def criar_indices(self):
+        """Cria os índices da coleção (executado uma vez na inicialização)."""
         self.collection.create_index("titulo", unique=True)
         
     def get_all(self, apenas_ativos: bool = True) -> List[BaseConhecimento]:
@@ -35,9 +53,11 @@ class BaseConhecimentoService:
             raise ValueError("Item com este título já existe.")
         
         conhecimento_data = conhecimento.model_dump(exclude={"id"})
+        conhecimento_data["busca"] = self._campos_busca(conhecimento)
         
         result = self.collection.insert_one(conhecimento_data)
         conhecimento.id = str(result.inserted_id)
+        self._invalidar_busca()
         
         return conhecimento
 
@@ -58,6 +78,7 @@ class BaseConhecimentoService:
         """Atualiza um item existente pelo ID."""        
         try:
             update_data = conhecimento.model_dump(exclude_none=True, exclude={'id'})
+            update_data["busca"] = self._campos_busca(conhecimento)
             
             result = self.collection.update_one(
                 {"_id": ObjectId(id)},
@@ -65,6 +86,7 @@ class BaseConhecimentoService:
             )
             
             if result.modified_count == 1:
+                self._invalidar_busca()
                 return self.get_by_id(id)
         except Exception:
             return None
@@ -78,125 +100,144 @@ class BaseConhecimentoService:
                 {"_id": ObjectId(id)},
                 {"$set": {"ativo": False}}
             )
-            return result.modified_count == 1
+            if result.modified_count == 1:
+                self._invalidar_busca()
+                return True
+            return False
         except Exception:
             return False
     
     def normalizar_texto(self, texto: str) -> str:
         """Normaliza o texto para facilitar a comparação de similaridade."""
-        # Remove acentos
-        texto = ''.join(
-            c for c in unicodedata.normalize('NFD', texto)
-            if unicodedata.category(c) != 'Mn'
-        )
-        
-        # Lowercase e remove pontuação
-        texto = re.sub(r'[^\w\s]', ' ', texto.lower())
-        
-        # Remove espaços extras
-        texto = ' '.join(texto.split())
-        
-        return texto
+        return busca_bm25.normalizar_texto(texto)
     
     def extrair_palavras(self, texto: str) -> List[str]:
         """Extrai palavras relevantes do texto, removendo stopwords comuns."""
-        stopwords = {
-            'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das',
-            'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob',
-            'e', 'ou', 'mas', 'que', 'qual', 'quais', 'como', 'quando', 'onde',
-            'é', 'são', 'está', 'estão', 'ser', 'estar', 'ter', 'fazer', 'mais',
-            'menos', 'muito', 'pouco', 'todo', 'toda', 'isso', 'esse', 'aquele'
-        }
-        
-        texto_normalizado = self.normalizar_texto(texto)
-        palavras = texto_normalizado.split()
-        
-        # Filtra stopwords e palavras muito curtas
-        palavras_relevantes = [
-            p for p in palavras 
-            if p not in stopwords and len(p) > 2
-        ]
-        
-        return palavras_relevantes
+        return busca_bm25.extrair_palavras(texto)
     
-    def calcular_score(self, mensagem: str, conhecimento: BaseConhecimento) -> Tuple[float, List[str]]:
-        """Calcula o score de similaridade entre a mensagem e o item da base de conhecimento."""
-        palavras_mensagem = set(self.extrair_palavras(mensagem))
-        
-        if not palavras_mensagem:
-            return 0.0, []
-        
-        # Normaliza título e keywords
-        titulo_normalizado = self.normalizar_texto(conhecimento.titulo)
-        keywords_normalizadas = [self.normalizar_texto(k) for k in conhecimento.keywords]
-        
-        # Calcula matches
-        matches_titulo = set()
-        matches_keywords = set()
-        
-        for palavra in palavras_mensagem:
-            # Match exato no título (peso maior)
-            if palavra in titulo_normalizado:
-                matches_titulo.add(palavra)
-            
-            # Match nas keywords
-            for keyword in keywords_normalizadas:
-                if palavra in keyword or keyword in palavra:
-                    matches_keywords.add(palavra)
-        
-        # Calcula score ponderado
-        peso_titulo = 2.0
-        peso_keyword = 1.5
+    def _campos_busca(self, conhecimento: BaseConhecimento) -> dict:
+        """Campos normalizados gravados no documento para o ranking (calculados na escrita)."""
+        return busca_bm25.campos_busca(conhecimento.titulo, conhecimento.keywords, conhecimento.resposta)
+    
+    def _invalidar_busca(self):
+        """Descarta o índice e as respostas em cache após uma escrita e publica a nova versão aos demais workers."""
+        versao_publicada = uuid.uuid4().hex
+        cache_compartilhado.set(CHAVE_VERSAO_BASE, versao_publicada)
+        self._invalidar_local(versao_publicada)
+    
+    def _invalidar_local(self, versao_publicada: Optional[str]):
+        with self._lock_indice:
+            self._versao += 1
+            self._indice = None
+            self._versao_publicada = versao_publicada
+        self.cache_respostas.invalidar()
+    
+    def _sincronizar_versao(self):
+        """Descarta o índice e as respostas locais se outro worker escreveu na base desde a última verificação."""
+        _, versao_publicada, _ = cache_compartilhado.get(CHAVE_VERSAO_BASE)
+        if versao_publicada != self._versao_publicada:
+            self._invalidar_local(versao_publicada)
+    
+    def _get_indice(self) -> IndiceBM25:
+        """
+        Monta o índice BM25 a partir dos campos normalizados já gravados.
+        
+        Documentos antigos, ainda sem o campo `busca`, são normalizados uma única vez
+        e atualizados no banco.
+        """
+        self._sincronizar_versao()
+        indice = self._indice
+        if indice is not None:
+            return indice
+        
+        with self._lock_indice:
+            if self._indice is not None:
+                return self._indice
+            versao = self._versao
+        
+        documentos = {}
+        operacoes_bulk = []
+        cursor = self.collection.find(
+            {"ativo": True},
+            {"busca": 1, "titulo": 1, "keywords": 1, "resposta": 1}
+        )
         
-        score_titulo = len(matches_titulo) * peso_titulo
-        score_keywords = len(matches_keywords) * peso_keyword
+        for data in cursor:
+            campos = data.get("busca")
+            if campos is None:
+                campos = busca_bm25.campos_busca(
+                    data.get("titulo", ""), data.get("keywords", []), data.get("resposta", "")
+                )
+                operacoes_bulk.append(UpdateOne({"_id": data["_id"]}, {"$set": {"busca": campos}}))
+            documentos[str(data["_id"])] = campos
+        
+        if operacoes_bulk:
+            self.collection.bulk_write(operacoes_bulk, ordered=False)
+        
+        indice = IndiceBM25(documentos)
+        with self._lock_indice:
+            # Só publica o índice se nenhuma escrita ocorreu durante a montagem
+            if self._versao == versao:
+                self._indice = indice
+        return indice
+    
+    def buscar_resposta(self, mensagem: str, min_score: float = 30.0, max_resultados: int = 3) -> List[ConhecimentoMatch]:
+        """Busca respostas na base de conhecimento ranqueadas por BM25 com tolerância a erros de digitação."""
+        palavras = self.extrair_palavras(mensagem)
         
-        score_total = score_titulo + score_keywords
+        if not palavras:
+            return []
         
-        # Normaliza score para 0-100
-        max_possible_score = len(palavras_mensagem) * peso_titulo
-        score_normalizado = min(100, (score_total / max_possible_score) * 100) if max_possible_score > 0 else 0
+        chave_cache = (frozenset(palavras), min_score, max_resultados)
+        self._sincronizar_versao()
+        versao = self._versao
+        encontrado, em_cache = self.cache_respostas.get(chave_cache)
+        if encontrado:
+            return [resultado.model_copy(deep=True) for resultado in em_cache]
         
-        # Bonus se todas as palavras importantes tiveram match
-        if len(matches_titulo.union(matches_keywords)) == len(palavras_mensagem):
-            score_normalizado = min(100, score_normalizado * 1.2)
+        ranking = [
+            (doc_id, score, matches)
+            for doc_id, score, matches in self._get_indice().buscar(palavras)
+            if score >= min_score
+        ][:max_resultados]
         
-        palavras_matched = list(matches_titulo.union(matches_keywords))
+        if not ranking:
+            return []
         
-        return round(score_normalizado, 2), palavras_matched
-    
-    def buscar_resposta(self, mensagem: str, min_score: float = 30.0, max_resultados: int = 3) -> List[ConhecimentoMatch]:
-        """Busca respostas na base de conhecimento que correspondem à mensagem."""
-        items = self.get_all(apenas_ativos=True)
+        documentos = {
+            str(data["_id"]): data
+            for data in self.collection.find(
+                {"_id": {"$in": [ObjectId(doc_id) for doc_id, _, _ in ranking]}},
+                {"busca": 0}
+            )
+        }
         
         resultados = []
-        
-        for item in items:
-            score, matches = self.calcular_score(mensagem, item)
-            
-            if score >= min_score:
-                resultados.append(ConhecimentoMatch(
-                    conhecimento=item,
-                    score=score,
-                    matches=matches
-                ))
-        
-        resultados.sort(key=lambda x: x.score, reverse=True)
-        
-        return resultados[:max_resultados]
+        for doc_id, score, matches in ranking:
+            data = documentos.get(doc_id)
+            if not data:
+                continue
+            data["id"] = str(data.pop("_id"))
+            resultados.append(ConhecimentoMatch(
+                conhecimento=BaseConhecimento(**data),
+                score=score,
+                matches=matches
+            ))
+        
+        if self._versao == versao:
+            self.cache_respostas.set(chave_cache, [resultado.model_copy(deep=True) for resultado in resultados])
+        return resultados
+    
+    def get_estatisticas_cache(self) -> dict:
+        """Retorna os contadores de hit/miss do cache de respostas."""
+        return self.cache_respostas.estatisticas()
     
     def incrementar_visualizacao(self, id: str) -> bool:
-        """Incrementa contador de visualizações"""
-        try:
-            result = self.collection.update_one(
-                {"_id": ObjectId(id)},
-                {
-                    "$inc": {"visualizacoes": 1}
-                }
-            )
-            return result.modified_count == 1
-        except Exception:
+        """Registra uma visualização; a gravação no banco é feita em lote pelo flush periódico."""
+        if not ObjectId.is_valid(id):
             return False
+        buffer_visualizacoes.registrar(id)
+        return True
     
     def get_melhor_resposta(self, mensagem: str) -> Optional[ConhecimentoMatch]:
         """Obtém a melhor resposta para a mensagem dada."""
@@ -0,0 +1,173 @@
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+STOPWORDS = {
+    'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das',
+    'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob',
+    'e', 'ou', 'mas', 'que', 'qual', 'quais', 'como', 'quando', 'onde',
+    'é', 'são', 'está', 'estão', 'ser', 'estar', 'ter', 'fazer', 'mais',
+    'menos', 'muito', 'pouco', 'todo', 'toda', 'isso', 'esse', 'aquele'
+}
+
+def normalizar_texto(texto: str) -> str:
+    """Remove acentos e pontuação, converte para minúsculas e compacta espaços."""
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    )
+    texto = re.sub(r'[^\w\s]', ' ', texto.lower())
+    return ' '.join(texto.split())
+
+def extrair_palavras(texto: str) -> List[str]:
+    """Extrai palavras relevantes do texto, removendo stopwords e palavras muito curtas."""
+    return [
+        p for p in normalizar_texto(texto).split()
+        if p not in STOPWORDS and len(p) > 2
+    ]
+
+def campos_busca(titulo: str, keywords: List[str], resposta: str) -> Dict[str, List[str]]:
+    """Campos normalizados gravados junto ao documento para o ranking BM25."""
+    return {
+        "titulo": extrair_palavras(titulo),
+        "keywords": [p for k in keywords for p in extrair_palavras(k)],
+        "resposta": extrair_palavras(resposta),
+    }
+
+def trigramas(palavra: str) -> Set[str]:
+    """Trigramas da palavra com bordas marcadas (ex.: '  ve', ' ven', ..., 'to ')."""
+    marcada = f"  {palavra} "
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+class IndiceBM25:
+    """
+    Índice invertido em memória com ranking BM25F sobre título, keywords e resposta.
+
+    Termos da consulta ausentes do vocabulário são expandidos para, no máximo,
+    `max_candidatos` termos parecidos encontrados pelo índice de trigramas, o que
+    tolera erros de digitação ("vencimeto", "fornecdor") sem varrer a base.
+    """
+
+    PESOS = {"titulo": 2.0, "keywords": 1.5, "resposta": 1.0}
+
+    def __init__(
+        self,
+        documentos: Dict[str, Dict[str, List[str]]],
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_candidatos: int = 3,
+        similaridade_minima: float = 0.45
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_candidatos = max_candidatos
+        self.similaridade_minima = similaridade_minima
+        self.total_documentos = len(documentos)
+
+        postings = defaultdict(lambda: defaultdict(dict))
+        self.tamanhos: Dict[str, Dict[str, int]] = {}
+        soma_tamanhos = defaultdict(int)
+
+        for doc_id, campos in documentos.items():
+            self.tamanhos[doc_id] = {}
+            for campo in self.PESOS:
+                tokens = campos.get(campo, [])
+                self.tamanhos[doc_id][campo] = len(tokens)
+                soma_tamanhos[campo] += len(tokens)
+                for token in tokens:
+                    frequencias = postings[token][doc_id]
+                    frequencias[campo] = frequencias.get(campo, 0) + 1
+
+        self.postings: Dict[str, Dict[str, Dict[str, int]]] = {
+            termo: dict(docs) for termo, docs in postings.items()
+        }
+
+        self.tamanho_medio = {
+            campo: (soma_tamanhos[campo] / self.total_documentos) if self.total_documentos else 0.0
+            for campo in self.PESOS
+        }
+
+        self.indice_trigramas: Dict[str, Set[str]] = defaultdict(set)
+        for termo in self.postings:
+            for trigrama in trigramas(termo):
+                self.indice_trigramas[trigrama].add(termo)
+
+    def idf(self, termo: str) -> float:
+        df = len(self.postings.get(termo, {}))
+        return math.log(1 + (self.total_documentos - df + 0.5) / (df + 0.5))
+
+    def expandir(self, palavra: str) -> List[Tuple[str, float]]:
+        """Retorna o próprio termo ou até `max_candidatos` termos similares com sua similaridade."""
+        if palavra in self.postings:
+            return [(palavra, 1.0)]
+
+        trigramas_palavra = trigramas(palavra)
+        compartilhados = defaultdict(int)
+        for trigrama in trigramas_palavra:
+            for termo in self.indice_trigramas.get(trigrama, ()):
+                compartilhados[termo] += 1
+
+        candidatos = []
+        for termo, comuns in compartilhados.items():
+            similaridade = comuns / (len(trigramas_palavra) + len(trigramas(termo)) - comuns)
+            if similaridade >= self.similaridade_minima:
+                candidatos.append((termo, similaridade))
+
+        candidatos.sort(key=lambda c: c[1], reverse=True)
+        return candidatos[:self.max_candidatos]
+
+    def _tf_ponderado(self, doc_id: str, frequencias: Dict[str, int]) -> float:
+        total = 0.0
+        for campo, tf in frequencias.items():
+            medio = self.tamanho_medio[campo] or 1.0
+            normalizacao = 1 - self.b + self.b * (self.tamanhos[doc_id][campo] / medio)
+            total += self.PESOS[campo] * tf / normalizacao
+        return total
+
+    def buscar(self, palavras: List[str]) -> List[Tuple[str, float, List[str]]]:
+        """
+        Ranqueia os documentos para as palavras (já normalizadas) da consulta.
+
+        Returns:
+            Lista de (id, score 0-100, palavras da consulta com match), ordenada por score.
+        """
+        palavras = list(dict.fromkeys(palavras))
+        if not palavras or not self.total_documentos:
+            return []
+
+        idf_maximo = math.log(1 + (self.total_documentos + 0.5) / 0.5)
+        tf_ideal = self.PESOS["titulo"]
+        saturacao_ideal = tf_ideal / (self.k1 + tf_ideal)
+
+        scores = defaultdict(float)
+        matches = defaultdict(set)
+        score_ideal = 0.0
+
+        for palavra in palavras:
+            expansoes = self.expandir(palavra)
+            score_ideal += (max((self.idf(t) for t, _ in expansoes), default=idf_maximo)) * saturacao_ideal
+
+            melhor_por_doc = {}
+            for termo, similaridade in expansoes:
+                idf = self.idf(termo)
+                for doc_id, frequencias in self.postings[termo].items():
+                    tf = self._tf_ponderado(doc_id, frequencias)
+                    score = similaridade * idf * tf / (self.k1 + tf)
+                    if score > melhor_por_doc.get(doc_id, 0.0):
+                        melhor_por_doc[doc_id] = score
+
+            for doc_id, score in melhor_por_doc.items():
+                scores[doc_id] += score
+                matches[doc_id].add(palavra)
+
+        resultados = []
+        for doc_id, score in scores.items():
+            normalizado = min(100.0, (score / score_ideal) * 100) if score_ideal > 0 else 0.0
+            if len(matches[doc_id]) == len(palavras):
+                normalizado = min(100.0, normalizado * 1.2)
+            resultados.append((doc_id, round(normalizado, 2), sorted(matches[doc_id])))
+
+        resultados.sort(key=lambda r: r[1], reverse=True)
+        return resultados
@@ -0,0 +1,133 @@
+import json
+import os
+import pickle
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from app.configs.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+def _tentar_lock_exclusivo(arquivo) -> bool:
+    """Tenta obter, sem bloquear, um lock exclusivo sobre o arquivo aberto."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+class CacheCompartilhado:
+    """
+    Cache em arquivos locais compartilhado entre os workers de um mesmo host.
+
+    Cada chave é um arquivo JSON com o valor e o instante de geração; a escrita é feita em
+    arquivo temporário seguido de `os.replace`, então leitores nunca veem um valor parcial.
+    Os valores precisam ser serializáveis em JSON; objetos grandes (como arrays NumPy) usam
+    `set_objeto`/`get_objeto`, gravados com pickle no mesmo diretório, que só os workers escrevem.
+    """
+
+    def __init__(self, diretorio: str):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._arquivo_lider = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._apos_fork)
+
+    def _apos_fork(self):
+        # O lock herdado pertence ao processo pai; o filho disputa a liderança normalmente
+        self._arquivo_lider = None
+
+    def _caminho(self, chave: str, extensao: str = "json") -> Path:
+        return self.diretorio / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', chave)}.{extensao}"
+
+    def _gravar(self, caminho: Path, dados: bytes):
+        """Grava em arquivo temporário e o move sobre `caminho`, sem expor valores parciais."""
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except Exception:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+
+    def get(self, chave: str, max_idade_segundos: Optional[float] = None) -> Tuple[bool, Any, Optional[float]]:
+        """Retorna (encontrado, valor, gerado_em); entradas mais antigas que `max_idade_segundos` são ignoradas."""
+        try:
+            with open(self._caminho(chave), "r", encoding="utf-8") as arquivo:
+                conteudo = json.load(arquivo)
+        except (FileNotFoundError, ValueError):
+            return False, None, None
+
+        gerado_em = conteudo.get("gerado_em", 0.0)
+        if max_idade_segundos is not None and time.time() - gerado_em > max_idade_segundos:
+            return False, None, gerado_em
+        return True, conteudo.get("valor"), gerado_em
+
+    def set(self, chave: str, valor: Any):
+        conteudo = {"gerado_em": time.time(), "valor": valor}
+        self._gravar(self._caminho(chave), json.dumps(conteudo, default=str).encode("utf-8"))
+
+    def get_objeto(self, chave: str) -> Tuple[bool, Any, Optional[float]]:
+        """Como `get`, para valores gravados com `set_objeto`."""
+        try:
+            with open(self._caminho(chave, "pkl"), "rb") as arquivo:
+                conteudo = pickle.load(arquivo)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None, None
+        return True, conteudo["valor"], conteudo["gerado_em"]
+
+    def set_objeto(self, chave: str, valor: Any):
+        conteudo = {"gerado_em": time.time(), "valor": valor}
+        self._gravar(self._caminho(chave, "pkl"), pickle.dumps(conteudo, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def remover(self, chave: str):
+        try:
+            os.remove(self._caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    def remover_prefixo(self, prefixo: str) -> int:
+        """Remove todas as chaves que começam com `prefixo`; retorna a quantidade removida."""
+        removidas = 0
+        for caminho in self.diretorio.glob(f"{re.sub(r'[^A-Za-z0-9_.-]', '_', prefixo)}*.json"):
+            try:
+                caminho.unlink()
+                removidas += 1
+            except FileNotFoundError:
+                pass
+        return removidas
+
+    def eh_lider(self) -> bool:
+        """
+        Indica se este processo é o líder entre os workers do host.
+
+        O líder é o processo que mantém o lock exclusivo de `lider.lock`; o lock é liberado
+        pelo sistema operacional quando o processo termina e outro worker assume na próxima tentativa.
+        """
+        if self._arquivo_lider is not None:
+            return True
+
+        arquivo = open(self.diretorio / "lider.lock", "a+")
+        if _tentar_lock_exclusivo(arquivo):
+            self._arquivo_lider = arquivo
+            print(f"Worker {os.getpid()} assumiu a liderança do cache compartilhado.")
+            return True
+
+        arquivo.close()
+        return False
+
+cache_compartilhado = CacheCompartilhado(settings.CACHE_COMPARTILHADO_DIR)
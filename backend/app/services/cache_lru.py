@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+class CacheLRU:
+    """Cache LRU limitado, seguro para uso a partir do threadpool das rotas síncronas."""
+
+    def __init__(self, capacidade: int):
+        self.capacidade = capacidade
+        self._itens: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave: Hashable) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor) e atualiza os contadores de hit/miss."""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return True, self._itens[chave]
+            self.misses += 1
+            return False, None
+
+    def set(self, chave: Hashable, valor: Any):
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, condicao: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Remove todas as entradas, ou apenas as chaves que satisfazem `condicao`."""
+        with self._lock:
+            if condicao is None:
+                removidas = len(self._itens)
+                self._itens.clear()
+                return removidas
+            chaves = [chave for chave in self._itens if condicao(chave)]
+            for chave in chaves:
+                del self._itens[chave]
+            return len(chaves)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / total, 4) if total else 0.0,
+                "tamanho": len(self._itens),
+                "capacidade": self.capacidade
+            }
@@ -0,0 +1,69 @@
+from typing import Optional
+from fastapi import HTTPException, Request, status
+
+from app.bot.chat_service import ChatBot
+from app.services.alerta_service import AlertaService
+from app.services.analise_colunar import AnaliseColunar
+from app.services.arquivamento_service import ArquivamentoService
+from app.services.base_conhecimento_service import BaseConhecimentoService
+from app.services.dashboard_service import DashboardService
+from app.services.fornecedor_service import FornecedorService
+from app.services.historico_service import HistoricoService
+from app.services.kpis_compartilhados import KpisCompartilhados
+from app.services.cache_compartilhado import cache_compartilhado
+from app.configs.config import settings
+from app.services.produto_service import ProdutoService
+from app.services.visualizacoes_buffer import buffer_visualizacoes
+
+class ServiceContainer:
+    """
+    Instâncias de serviço compartilhadas pela aplicação, criadas uma única vez no `lifespan`.
+
+    Os serviços guardam apenas referências às coleções (thread-safe no PyMongo) e estado
+    protegido por lock, podendo ser usados em paralelo pelo threadpool das rotas síncronas.
+    """
+
+    def __init__(self):
+        self.fornecedor_service = FornecedorService()
+        self.produto_service = ProdutoService(fornecedor_service=self.fornecedor_service)
+        self.arquivamento_service = ArquivamentoService()
+        self.dashboard_service = DashboardService(arquivamento_service=self.arquivamento_service)
+        self.kpis_compartilhados = KpisCompartilhados(
+            self.dashboard_service,
+            cache_compartilhado,
+            validade_segundos=settings.KPIS_CACHE_SEGUNDOS * 2
+        )
+        self.analise_colunar = AnaliseColunar(cache_compartilhado, self.arquivamento_service) if settings.ANALISE_COLUNAR_ATIVA else None
+        self.historico_service = HistoricoService()
+        self.alerta_service = AlertaService()
+        self.base_conhecimento_service = BaseConhecimentoService()
+        self.chat_bot = ChatBot(self)
+
+    def criar_indices(self):
+        """Cria coleções e índices de todos os serviços (uma vez por inicialização)."""
+        for service in (
+            self.fornecedor_service,
+            self.produto_service,
+            self.historico_service,
+            self.alerta_service,
+            self.arquivamento_service,
+            self.base_conhecimento_service,
+        ):
+            service.criar_indices()
+
+    def fechar(self):
+        """Grava o estado pendente antes do encerramento da aplicação."""
+        try:
+            buffer_visualizacoes.flush()
+        except Exception as e:
+            print(f"Erro ao gravar visualizações pendentes: {e}")
+
+def get_services(request: Request) -> ServiceContainer:
+    """Dependência que retorna o container de serviços da aplicação."""
+    services: Optional[ServiceContainer] = getattr(request.app.state, "services", None)
+    if services is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Falha na conexão com o MongoDB."
+        )
+    return services
@@ -1,4 +1,5 @@
-from typing import List
+import time
+from typing import List, Optional
 from pymongo.collection import Collection
 from datetime import datetime, timedelta
 
@@ -6,24 +7,193 @@ from app.models.dashboard import (
     DashboardData, 
     ValorRiscoVencimento,
     StatusLotesDistribuicao,
+    StatusLotesProduto,
     ProdutoVencimentoProximo,
     ProdutoFaltanteLote,
-    EstatisticasEstoque
+    EstatisticasEstoque,
+    KpisSecao,
+    KpisSubsecao
 )
+from app.configs.config import settings
 from app.database.client import get_database
+from app.services.arquivamento_service import ArquivamentoService
+from app.services.cache_compartilhado import CacheCompartilhado, cache_compartilhado
+
+PREFIXO_CACHE_KPIS_SECAO = "kpis_secao_"
+PREFIXO_INVALIDACAO_KPIS_SECAO = "invalidacao_kpis_secao_"
+CHAVE_INVALIDACAO_KPIS_SECOES = "invalidacao_kpis_secoes"
+
+def chave_cache_kpis_secao(cod_secao: Optional[int]) -> str:
+    """Chave do cache compartilhado com os KPIs de uma seção (invalidada pelas escritas nos produtos da seção)."""
+    return f"{PREFIXO_CACHE_KPIS_SECAO}{cod_secao if cod_secao is not None else 'sem_secao'}"
+
+def chave_invalidacao_kpis_secao(cod_secao: Optional[int]) -> str:
+    """Chave com o instante da última invalidação dos KPIs de uma seção."""
+    return f"{PREFIXO_INVALIDACAO_KPIS_SECAO}{cod_secao if cod_secao is not None else 'sem_secao'}"
+
+def invalidar_kpis_secoes(cache: CacheCompartilhado, cod_secoes: Optional[list] = None):
+    """
+    Invalida os KPIs em cache das seções informadas (ou de todas, se None).
+
+    O instante da invalidação é registrado antes da remoção: um cálculo iniciado antes dele
+    pode ter lido dados anteriores à escrita e, ao terminar, não é gravado no cache.
+    """
+    if cod_secoes is None:
+        cache.set(CHAVE_INVALIDACAO_KPIS_SECOES, None)
+        cache.remover_prefixo(PREFIXO_CACHE_KPIS_SECAO)
+        return
+    for cod_secao in set(cod_secoes):
+        cache.set(chave_invalidacao_kpis_secao(cod_secao), None)
+        cache.remover(chave_cache_kpis_secao(cod_secao))
 
 class DashboardService:
     """Serviço para cálculo de KPIs e métricas do dashboard."""
     
-    def __init__(self):
-        self.db = get_database()
+    def __init__(
+        self,
+        arquivamento_service: Optional[ArquivamentoService] = None,
+        cache: Optional[CacheCompartilhado] = None
+    ):
+        # Somente leituras analíticas: seguem a read preference do perfil "dashboard"
+        self.db = get_database("dashboard")
         if self.db is None:
             raise ConnectionError("Falha na conexão com o MongoDB.")
         self.produtos_collection: Collection = self.db['produtos']
+        # Recálculos disparados por uma escrita precisam enxergá-la: leem do primário
+        self.produtos_primario: Collection = get_database()['produtos']
+        self.arquivamento_service = arquivamento_service or ArquivamentoService()
+        self.cache = cache or cache_compartilhado
     
-    def get_dashboard_kpis(self) -> DashboardData:
+    @staticmethod
+    def _acumuladores_lotes(now: datetime, now_plus_30: datetime, now_plus_60: datetime, now_plus_90: datetime) -> dict:
+        """
+        Acumuladores de `$group` dos KPIs de lotes (perdas, faixas de vencimento e valor em risco),
+        aplicados a documentos com `lotes` desagregado e os campos `validade` e `valor_lote`.
+        """
+        return {
+            "total_lotes": { "$sum": 1 },
+            "lotes_perdidos": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", False] },
+                                { "$ne": ["$lotes.motivo_inativacao", "consumido"] }
+                            ]
+                        },
+                        1, 0
+                    ]
+                }
+            },
+            "valor_perdido": {
+                "$sum": { "$cond": [{ "$eq": ["$lotes.ativo", False] }, "$valor_lote", 0] }
+            },
+            # Contagem para gráfico pizza
+            "lotes_30_dias": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gte": ["$validade", now] },
+                                { "$lte": ["$validade", now_plus_30] }
+                            ]
+                        },
+                        1, 0
+                    ]
+                }
+            },
+            "lotes_60_dias": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gt": ["$validade", now_plus_30] },
+                                { "$lte": ["$validade", now_plus_60] }
+                            ]
+                        },
+                        1, 0
+                    ]
+                }
+            },
+            "lotes_90_dias": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gt": ["$validade", now_plus_60] },
+                                { "$lte": ["$validade", now_plus_90] }
+                            ]
+                        },
+                        1, 0
+                    ]
+                }
+            },
+            "lotes_acima_90": { 
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gt": ["$validade", now_plus_90] }
+                            ]
+                        },
+                        1, 0
+                    ]
+                }
+            },
+            "risco_0_30": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gte": ["$validade", now] },
+                                { "$lte": ["$validade", now_plus_30] }
+                            ]
+                        },
+                        "$valor_lote", 0
+                    ]
+                }
+            },
+            "risco_31_60": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gt": ["$validade", now_plus_30] },
+                                { "$lte": ["$validade", now_plus_60] }
+                            ]
+                        },
+                        "$valor_lote", 0
+                    ]
+                }
+            },
+            "risco_61_90": {
+                "$sum": {
+                    "$cond": [
+                        {
+                            "$and": [
+                                { "$eq": ["$lotes.ativo", True] },
+                                { "$gt": ["$validade", now_plus_60] },
+                                { "$lte": ["$validade", now_plus_90] }
+                            ]
+                        },
+                        "$valor_lote", 0
+                    ]
+                }
+            }
+        }
+
+    def get_dashboard_kpis(self, primario: bool = False) -> DashboardData:
         """
         Calcula todos os KPIs do dashboard em uma única agregação otimizada.
+
+        Args:
+            primario: Lê do primário em vez do perfil "dashboard" (recálculo após uma alteração).
         
         Returns:
             DashboardData: Objeto com todos os KPIs calculados
@@ -65,111 +235,7 @@ class DashboardService:
                         {
                             "$group": {
                                 "_id": None,
-                                "total_lotes": { "$sum": 1 },
-                                "lotes_perdidos": {
-                                    "$sum": { "$cond": [{ "$eq": ["$lotes.ativo", False] }, 1, 0] }
-                                },
-                                "valor_perdido": {
-                                    "$sum": { "$cond": [{ "$eq": ["$lotes.ativo", False] }, "$valor_lote", 0] }
-                                },
-                                # Contagem para gráfico pizza
-                                "lotes_30_dias": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gte": ["$validade", now] },
-                                                    { "$lte": ["$validade", now_plus_30] }
-                                                ]
-                                            },
-                                            1, 0
-                                        ]
-                                    }
-                                },
-                                "lotes_60_dias": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gt": ["$validade", now_plus_30] },
-                                                    { "$lte": ["$validade", now_plus_60] }
-                                                ]
-                                            },
-                                            1, 0
-                                        ]
-                                    }
-                                },
-                                "lotes_90_dias": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gt": ["$validade", now_plus_60] },
-                                                    { "$lte": ["$validade", now_plus_90] }
-                                                ]
-                                            },
-                                            1, 0
-                                        ]
-                                    }
-                                },
-                                "lotes_acima_90": { 
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gt": ["$validade", now_plus_90] }
-                                                ]
-                                            },
-                                            1, 0
-                                        ]
-                                    }
-                                },
-                                "risco_0_30": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gte": ["$validade", now] },
-                                                    { "$lte": ["$validade", now_plus_30] }
-                                                ]
-                                            },
-                                            "$valor_lote", 0
-                                        ]
-                                    }
-                                },
-                                "risco_31_60": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gt": ["$validade", now_plus_30] },
-                                                    { "$lte": ["$validade", now_plus_60] }
-                                                ]
-                                            },
-                                            "$valor_lote", 0
-                                        ]
-                                    }
-                                },
-                                "risco_61_90": {
-                                    "$sum": {
-                                        "$cond": [
-                                            {
-                                                "$and": [
-                                                    { "$eq": ["$lotes.ativo", True] },
-                                                    { "$gt": ["$validade", now_plus_60] },
-                                                    { "$lte": ["$validade", now_plus_90] }
-                                                ]
-                                            },
-                                            "$valor_lote", 0
-                                        ]
-                                    }
-                                }
+                                **self._acumuladores_lotes(now, now_plus_30, now_plus_60, now_plus_90)
                             }
                         }
                     ],
@@ -225,14 +291,12 @@ class DashboardService:
                     
                     # 4. Top 10 Produtos Falta Atribuir Lote
                     "falta_lote": [
+                        # Discrepância persistida nos documentos (mantida pelo ProdutoService). Dentro do
+                        # `$facet` o filtro não usa índice: apenas evita o cálculo por lote nos demais produtos
+                        { "$match": { "discrepancia_estoque": { "$gt": 0 } } },
                         {
                             "$addFields": {
-                                "falta": {
-                                    "$subtract": [
-                                        { "$ifNull": ["$estoque_reportado", 0] },
-                                        { "$ifNull": ["$estoque_calculado", 0] }
-                                    ]
-                                },
+                                "falta": "$discrepancia_estoque",
                                 "lotes_em_risco_count": {
                                     "$size": {
                                         "$filter": {
@@ -250,7 +314,6 @@ class DashboardService:
                                 }
                             }
                         },
-                        { "$match": { "falta": { "$gt": 0 } } },
                         {
                             "$addFields": {
                                 "tem_risco_vencimento": { "$gt": ["$lotes_em_risco_count", 0] }
@@ -278,7 +341,8 @@ class DashboardService:
         ]
         
         try:
-            result = list(self.produtos_collection.aggregate(pipeline))
+            colecao = self.produtos_primario if primario else self.produtos_collection
+            result = list(colecao.aggregate(pipeline))
             
             if not result:
                 return self._dados_vazios()
@@ -292,11 +356,14 @@ class DashboardService:
             lotes_list = data.get("lotes_info", [])
             lotes_data = lotes_list[0] if lotes_list else {}
             
+            # Lotes inativos já movidos para o arquivo continuam contando nas perdas
+            arquivados = self.arquivamento_service.get_totais_perdas()
+            
             estatisticas = EstatisticasEstoque(
                 total_produtos=kpis_data.get("total_produtos", 0),
-                total_lotes=lotes_data.get("total_lotes", 0),
+                total_lotes=lotes_data.get("total_lotes", 0) + arquivados["lotes_arquivados"],
                 produtos_em_estoque=kpis_data.get("produtos_em_estoque", 0),
-                lotes_perdidos=lotes_data.get("lotes_perdidos", 0)
+                lotes_perdidos=lotes_data.get("lotes_perdidos", 0) + arquivados["lotes_perdidos"]
             )
             
             # Valores em Risco
@@ -344,7 +411,7 @@ class DashboardService:
             
             return DashboardData(
                 valor_total_estoque=round(kpis_data.get("valor_total", 0.0), 2),
-                valor_total_perdido=round(lotes_data.get("valor_perdido", 0.0), 2),
+                valor_total_perdido=round(lotes_data.get("valor_perdido", 0.0) + arquivados["valor_perdido"], 2),
                 estatisticas=estatisticas,
                 valor_em_risco=valor_em_risco,
                 status_lotes_distribuicao=status_distribuicao,
@@ -356,6 +423,170 @@ class DashboardService:
             print(f"Erro ao calcular KPIs do dashboard: {e}")
             raise
     
+    def get_kpis_secoes(self) -> List[KpisSecao]:
+        """KPIs do dashboard por seção (e subseção), ordenados pelo código da seção."""
+        cod_secoes = self.produtos_collection.distinct("cod_secao")
+        kpis = self._kpis_secoes_cacheados(cod_secoes)
+        return sorted(kpis.values(), key=lambda secao: (secao.cod_secao is None, secao.cod_secao or 0))
+
+    def get_kpis_secao(self, cod_secao: Optional[int]) -> Optional[KpisSecao]:
+        """KPIs de uma seção, ou None se ela não tiver produtos."""
+        return self._kpis_secoes_cacheados([cod_secao]).get(cod_secao)
+
+    def _kpis_secoes_cacheados(self, cod_secoes: list) -> dict:
+        """
+        KPIs das seções pedidas (`cod_secao` -> `KpisSecao`): lidos do cache compartilhado e,
+        para as seções ausentes ou expiradas, calculados juntos em uma única agregação no
+        primário (o recálculo costuma seguir uma escrita que invalidou a seção). Resultados de
+        seções invalidadas durante o cálculo são retornados, mas não gravados no cache.
+        """
+        resultado = {}
+        faltantes = []
+        for cod_secao in cod_secoes:
+            encontrado, valor, _ = self.cache.get(chave_cache_kpis_secao(cod_secao), settings.KPIS_SECOES_CACHE_SEGUNDOS)
+            if encontrado:
+                resultado[cod_secao] = KpisSecao(**valor)
+            else:
+                faltantes.append(cod_secao)
+
+        if faltantes:
+            inicio = time.time()
+            calculados = self._calcular_kpis_secoes(faltantes)
+            _, _, invalidacao_geral = self.cache.get(CHAVE_INVALIDACAO_KPIS_SECOES)
+            for cod_secao, kpis in calculados.items():
+                _, _, invalidacao = self.cache.get(chave_invalidacao_kpis_secao(cod_secao))
+                if max(invalidacao_geral or 0.0, invalidacao or 0.0) < inicio:
+                    self.cache.set(chave_cache_kpis_secao(cod_secao), kpis.model_dump(mode="json"))
+                resultado[cod_secao] = kpis
+        return resultado
+
+    def _calcular_kpis_secoes(self, cod_secoes: list) -> dict:
+        """
+        Agrupa os produtos das seções informadas por (seção, subseção) em um único `$group`,
+        com os mesmos acumuladores de lotes dos KPIs gerais; os totais da seção são a soma das
+        subseções mais as perdas já arquivadas da seção.
+        """
+        now = datetime.now()
+        now_plus_30 = now + timedelta(days=30)
+        now_plus_60 = now + timedelta(days=60)
+        now_plus_90 = now + timedelta(days=90)
+
+        # Após o `$unwind`, os campos do produto são contados apenas na linha do primeiro lote
+        # (ou na única linha de produtos sem lotes)
+        primeira_linha = {"$lte": [{"$ifNull": ["$indice_lote", 0]}, 0]}
+
+        def por_produto(expressao) -> dict:
+            return {"$sum": {"$cond": [primeira_linha, expressao, 0]}}
+
+        pipeline = [
+            {"$match": {"cod_secao": {"$in": cod_secoes}}},
+            {
+                "$project": {
+                    "cod_secao": 1,
+                    "secao": 1,
+                    "cod_subsecao": 1,
+                    "subsecao": 1,
+                    "preco_unit": 1,
+                    "estoque_reportado": 1,
+                    "discrepancia_estoque": 1,
+                    "discrepancia_absoluta": 1,
+                    "lotes": 1
+                }
+            },
+            { "$unwind": { "path": "$lotes", "includeArrayIndex": "indice_lote", "preserveNullAndEmptyArrays": True } },
+            {
+                "$addFields": {
+                    "validade": "$lotes.data_validade",
+                    "valor_lote": { "$multiply": ["$preco_unit", "$lotes.quantidade_lote"] }
+                }
+            },
+            {
+                "$group": {
+                    "_id": { "cod_secao": "$cod_secao", "cod_subsecao": "$cod_subsecao" },
+                    "secao": { "$first": "$secao" },
+                    "subsecao": { "$first": "$subsecao" },
+                    **self._acumuladores_lotes(now, now_plus_30, now_plus_60, now_plus_90),
+                    "total_lotes": { "$sum": { "$cond": [{ "$eq": [{ "$type": "$lotes" }, "object"] }, 1, 0] } },
+                    "total_produtos": por_produto(1),
+                    "produtos_em_estoque": por_produto({ "$cond": [{ "$gt": ["$estoque_reportado", 0] }, 1, 0] }),
+                    "valor_total": por_produto({
+                        "$multiply": [{ "$ifNull": ["$preco_unit", 0] }, { "$ifNull": ["$estoque_reportado", 0] }]
+                    }),
+                    "produtos_com_discrepancia": por_produto({ "$cond": [{ "$gt": ["$discrepancia_absoluta", 0] }, 1, 0] }),
+                    "discrepancia_absoluta": por_produto({ "$ifNull": ["$discrepancia_absoluta", 0] }),
+                    "valor_discrepancia": por_produto({
+                        "$multiply": [{ "$ifNull": ["$preco_unit", 0] }, { "$ifNull": ["$discrepancia_estoque", 0] }]
+                    })
+                }
+            },
+            { "$sort": { "_id.cod_secao": 1, "_id.cod_subsecao": 1 } }
+        ]
+
+        grupos_por_secao = {}
+        for grupo in self.produtos_primario.aggregate(pipeline):
+            grupos_por_secao.setdefault(grupo["_id"].get("cod_secao"), []).append(grupo)
+
+        if not grupos_por_secao:
+            return {}
+
+        arquivados = self.arquivamento_service.get_perdas_por_secao(list(grupos_por_secao))
+
+        resultado = {}
+        for cod_secao, grupos in grupos_por_secao.items():
+            totais = {}
+            for grupo in grupos:
+                for campo, valor in grupo.items():
+                    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                        totais[campo] = totais.get(campo, 0) + valor
+
+            resultado[cod_secao] = self._montar_kpis_agrupamento(
+                KpisSecao,
+                totais,
+                arquivados.get(cod_secao, {}),
+                cod_secao=cod_secao,
+                secao=next((grupo["secao"] for grupo in grupos if grupo.get("secao")), None),
+                subsecoes=[
+                    self._montar_kpis_agrupamento(
+                        KpisSubsecao,
+                        grupo,
+                        {},
+                        cod_subsecao=grupo["_id"].get("cod_subsecao"),
+                        subsecao=grupo.get("subsecao")
+                    )
+                    for grupo in grupos
+                ]
+            )
+        return resultado
+
+    @staticmethod
+    def _montar_kpis_agrupamento(modelo, totais: dict, arquivados: dict, **identificacao):
+        """Monta `KpisSecao`/`KpisSubsecao` a partir dos totais do `$group` e das perdas arquivadas."""
+        return modelo(
+            valor_total_estoque=round(totais.get("valor_total", 0.0), 2),
+            valor_total_perdido=round(totais.get("valor_perdido", 0.0) + arquivados.get("valor_perdido", 0.0), 2),
+            estatisticas=EstatisticasEstoque(
+                total_produtos=totais.get("total_produtos", 0),
+                total_lotes=totais.get("total_lotes", 0) + arquivados.get("lotes_arquivados", 0),
+                produtos_em_estoque=totais.get("produtos_em_estoque", 0),
+                lotes_perdidos=totais.get("lotes_perdidos", 0) + arquivados.get("lotes_perdidos", 0)
+            ),
+            valor_em_risco=ValorRiscoVencimento(
+                dias_0_30=round(totais.get("risco_0_30", 0.0), 2),
+                dias_31_60=round(totais.get("risco_31_60", 0.0), 2),
+                dias_61_90=round(totais.get("risco_61_90", 0.0), 2)
+            ),
+            status_lotes_distribuicao=StatusLotesDistribuicao(
+                acima_90_dias=totais.get("lotes_acima_90", 0),
+                em_90_dias=totais.get("lotes_90_dias", 0),
+                em_60_dias=totais.get("lotes_60_dias", 0),
+                em_30_dias=totais.get("lotes_30_dias", 0)
+            ),
+            produtos_com_discrepancia=totais.get("produtos_com_discrepancia", 0),
+            discrepancia_absoluta=int(totais.get("discrepancia_absoluta", 0)),
+            valor_discrepancia=round(totais.get("valor_discrepancia", 0.0), 2),
+            **identificacao
+        )
+    
     def _dados_vazios(self) -> DashboardData:
         """Retorna estrutura vazia de dados."""
         return DashboardData(
@@ -424,4 +655,137 @@ class DashboardService:
             em_90_dias=int(data.get("lotes_90_dias", 0)),
             em_60_dias=int(data.get("lotes_60_dias", 0)),
             em_30_dias=int(data.get("lotes_30_dias", 0))
-        )
\ No newline at end of file
+        )
+    
+    def get_products_lote_status(self, codigos_lm: List[int]) -> List[StatusLotesProduto]:
+        """
+        Calcula a distribuição de lotes (ponderada por quantidade) de vários produtos
+        em uma única agregação agrupada por código LM.
+        
+        Returns:
+            List[StatusLotesProduto]: Distribuições na mesma ordem dos códigos recebidos
+        """
+        now = datetime.now()
+        now_plus_30 = now + timedelta(days=30)
+        now_plus_60 = now + timedelta(days=60)
+        now_plus_90 = now + timedelta(days=90)
+        
+        codigos_unicos = list(dict.fromkeys(codigos_lm))
+        
+        pipeline = [
+            { "$match": { "codigo_lm": { "$in": codigos_unicos } } },
+            {
+                "$project": {
+                    "codigo_lm": 1,
+                    "nome_produto": 1,
+                    "lotes": {
+                        "$filter": {
+                            "input": { "$ifNull": ["$lotes", []] },
+                            "as": "lote",
+                            "cond": { "$eq": ["$$lote.ativo", True] }
+                        }
+                    }
+                }
+            },
+            { "$unwind": { "path": "$lotes", "preserveNullAndEmptyArrays": True } },
+            {
+                "$project": {
+                    "codigo_lm": 1,
+                    "nome_produto": 1,
+                    "validade": "$lotes.data_validade",
+                    "quantidade": { "$ifNull": ["$lotes.quantidade_lote", 0] }
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$codigo_lm",
+                    "nome_produto": { "$first": "$nome_produto" },
+                    "lotes_30_dias": {
+                        "$sum": {
+                            "$cond": [{ "$and": [{ "$gte": ["$validade", now] }, { "$lte": ["$validade", now_plus_30] }] }, "$quantidade", 0]
+                        }
+                    },
+                    "lotes_60_dias": {
+                        "$sum": {
+                            "$cond": [{ "$and": [{ "$gt": ["$validade", now_plus_30] }, { "$lte": ["$validade", now_plus_60] }] }, "$quantidade", 0]
+                        }
+                    },
+                    "lotes_90_dias": {
+                        "$sum": {
+                            "$cond": [{ "$and": [{ "$gt": ["$validade", now_plus_60] }, { "$lte": ["$validade", now_plus_90] }] }, "$quantidade", 0]
+                        }
+                    },
+                    "lotes_acima_90": {
+                        "$sum": {
+                            "$cond": [{ "$gt": ["$validade", now_plus_90] }, "$quantidade", 0]
+                        }
+                    }
+                }
+            }
+        ]
+        
+        resultados = {
+            data["_id"]: StatusLotesProduto(
+                codigo_lm=data["_id"],
+                nome_produto=data.get("nome_produto") or "",
+                acima_90_dias=int(data.get("lotes_acima_90", 0)),
+                em_90_dias=int(data.get("lotes_90_dias", 0)),
+                em_60_dias=int(data.get("lotes_60_dias", 0)),
+                em_30_dias=int(data.get("lotes_30_dias", 0))
+            )
+            for data in self.produtos_collection.aggregate(pipeline)
+        }
+        
+        return [resultados[codigo] for codigo in codigos_unicos if codigo in resultados]
+    
+    def get_lotes_vencendo(self, dias: int, limite: int = 20) -> dict:
+        """
+        Lotes ativos que vencem nos próximos `dias` dias (0 = até o fim do dia de hoje), do mais
+        próximo ao mais distante: `items` traz no máximo `limite` lotes e `total`, a contagem completa.
+        """
+        now = datetime.now()
+        if dias <= 0:
+            fim = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+        else:
+            fim = now + timedelta(days=dias)
+        filtro_lote = { "ativo": True, "data_validade": { "$gte": now, "$lte": fim } }
+        
+        pipeline = [
+            { "$match": { "lotes": { "$elemMatch": filtro_lote } } },
+            { "$unwind": "$lotes" },
+            { "$match": { f"lotes.{campo}": valor for campo, valor in filtro_lote.items() } },
+            {
+                "$facet": {
+                    "total": [{ "$count": "quantidade" }],
+                    "lotes": [
+                        { "$sort": { "lotes.data_validade": 1 } },
+                        { "$limit": limite },
+                        {
+                            "$project": {
+                                "codigo_lm": 1,
+                                "nome_produto": 1,
+                                "codigo_lote": "$lotes.codigo_lote",
+                                "categoria": { "$ifNull": ["$secao", ""] },
+                                "validade": "$lotes.data_validade"
+                            }
+                        }
+                    ]
+                }
+            }
+        ]
+        
+        resultado = next(self.produtos_collection.aggregate(pipeline), {})
+        total = resultado.get("total") or [{}]
+        items = [
+            ProdutoVencimentoProximo(
+                codigo_lm=str(item["codigo_lm"]),
+                nome_produto=item.get("nome_produto", ""),
+                numero_lote=item["codigo_lote"],
+                local="",
+                categoria=item.get("categoria", ""),
+                data_validade=item["validade"].strftime("%Y-%m-%d"),
+                dias_para_vencer=(item["validade"] - now).days
+            )
+            for item in resultado.get("lotes", [])
+        ]
+        return {"items": items, "total": total[0].get("quantidade", 0)}
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Set
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.configs.config import settings
+from app.database.client import get_database
+from app.services.kpis_compartilhados import KpisCompartilhados
+
+class DashboardStreamService:
+    """
+    Publica os KPIs do dashboard para vários assinantes (SSE) a partir de um único watcher.
+
+    Um change stream da coleção `produtos` sinaliza alterações; as alterações de uma
+    mesma rajada são agrupadas (debounce) e os KPIs são recalculados uma única vez,
+    sendo então distribuídos para todos os assinantes conectados.
+
+    Os KPIs vêm de `KpisCompartilhados`: com vários workers, apenas o líder executa a
+    agregação. O líder recalcula e publica no cache compartilhado a cada rajada, mesmo sem
+    assinantes próprios; os demais apenas aguardam o valor gerado por ele após a alteração.
+    """
+
+    def __init__(self, debounce_segundos: float, fallback_segundos: float):
+        self.debounce_segundos = debounce_segundos
+        self.fallback_segundos = fallback_segundos
+        self.assinantes: Set[asyncio.Queue] = set()
+        self.ultimo_kpis: Optional[str] = None
+        self._desatualizado = True
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._alteracao = asyncio.Event()
+        self._lock_recalculo = asyncio.Lock()
+        self._parar = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._coalescedor: Optional[asyncio.Task] = None
+        self._ultima_alteracao: Optional[float] = None
+        self.kpis: Optional[KpisCompartilhados] = None
+
+    async def iniciar(self, kpis: KpisCompartilhados):
+        """Inicia o watcher do change stream e a tarefa de recálculo."""
+        self.kpis = kpis
+        self._loop = asyncio.get_running_loop()
+        self._parar.clear()
+        self._watcher = threading.Thread(target=self._observar_alteracoes, name="dashboard-change-stream", daemon=True)
+        self._watcher.start()
+        self._coalescedor = asyncio.create_task(self._coalescer_alteracoes())
+
+    async def parar(self):
+        """Encerra o watcher e desconecta os assinantes."""
+        self._parar.set()
+        if self._coalescedor:
+            self._coalescedor.cancel()
+            await asyncio.gather(self._coalescedor, return_exceptions=True)
+        if self._watcher:
+            await asyncio.to_thread(self._watcher.join, 5)
+        for fila in list(self.assinantes):
+            self._publicar_em(fila, None)
+
+    def _sinalizar_alteracao(self, periodica: bool = False):
+        # Sinais periódicos (sem change stream) não correspondem a uma escrita conhecida:
+        # basta um valor dentro da validade do cache, sem exigir recálculo no primário
+        if not periodica:
+            self._ultima_alteracao = time.time()
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._alteracao.set)
+
+    def _observar_alteracoes(self):
+        """Thread do change stream; em MongoDB sem replica set, recorre a sinalização periódica."""
+        resume_token = None
+
+        while not self._parar.is_set():
+            db = get_database()
+            if db is None:
+                self._parar.wait(self.fallback_segundos)
+                continue
+
+            try:
+                with db['produtos'].watch(
+                    pipeline=[{"$project": {"operationType": 1}}],
+                    resume_after=resume_token,
+                    max_await_time_ms=1000
+                ) as stream:
+                    while not self._parar.is_set() and stream.alive:
+                        evento = stream.try_next()
+                        if evento is not None and evento["operationType"] == "invalidate":
+                            # Coleção removida ou renomeada: o token do invalidate não permite
+                            # retomar o stream, então ele é descartado e o stream reaberto
+                            resume_token = None
+                            self._sinalizar_alteracao()
+                            break
+                        resume_token = stream.resume_token
+                        if evento is not None:
+                            self._sinalizar_alteracao()
+            except OperationFailure as e:
+                print(f"Change stream indisponível ({e}); usando atualização periódica a cada {self.fallback_segundos}s.")
+                while not self._parar.wait(self.fallback_segundos):
+                    self._sinalizar_alteracao(periodica=True)
+            except PyMongoError as e:
+                print(f"Erro no change stream de produtos: {e}. Reconectando...")
+                self._parar.wait(1)
+
+    async def _coalescer_alteracoes(self):
+        """Agrupa rajadas de alterações e recalcula os KPIs uma vez por rajada."""
+        while True:
+            await self._alteracao.wait()
+            await asyncio.sleep(self.debounce_segundos)
+            self._alteracao.clear()
+
+            eh_lider = self.kpis is not None and await asyncio.to_thread(self.kpis.cache.eh_lider)
+            if not self.assinantes and not eh_lider:
+                self._desatualizado = True
+                continue
+
+            try:
+                async with self._lock_recalculo:
+                    await self._recalcular()
+            except Exception as e:
+                print(f"Erro ao recalcular KPIs do dashboard: {e}")
+
+    async def _recalcular(self):
+        """Recalcula os KPIs e publica para todos os assinantes (chamar com o lock adquirido)."""
+        if self.kpis is None:
+            raise ConnectionError("Falha na conexão com o MongoDB.")
+        kpis = await asyncio.to_thread(self.kpis.get_dashboard_kpis, self._ultima_alteracao)
+        self.ultimo_kpis = kpis.model_dump_json()
+        self._desatualizado = False
+        for fila in list(self.assinantes):
+            self._publicar_em(fila, self.ultimo_kpis)
+
+    @staticmethod
+    def _publicar_em(fila: asyncio.Queue, mensagem: Optional[str]):
+        """Mantém apenas a mensagem mais recente na fila de cada assinante."""
+        while not fila.empty():
+            fila.get_nowait()
+        fila.put_nowait(mensagem)
+
+    async def assinar(self) -> asyncio.Queue:
+        """Registra um assinante e entrega imediatamente os KPIs mais recentes."""
+        fila: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.assinantes.add(fila)
+
+        try:
+            async with self._lock_recalculo:
+                if self.ultimo_kpis is None or self._desatualizado:
+                    await self._recalcular()
+                else:
+                    self._publicar_em(fila, self.ultimo_kpis)
+        except Exception:
+            self.cancelar_assinatura(fila)
+            raise
+
+        return fila
+
+    def cancelar_assinatura(self, fila: asyncio.Queue):
+        self.assinantes.discard(fila)
+
+dashboard_stream = DashboardStreamService(
+    debounce_segundos=settings.DASHBOARD_STREAM_DEBOUNCE_SEGUNDOS,
+    fallback_segundos=settings.DASHBOARD_STREAM_FALLBACK_SEGUNDOS
+)
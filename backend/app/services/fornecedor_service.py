@@ -1,7 +1,46 @@
-from typing import List, Optional
+import re
+
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
 from pymongo.collection import Collection
-from app.models.fornecedor import Fornecedor
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta
+from app.models.fornecedor import DevolucaoFornecedor, Fornecedor
 from app.database.client import get_database
+from app.services.perfil_inicializacao import perfil_inicializacao
+
+PESOS_DV1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+PESOS_DV2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+
+def limpar_cnpj(cnpj: Any) -> str:
+    """Mantém apenas os dígitos do CNPJ."""
+    return re.sub(r'\D', '', str(cnpj or ''))
+
+def validar_cnpjs(cnpjs: List[str]):
+    """Valida os dígitos verificadores de vários CNPJs (já limpos) de uma só vez."""
+    with perfil_inicializacao.medir_primeiro_uso("numpy"):
+        import numpy as np
+
+    validos = np.zeros(len(cnpjs), dtype=bool)
+    candidatos = [i for i, cnpj in enumerate(cnpjs) if len(cnpj) == 14 and cnpj.isdigit()]
+    if not candidatos:
+        return validos
+
+    digitos = (
+        np.frombuffer(''.join(cnpjs[i] for i in candidatos).encode('ascii'), dtype=np.uint8)
+        .reshape(-1, 14)
+        .astype(np.int64) - ord('0')
+    )
+
+    resto1 = (digitos[:, :12] @ np.array(PESOS_DV1)) % 11
+    dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+    resto2 = (digitos[:, :13] @ np.array(PESOS_DV2)) % 11
+    dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+    validos[candidatos] = (digitos[:, 12] == dv1) & (digitos[:, 13] == dv2) & ~repetidos
+    return validos
 
 class FornecedorService:
     def __init__(self):
@@ -9,6 +48,11 @@ class FornecedorService:
         if self.db is None:
             raise ConnectionError("Falha na conexão com o MongoDB.")
         self.collection: Collection = self.db['fornecedores']
+        # Usada apenas pelo relatório de devoluções pendentes (perfil de leitura "relatorios")
+        self.produtos_collection: Collection = get_database("relatorios")['produtos']
+    
+    def criar_indices(self):
+        """Cria os índices da coleção (executado uma vez na inicialização)."""
         self.collection.create_index("cnpj", unique=True)
         
     def get_all(self) -> List[Fornecedor]:
@@ -16,6 +60,15 @@ class FornecedorService:
         fornecedores_data = list(self.collection.find())
         return [Fornecedor(**data) for data in fornecedores_data]
 
+    def get_nomes_por_cnpj(self, cnpjs: List[str]) -> dict:
+        """Retorna um mapa CNPJ -> nome apenas para os CNPJs informados."""
+        if not cnpjs:
+            return {}
+        return {
+            data["cnpj"]: data["nome"]
+            for data in self.collection.find({"cnpj": {"$in": list(set(cnpjs))}}, {"cnpj": 1, "nome": 1})
+        }
+
     def create(self, fornecedor: Fornecedor) -> Fornecedor:
         """Cria um novo fornecedor."""        
         if self.collection.find_one({"$or": [
@@ -54,4 +107,235 @@ class FornecedorService:
     def delete(self, cnpj: int) -> bool:
         """Exclui um fornecedor pelo ID."""
         result = self.collection.delete_one({"cnpj": cnpj})
-        return result.deleted_count == 1
\ No newline at end of file
+        return result.deleted_count == 1
+
+    def get_by_cnpjs(self, cnpjs: List[str]) -> dict:
+        """Busca vários fornecedores em uma única consulta `$in` pelo índice de CNPJ."""
+        cnpjs_limpos = list(dict.fromkeys(limpar_cnpj(cnpj) for cnpj in cnpjs))
+        fornecedores = [
+            Fornecedor(**data)
+            for data in self.collection.find({"cnpj": {"$in": cnpjs_limpos}})
+        ]
+        encontrados = {f.cnpj for f in fornecedores}
+
+        return {
+            "fornecedores": fornecedores,
+            "nao_encontrados": [cnpj for cnpj in cnpjs_limpos if cnpj not in encontrados]
+        }
+
+    def upsert_em_massa(self, registros: List[Dict[str, Any]]) -> dict:
+        """
+        Cadastra ou atualiza fornecedores em massa.
+
+        Os CNPJs são validados de uma só vez; as linhas válidas são gravadas com um único
+        `bulk_write` não ordenado sobre o índice único de CNPJ. Fornecedores existentes têm
+        atualizadas apenas as colunas presentes na linha. Erros são reportados por linha.
+        """
+        erros = []
+        cnpjs = [limpar_cnpj(registro.get("cnpj")) for registro in registros]
+        cnpjs_validos = validar_cnpjs(cnpjs)
+
+        operacoes_bulk = []
+        linhas_operacoes = []
+        primeira_linha = {}
+
+        for linha, (registro, cnpj, valido) in enumerate(zip(registros, cnpjs, cnpjs_validos)):
+            if not valido:
+                erros.append({"linha": linha, "cnpj": cnpj, "erro": "CNPJ inválido."})
+                continue
+            if cnpj in primeira_linha:
+                erros.append({"linha": linha, "cnpj": cnpj, "erro": f"CNPJ duplicado (linha {primeira_linha[cnpj]})."})
+                continue
+
+            try:
+                fornecedor = Fornecedor(**{**registro, "cnpj": cnpj})
+            except ValidationError as e:
+                detalhes = "; ".join(
+                    f"{'.'.join(str(p) for p in erro['loc'])}: {erro['msg']}" for erro in e.errors()
+                )
+                erros.append({"linha": linha, "cnpj": cnpj, "erro": detalhes})
+                continue
+
+            primeira_linha[cnpj] = linha
+            linhas_operacoes.append(linha)
+            # Apenas as colunas enviadas sobrescrevem o cadastro; os padrões do modelo
+            # (status_forn, contato...) valem só para fornecedores novos
+            dados_enviados = fornecedor.model_dump(exclude_unset=True)
+            padroes = {campo: valor for campo, valor in fornecedor.model_dump().items() if campo not in dados_enviados}
+            operacoes_bulk.append(
+                UpdateOne(
+                    {"cnpj": cnpj},
+                    {"$set": dados_enviados, **({"$setOnInsert": padroes} if padroes else {})},
+                    upsert=True
+                )
+            )
+
+        criados = 0
+        atualizados = 0
+        if operacoes_bulk:
+            try:
+                resultado = self.collection.bulk_write(operacoes_bulk, ordered=False)
+                criados = resultado.upserted_count
+                atualizados = resultado.modified_count
+            except BulkWriteError as e:
+                detalhes = e.details
+                criados = detalhes.get("nUpserted", 0)
+                atualizados = detalhes.get("nModified", 0)
+                for erro in detalhes.get("writeErrors", []):
+                    linha = linhas_operacoes[erro["index"]]
+                    erros.append({"linha": linha, "cnpj": cnpjs[linha], "erro": erro.get("errmsg", "Erro de gravação.")})
+
+        erros.sort(key=lambda erro: erro["linha"])
+
+        return {
+            "total_recebidos": len(registros),
+            "fornecedores_criados": criados,
+            "fornecedores_atualizados": atualizados,
+            "erros": erros
+        }
+
+    def get_devolucao_pendente(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        horizonte_dias: Optional[int] = None,
+        lotes_por_fornecedor: int = 50
+    ) -> dict:
+        """
+        Relatório de lotes ativos que ainda podem ser devolvidos, agrupados por fornecedor.
+
+        O prazo de devolução de cada lote é `data_validade - politica_devolucao` dias. O
+        relatório é calculado em uma única agregação: o `$match` inicial usa o índice
+        `lotes.data_validade`/`lotes.ativo` e o `$lookup` usa o índice único de CNPJ.
+        Fornecedores são ordenados pelo prazo mais próximo e paginados; cada um traz no
+        máximo `lotes_por_fornecedor` lotes (`$firstN`), com `quantidade_lotes` e
+        `valor_recuperavel` calculados sobre todos eles.
+        """
+        agora = datetime.now()
+        limite_prazo = agora + timedelta(days=horizonte_dias) if horizonte_dias is not None else None
+
+        filtro_prazo = {"$gte": ["$prazo_devolucao", agora]}
+        if limite_prazo is not None:
+            filtro_prazo = {"$and": [filtro_prazo, {"$lte": ["$prazo_devolucao", limite_prazo]}]}
+
+        pipeline = [
+            {
+                "$match": {
+                    "lotes": {"$elemMatch": {"ativo": True, "data_validade": {"$gte": agora}}}
+                }
+            },
+            {
+                "$project": {
+                    "codigo_lm": 1,
+                    "nome_produto": 1,
+                    "fornecedor_cnpj": 1,
+                    "lotes": {
+                        "$filter": {
+                            "input": "$lotes",
+                            "as": "lote",
+                            "cond": {
+                                "$and": [
+                                    {"$eq": ["$$lote.ativo", True]},
+                                    {"$gte": ["$$lote.data_validade", agora]}
+                                ]
+                            }
+                        }
+                    }
+                }
+            },
+            {
+                "$lookup": {
+                    "from": self.collection.name,
+                    "localField": "fornecedor_cnpj",
+                    "foreignField": "cnpj",
+                    "pipeline": [{"$project": {"_id": 0, "nome": 1, "politica_devolucao": 1, "contato": 1}}],
+                    "as": "fornecedor"
+                }
+            },
+            {"$unwind": "$fornecedor"},
+            {"$unwind": "$lotes"},
+            {
+                "$addFields": {
+                    "prazo_devolucao": {
+                        "$dateSubtract": {
+                            "startDate": "$lotes.data_validade",
+                            "unit": "day",
+                            "amount": {"$ifNull": ["$fornecedor.politica_devolucao", 0]}
+                        }
+                    }
+                }
+            },
+            {"$match": {"$expr": filtro_prazo}},
+            {"$sort": {"prazo_devolucao": 1}},
+            {
+                "$group": {
+                    "_id": "$fornecedor_cnpj",
+                    "nome": {"$first": "$fornecedor.nome"},
+                    "politica_devolucao": {"$first": "$fornecedor.politica_devolucao"},
+                    "contato": {"$first": "$fornecedor.contato"},
+                    "proximo_prazo": {"$first": "$prazo_devolucao"},
+                    "quantidade_lotes": {"$sum": 1},
+                    "valor_recuperavel": {"$sum": {"$ifNull": ["$lotes.valor_lote", 0]}},
+                    # Lotes já ordenados pelo prazo: mantém apenas os primeiros, sem acumular todos em memória
+                    "lotes": {
+                        "$firstN": {
+                            "n": lotes_por_fornecedor,
+                            "input": {
+                                "codigo_lm": "$codigo_lm",
+                                "nome_produto": "$nome_produto",
+                                "codigo_lote": "$lotes.codigo_lote",
+                                "data_validade": "$lotes.data_validade",
+                                "prazo_devolucao": "$prazo_devolucao",
+                                "dias_para_prazo": {
+                                    "$dateDiff": {"startDate": agora, "endDate": "$prazo_devolucao", "unit": "day"}
+                                },
+                                "quantidade_lote": "$lotes.quantidade_lote",
+                                "valor_lote": {"$ifNull": ["$lotes.valor_lote", 0]}
+                            }
+                        }
+                    }
+                }
+            },
+            {"$sort": {"proximo_prazo": 1, "_id": 1}},
+            {
+                "$facet": {
+                    "totais": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total": {"$sum": 1},
+                                "valor_recuperavel_total": {"$sum": "$valor_recuperavel"}
+                            }
+                        }
+                    ],
+                    "items": [
+                        {"$skip": skip},
+                        *([{"$limit": limit}] if limit > 0 else []),
+                        {
+                            "$project": {
+                                "_id": 0,
+                                "cnpj": "$_id",
+                                "nome": 1,
+                                "politica_devolucao": 1,
+                                "contato": 1,
+                                "proximo_prazo": 1,
+                                "quantidade_lotes": 1,
+                                "valor_recuperavel": 1,
+                                "lotes": 1
+                            }
+                        }
+                    ]
+                }
+            }
+        ]
+
+        resultado = next(self.produtos_collection.aggregate(pipeline, allowDiskUse=True), {})
+        totais = (resultado.get("totais") or [{}])[0]
+
+        return {
+            "items": [DevolucaoFornecedor(**data) for data in resultado.get("items", [])],
+            "total": totais.get("total", 0),
+            "valor_recuperavel_total": round(totais.get("valor_recuperavel_total", 0.0), 2),
+            "skip": skip,
+            "limit": limit
+        }
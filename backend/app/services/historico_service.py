@@ -0,0 +1,308 @@
+from typing import List, Optional
+from pymongo.collection import Collection
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+from pymongo import ReplaceOne
+from datetime import datetime, timedelta, timezone
+
+from app.models.dashboard import PontoHistorico
+from app.database.client import get_database
+
+METRICAS = [
+    "estoque_reportado",
+    "estoque_calculado",
+    "valor_estoque",
+    "valor_calculado",
+    "risco_0_30",
+    "risco_31_60",
+    "risco_61_90",
+    "valor_perdido",
+]
+
+TIPOS_ROLLUP = ["loja", "secao"]
+
+# Após esse prazo, um snapshot iniciado e não concluído (execução interrompida) pode ser refeito
+PRAZO_SNAPSHOT_MINUTOS = 60
+
+class HistoricoService:
+    """Serviço de snapshots diários de estoque e valor em uma coleção time-series."""
+
+    def __init__(self):
+        self.db = get_database()
+        if self.db is None:
+            raise ConnectionError("Falha na conexão com o MongoDB.")
+        self.produtos_collection: Collection = self.db['produtos']
+        self.historico_collection: Collection = self.db['historico_estoque']
+        self.rollups_collection: Collection = self.db['historico_rollups']
+        self.snapshots_collection: Collection = self.db['snapshots_gerados']
+
+        # Consultas da série e a agregação pesada do snapshot seguem o perfil "historico";
+        # a reserva do dia e os rollups leem o que acabou de ser gravado e ficam no primário
+        db_leitura = get_database("historico")
+        self.produtos_leitura: Collection = db_leitura['produtos']
+        self.historico_leitura: Collection = db_leitura['historico_estoque']
+        self.rollups_leitura: Collection = db_leitura['historico_rollups']
+
+    def criar_indices(self):
+        """Cria a coleção time-series (se ainda não existir) e o índice dos agregados."""
+        nome = self.historico_collection.name
+        if nome not in self.db.list_collection_names():
+            try:
+                self.db.create_collection(
+                    nome,
+                    timeseries={"timeField": "data", "metaField": "meta", "granularity": "hours"}
+                )
+            except CollectionInvalid:
+                pass
+        self.rollups_collection.create_index([("granularidade", 1), ("tipo", 1), ("chave", 1), ("data", 1)])
+
+    @staticmethod
+    def _inicio_do_dia(data: datetime) -> datetime:
+        return datetime(data.year, data.month, data.day, tzinfo=timezone.utc)
+
+    @staticmethod
+    def _inicio_periodo(data: datetime, granularidade: str) -> datetime:
+        """Retorna o início da semana (segunda-feira) ou do mês que contém a data."""
+        if granularidade == "semana":
+            return data - timedelta(days=data.weekday())
+        return data.replace(day=1)
+
+    @staticmethod
+    def _fim_periodo(inicio: datetime, granularidade: str) -> datetime:
+        if granularidade == "semana":
+            return inicio + timedelta(days=7)
+        if inicio.month == 12:
+            return inicio.replace(year=inicio.year + 1, month=1)
+        return inicio.replace(month=inicio.month + 1)
+
+    def _pipeline_metricas_produto(self, referencia: datetime) -> list:
+        """Pipeline que calcula as métricas diárias compactas de cada produto."""
+        now_plus_30 = referencia + timedelta(days=30)
+        now_plus_60 = referencia + timedelta(days=60)
+        now_plus_90 = referencia + timedelta(days=90)
+
+        def valor_lotes(cond: dict) -> dict:
+            return {
+                "$sum": {
+                    "$map": {
+                        "input": "$lotes",
+                        "as": "lote",
+                        "in": {
+                            "$cond": [
+                                cond,
+                                { "$multiply": ["$preco_unit", { "$ifNull": ["$$lote.quantidade_lote", 0] }] },
+                                0
+                            ]
+                        }
+                    }
+                }
+            }
+
+        def ativo_entre(inicio, fim, inclusivo_inicio: bool) -> dict:
+            return {
+                "$and": [
+                    { "$eq": ["$$lote.ativo", True] },
+                    { "$gte" if inclusivo_inicio else "$gt": ["$$lote.data_validade", inicio] },
+                    { "$lte": ["$$lote.data_validade", fim] }
+                ]
+            }
+
+        return [
+            {
+                "$lookup": {
+                    "from": "perdas_arquivadas",
+                    "localField": "codigo_lm",
+                    "foreignField": "_id",
+                    "as": "perdas_arquivadas"
+                }
+            },
+            {
+                "$project": {
+                    "codigo_lm": 1,
+                    "cod_secao": 1,
+                    "valor_perdido_arquivado": { "$ifNull": [{ "$first": "$perdas_arquivadas.valor_perdido" }, 0] },
+                    "preco_unit": { "$ifNull": ["$preco_unit", 0] },
+                    "estoque_reportado": { "$ifNull": ["$estoque_reportado", 0] },
+                    "estoque_calculado": { "$ifNull": ["$estoque_calculado", 0] },
+                    "lotes": { "$ifNull": ["$lotes", []] }
+                }
+            },
+            {
+                "$project": {
+                    "codigo_lm": 1,
+                    "cod_secao": 1,
+                    "estoque_reportado": 1,
+                    "estoque_calculado": 1,
+                    "valor_estoque": { "$multiply": ["$preco_unit", "$estoque_reportado"] },
+                    "valor_calculado": { "$multiply": ["$preco_unit", "$estoque_calculado"] },
+                    "risco_0_30": valor_lotes(ativo_entre(referencia, now_plus_30, True)),
+                    "risco_31_60": valor_lotes(ativo_entre(now_plus_30, now_plus_60, False)),
+                    "risco_61_90": valor_lotes(ativo_entre(now_plus_60, now_plus_90, False)),
+                    "valor_perdido": {
+                        "$add": [valor_lotes({ "$eq": ["$$lote.ativo", False] }), "$valor_perdido_arquivado"]
+                    }
+                }
+            }
+        ]
+
+    def gerar_snapshot(self, data: Optional[datetime] = None) -> dict:
+        """
+        Grava o snapshot diário por produto, por seção e da loja na coleção time-series
+        e atualiza os agregados semanais e mensais do período correspondente.
+
+        O snapshot é idempotente por dia: o dia é reservado antes da gravação com um upsert
+        em `snapshots_gerados` (`_id` = dia), que só um worker consegue fazer; a coleção
+        time-series não aceita índice único. Uma reserva não concluída em PRAZO_SNAPSHOT_MINUTOS
+        é retomada, descartando os pontos gravados parcialmente.
+        """
+        agora = datetime.now(timezone.utc)
+        dia = self._inicio_do_dia(data or agora)
+
+        try:
+            reserva = self.snapshots_collection.update_one(
+                {
+                    "_id": dia,
+                    "estado": "gerando",
+                    "iniciado_em": {"$lt": agora - timedelta(minutes=PRAZO_SNAPSHOT_MINUTOS)}
+                },
+                {"$set": {"estado": "gerando", "iniciado_em": agora}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return {"data": dia, "gerado": False, "documentos": 0}
+
+        if reserva.upserted_id is None:
+            self.historico_collection.delete_many({"data": dia})
+        elif self.historico_collection.find_one({"data": dia, "meta.tipo": "loja"}, {"_id": 1}):
+            # Dia gravado antes da existência das reservas
+            self.snapshots_collection.update_one({"_id": dia}, {"$set": {"estado": "concluido"}})
+            return {"data": dia, "gerado": False, "documentos": 0}
+
+        totais_secao = {}
+        total_loja = {metrica: 0.0 for metrica in METRICAS}
+        documentos = []
+
+        for produto in self.produtos_leitura.aggregate(self._pipeline_metricas_produto(agora)):
+            metricas = {metrica: round(float(produto.get(metrica) or 0), 2) for metrica in METRICAS}
+            documentos.append({
+                "data": dia,
+                "meta": {"tipo": "produto", "chave": str(produto.get("codigo_lm"))},
+                **metricas
+            })
+
+            chave_secao = str(produto.get("cod_secao")) if produto.get("cod_secao") is not None else "sem_secao"
+            acumulado = totais_secao.setdefault(chave_secao, {metrica: 0.0 for metrica in METRICAS})
+            for metrica, valor in metricas.items():
+                acumulado[metrica] += valor
+                total_loja[metrica] += valor
+
+        for chave_secao, metricas in totais_secao.items():
+            documentos.append({
+                "data": dia,
+                "meta": {"tipo": "secao", "chave": chave_secao},
+                **{metrica: round(valor, 2) for metrica, valor in metricas.items()}
+            })
+
+        documentos.append({
+            "data": dia,
+            "meta": {"tipo": "loja", "chave": "loja"},
+            **{metrica: round(valor, 2) for metrica, valor in total_loja.items()}
+        })
+
+        self.historico_collection.insert_many(documentos, ordered=False)
+
+        for granularidade in ("semana", "mes"):
+            self.atualizar_rollup(granularidade, self._inicio_periodo(dia, granularidade))
+
+        self.snapshots_collection.update_one(
+            {"_id": dia},
+            {"$set": {"estado": "concluido", "concluido_em": datetime.now(timezone.utc), "documentos": len(documentos)}}
+        )
+        return {"data": dia, "gerado": True, "documentos": len(documentos)}
+
+    def atualizar_rollup(self, granularidade: str, inicio: datetime) -> int:
+        """Recalcula o agregado (média diária) de loja e seções para a semana ou mês informado."""
+        fim = self._fim_periodo(inicio, granularidade)
+
+        pipeline = [
+            {
+                "$match": {
+                    "data": { "$gte": inicio, "$lt": fim },
+                    "meta.tipo": { "$in": TIPOS_ROLLUP }
+                }
+            },
+            {
+                "$group": {
+                    "_id": { "tipo": "$meta.tipo", "chave": "$meta.chave" },
+                    "dias": { "$sum": 1 },
+                    **{metrica: { "$avg": f"${metrica}" } for metrica in METRICAS}
+                }
+            }
+        ]
+
+        operacoes = []
+        for grupo in self.historico_collection.aggregate(pipeline):
+            tipo = grupo["_id"]["tipo"]
+            chave = grupo["_id"]["chave"]
+            operacoes.append(
+                ReplaceOne(
+                    {"_id": f"{granularidade}:{tipo}:{chave}:{inicio:%Y-%m-%d}"},
+                    {
+                        "granularidade": granularidade,
+                        "tipo": tipo,
+                        "chave": chave,
+                        "data": inicio,
+                        "dias": grupo["dias"],
+                        **{metrica: round(grupo.get(metrica) or 0.0, 2) for metrica in METRICAS}
+                    },
+                    upsert=True
+                )
+            )
+
+        if operacoes:
+            self.rollups_collection.bulk_write(operacoes, ordered=False)
+
+        return len(operacoes)
+
+    def get_historico(
+        self,
+        granularidade: str = "dia",
+        tipo: str = "loja",
+        chave: Optional[str] = None,
+        inicio: Optional[datetime] = None,
+        fim: Optional[datetime] = None
+    ) -> List[PontoHistorico]:
+        """
+        Retorna a série histórica ordenada por data.
+
+        Pontos diários vêm da coleção time-series; semanais e mensais vêm dos
+        agregados pré-calculados (apenas para loja e seções).
+        """
+        if granularidade not in ("dia", "semana", "mes"):
+            raise ValueError("Granularidade deve ser 'dia', 'semana' ou 'mes'.")
+        if tipo not in ("loja", "secao", "produto"):
+            raise ValueError("Tipo deve ser 'loja', 'secao' ou 'produto'.")
+        if granularidade != "dia" and tipo not in TIPOS_ROLLUP:
+            raise ValueError("Agregados semanais e mensais estão disponíveis apenas para loja e seções.")
+        if tipo != "loja" and not chave:
+            raise ValueError("Informe a chave (código da seção ou código LM).")
+
+        chave = "loja" if tipo == "loja" else chave
+        fim = fim or datetime.now(timezone.utc)
+        inicio = inicio or fim - timedelta(days=365)
+
+        if granularidade == "dia":
+            cursor = self.historico_leitura.find(
+                {"meta.tipo": tipo, "meta.chave": chave, "data": {"$gte": inicio, "$lte": fim}},
+                {"_id": 0}
+            ).sort("data", 1)
+            return [
+                PontoHistorico(tipo=tipo, chave=chave, data=doc["data"], **{m: doc.get(m, 0.0) for m in METRICAS})
+                for doc in cursor
+            ]
+
+        inicio = self._inicio_periodo(self._inicio_do_dia(inicio), granularidade)
+        cursor = self.rollups_leitura.find(
+            {"granularidade": granularidade, "tipo": tipo, "chave": chave, "data": {"$gte": inicio, "$lte": fim}},
+            {"_id": 0, "granularidade": 0}
+        ).sort("data", 1)
+        return [PontoHistorico(**doc) for doc in cursor]
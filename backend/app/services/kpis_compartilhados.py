@@ -0,0 +1,86 @@
+import time
+from typing import Optional
+
+from app.configs.config import settings
+from app.models.dashboard import DashboardData
+from app.services.cache_compartilhado import CacheCompartilhado
+from app.services.dashboard_service import DashboardService
+
+CHAVE_KPIS = "dashboard_kpis"
+
+class KpisCompartilhados:
+    """
+    KPIs do dashboard calculados por um único worker (o líder) e lidos pelos demais
+    a partir do cache compartilhado do host.
+
+    Seguidores só recalculam localmente se o cache não existir ou estiver muito
+    desatualizado (líder encerrado), então novos workers não multiplicam as agregações.
+
+    Cada valor publicado guarda também `consistente_em`: o instante até o qual as escritas
+    certamente estão refletidas (início do cálculo no primário, ou descontado o atraso máximo
+    dos secundários). Pedidos posteriores a uma alteração exigem `consistente_em` após ela.
+    """
+
+    def __init__(
+        self,
+        dashboard_service: DashboardService,
+        cache: CacheCompartilhado,
+        validade_segundos: float,
+        espera_lider_segundos: float = 5.0
+    ):
+        self.dashboard_service = dashboard_service
+        self.cache = cache
+        self.validade_segundos = validade_segundos
+        self.espera_lider_segundos = espera_lider_segundos
+
+    def _calcular_e_publicar(self, primario: bool = False) -> DashboardData:
+        consistente_em = time.time()
+        if not primario and settings.READ_PREFERENCE_DASHBOARD != "primary":
+            consistente_em -= settings.READ_MAX_STALENESS_SEGUNDOS
+        kpis = self.dashboard_service.get_dashboard_kpis(primario=primario)
+        self.cache.set(CHAVE_KPIS, {"kpis": kpis.model_dump(mode="json"), "consistente_em": consistente_em})
+        return kpis
+
+    def _ler_cache(self, gerado_apos: float, apos_alteracao: bool) -> Optional[DashboardData]:
+        encontrado, valor, gerado_em = self.cache.get(CHAVE_KPIS)
+        if not encontrado or not isinstance(valor, dict) or "kpis" not in valor:
+            return None
+        referencia = valor["consistente_em"] if apos_alteracao else gerado_em
+        if referencia >= gerado_apos:
+            return DashboardData(**valor["kpis"])
+        return None
+
+    def atualizar(self):
+        """Tarefa periódica: apenas o líder recalcula e publica os KPIs."""
+        if self.cache.eh_lider():
+            self._calcular_e_publicar()
+
+    def get_dashboard_kpis(self, gerado_apos: Optional[float] = None) -> DashboardData:
+        """
+        Retorna os KPIs do cache compartilhado.
+
+        Args:
+            gerado_apos: Exige KPIs que reflitam as escritas até este instante (`time.time()`),
+                por exemplo após uma alteração detectada; o recálculo, nesse caso, lê do
+                primário. Padrão: dentro da validade do cache.
+        """
+        apos_alteracao = gerado_apos is not None
+        if not apos_alteracao:
+            gerado_apos = time.time() - self.validade_segundos
+
+        kpis = self._ler_cache(gerado_apos, apos_alteracao)
+        if kpis is not None:
+            return kpis
+
+        if self.cache.eh_lider():
+            return self._calcular_e_publicar(primario=apos_alteracao)
+
+        # Seguidor: aguarda o líder publicar um valor novo antes de recalcular localmente
+        prazo = time.monotonic() + self.espera_lider_segundos
+        while time.monotonic() < prazo:
+            time.sleep(0.2)
+            kpis = self._ler_cache(gerado_apos, apos_alteracao)
+            if kpis is not None:
+                return kpis
+
+        return self._calcular_e_publicar(primario=apos_alteracao)
@@ -0,0 +1,58 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class PerfilInicializacao:
+    """
+    Tempos das etapas de inicialização do worker (importações, conexão, índices...)
+    e do primeiro uso de dependências pesadas carregadas sob demanda.
+    """
+
+    def __init__(self):
+        self.etapas: Dict[str, float] = {}
+        self.primeiro_uso: Dict[str, float] = {}
+        self.pronto_em: Optional[float] = None
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa: str, segundos: float):
+        self.etapas[etapa] = round(segundos, 4)
+
+    @contextmanager
+    def medir(self, etapa: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    @contextmanager
+    def medir_primeiro_uso(self, dependencia: str):
+        """Mede o carregamento de uma dependência apenas na primeira vez em que é usada."""
+        if dependencia in self.primeiro_uso:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if dependencia not in self.primeiro_uso:
+                    segundos = round(time.perf_counter() - inicio, 4)
+                    self.primeiro_uso[dependencia] = segundos
+                    print(f"Dependência '{dependencia}' carregada sob demanda em {segundos}s.")
+
+    def marcar_pronto(self):
+        self.pronto_em = round(time.perf_counter() - self._inicio, 4)
+        detalhes = ", ".join(f"{etapa}={segundos}s" for etapa, segundos in self.etapas.items())
+        print(f"Inicialização concluída em {self.pronto_em}s ({detalhes}).")
+
+    def resumo(self) -> dict:
+        return {
+            "total_segundos": self.pronto_em,
+            "etapas": dict(self.etapas),
+            "primeiro_uso": dict(self.primeiro_uso)
+        }
+
+perfil_inicializacao = PerfilInicializacao()
@@ -1,29 +1,267 @@
-import pandas as pd
 import os
 import shutil
 import io
+import json
+import base64
+import uuid
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 from pymongo.collection import Collection
-from pymongo import UpdateOne
+from pymongo import UpdateOne, ASCENDING, DESCENDING
 from datetime import datetime, timezone
-from app.models.produto import Produto, Lote
+from app.models.produto import Produto, Lote, MovimentoConsumo, ItemReconciliacao, ProdutoEan
 from app.database.client import get_database
 from app.services.fornecedor_service import FornecedorService
+from app.services.cache_compartilhado import cache_compartilhado
+from app.services.dashboard_service import invalidar_kpis_secoes
+from app.services.perfil_inicializacao import perfil_inicializacao
 from pathlib import Path
 from app.configs.config import settings
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+def _carregar_pandas():
+    """Importa pandas (e openpyxl, usado como engine) apenas no primeiro uso da importação de planilhas."""
+    with perfil_inicializacao.medir_primeiro_uso("pandas"):
+        import pandas as pd
+        import openpyxl  # noqa: F401
+    return pd
+
+SEM_ESTOQUE_REPORTADO = {"$in": [{"$type": "$estoque_reportado"}, ["missing", "null"]]}
+
+# Estágio de pipeline que recalcula no servidor os campos derivados persistidos
+# (mesmas regras dos `computed_field` de `Produto`). Deve encerrar toda escrita em produtos.
+ETAPA_CAMPOS_DERIVADOS = {
+    "$set": {
+        "valor_estoque_calculado": {
+            "$round": [
+                {"$multiply": [{"$ifNull": ["$preco_unit", 0]}, {"$ifNull": ["$estoque_calculado", 0]}]},
+                2
+            ]
+        },
+        "discrepancia_estoque": {
+            "$cond": [
+                SEM_ESTOQUE_REPORTADO,
+                0,
+                {"$subtract": ["$estoque_reportado", {"$ifNull": ["$estoque_calculado", 0]}]}
+            ]
+        },
+        "valor_estoque_total": {
+            "$cond": [
+                SEM_ESTOQUE_REPORTADO,
+                None,
+                {"$multiply": [{"$ifNull": ["$preco_unit", 0]}, "$estoque_reportado"]}
+            ]
+        }
+    }
+}
+
+ETAPA_DISCREPANCIA_ABSOLUTA = {"$set": {"discrepancia_absoluta": {"$abs": "$discrepancia_estoque"}}}
+
+# Instante da última escrita, usado pela atualização incremental do motor analítico
+ETAPA_ATUALIZADO_EM = {"$set": {"atualizado_em": "$$NOW"}}
+
+PIPELINE_CAMPOS_DERIVADOS = [ETAPA_CAMPOS_DERIVADOS, ETAPA_DISCREPANCIA_ABSOLUTA, ETAPA_ATUALIZADO_EM]
+
+# Facetas do catálogo: nome da faceta -> (campo no documento, máximo de valores retornados)
+FACETAS_CATALOGO = {
+    "secao": ("secao", 100),
+    "subsecao": ("subsecao", 200),
+    "marca": ("marca", 200),
+    "fornecedor": ("fornecedor_cnpj", 200),
+    "avs": ("avs", 2),
+}
+
+# Campos da listagem padrão (enxuta): sem o array de lotes
+CAMPOS_LISTA_PADRAO = [
+    "codigo_lm",
+    "ean",
+    "nome_produto",
+    "marca",
+    "fornecedor_cnpj",
+    "preco_unit",
+    "estoque_calculado",
+    "estoque_reportado",
+    "secao",
+    "subsecao",
+    "avs",
+    "proxima_validade",
+]
+
+# Campos calculados na própria projeção, sem trazer os lotes
+CAMPOS_PROJECAO_CALCULADOS = {
+    "proxima_validade": {
+        "$min": {
+            "$map": {
+                "input": {
+                    "$filter": {
+                        "input": {"$ifNull": ["$lotes", []]},
+                        "as": "lote",
+                        "cond": {"$eq": ["$$lote.ativo", True]}
+                    }
+                },
+                "as": "lote",
+                "in": "$$lote.data_validade"
+            }
+        }
+    }
+}
+
+# Consulta por EAN: apenas o necessário para a tela de contagem, com o lote ativo que vence
+# primeiro escolhido no servidor (sem trafegar o array de lotes)
+PROJECAO_EAN = {
+    "_id": 0,
+    "ean": 1,
+    "codigo_lm": 1,
+    "nome_produto": 1,
+    "estoque_calculado": 1,
+    "estoque_reportado": 1,
+    "lote_vencimento_proximo": {
+        "$reduce": {
+            "input": {
+                "$filter": {
+                    "input": {"$ifNull": ["$lotes", []]},
+                    "as": "lote",
+                    "cond": {"$eq": ["$$lote.ativo", True]}
+                }
+            },
+            "initialValue": None,
+            "in": {
+                "$cond": [
+                    {
+                        "$or": [
+                            {"$eq": ["$$value", None]},
+                            {"$lt": ["$$this.data_validade", "$$value.data_validade"]}
+                        ]
+                    },
+                    {
+                        "codigo_lote": "$$this.codigo_lote",
+                        "data_validade": "$$this.data_validade",
+                        "quantidade_lote": "$$this.quantidade_lote"
+                    },
+                    "$$value"
+                ]
+            }
+        }
+    }
+}
+
+# Validade das marcas de exclusão de produtos (bem acima do intervalo de reconstrução do motor analítico)
+TTL_PRODUTOS_EXCLUIDOS_SEGUNDOS = 86400
+
+# Baixas recentes mantidas em cada produto para o relatório de `consumir_estoque`
+MAX_BAIXAS_REGISTRADAS = 20
+
+CAMPOS_PERSISTIDOS_DERIVADOS = ["valor_estoque_calculado", "discrepancia_estoque", "valor_estoque_total"]
+
+CHAVE_CACHE_FACETAS = "facetas_catalogo"
+
+# Colunas obrigatórias da planilha de estoque importada
+COLUNAS_PLANILHA = ['Material', 'Qtd. Estoque', 'Seção', 'Subseção', 'Estoque Valor', 'Loja']
+
+ORDENACOES_RECONCILIACAO = {
+    "discrepancia_absoluta",
+    "discrepancia_estoque",
+    "valor_estoque_calculado",
+    "valor_estoque_total",
+}
+
+def _literal(valores: dict) -> dict:
+    """Converte valores para `$literal`, para uso seguro em `$set` de pipelines de update."""
+    return {campo: {"$literal": valor} for campo, valor in valores.items()}
+
+def _atualizar_lote(codigo_lote: Any, campos: dict) -> dict:
+    """Expressão que aplica `campos` ao lote `codigo_lote` do array, mantendo os demais."""
+    return {
+        "$map": {
+            "input": {"$ifNull": ["$lotes", []]},
+            "as": "lote",
+            "in": {
+                "$cond": [
+                    {"$eq": ["$$lote.codigo_lote", codigo_lote]},
+                    {"$mergeObjects": ["$$lote", campos]},
+                    "$$lote"
+                ]
+            }
+        }
+    }
+
 class ProdutoService:
-    def __init__(self):
+    def __init__(self, fornecedor_service: Optional[FornecedorService] = None):
         self.db = get_database()
         if self.db is None:
             raise ConnectionError("Falha na conexão com o MongoDB.")
         self.collection: Collection = self.db['produtos']
         self.fornecedor_collection: Collection = self.db['fornecedores']
+        # Marcas de exclusão lidas pela atualização incremental do motor analítico
+        self.excluidos_collection: Collection = self.db['produtos_excluidos']
+        self.arquivados_collection: Collection = self.db['lotes_arquivados']
+        self.relatorios_collection: Collection = get_database("relatorios")['produtos']
+        self.fornecedor_service = fornecedor_service or FornecedorService()
+        self.cache_facetas = cache_compartilhado
+        self.cache_kpis_secoes = cache_compartilhado
+    
+    def _invalidar_kpis_secoes(self, *cod_secoes: Optional[int]):
+        """Invalida os KPIs em cache apenas das seções afetadas por uma escrita."""
+        invalidar_kpis_secoes(self.cache_kpis_secoes, list(cod_secoes))
+    
+    def criar_indices(self):
+        """
+        Cria os índices da coleção e preenche os campos derivados em documentos
+        gravados antes de eles serem persistidos (executado uma vez na inicialização).
+        """
+        self.collection.create_index("codigo_lm")
+        self.collection.create_index("lotes.codigo_lote")
+        self.collection.create_index("cod_secao")
+        self.collection.create_index("ean")
+        self.collection.create_index("atualizado_em")
+        self.excluidos_collection.create_index("excluido_em", expireAfterSeconds=TTL_PRODUTOS_EXCLUIDOS_SEGUNDOS)
+        for campo, _ in FACETAS_CATALOGO.values():
+            self.collection.create_index(campo)
+        for campo in ORDENACOES_RECONCILIACAO:
+            self.collection.create_index(campo)
+
+        resultado = self.collection.update_many(
+            {"discrepancia_absoluta": {"$exists": False}},
+            PIPELINE_CAMPOS_DERIVADOS
+        )
+        if resultado.modified_count:
+            print(f"Campos derivados preenchidos em {resultado.modified_count} produtos.")
         
-    def get_all(self, termo_busca: Optional[str] = None, skip: int = 0, limit: int = 50) -> dict:
-        """Retorna todos os produtos cadastrados."""
+    def get_all(
+        self,
+        termo_busca: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50,
+        secao: Optional[List[str]] = None,
+        subsecao: Optional[List[str]] = None,
+        marca: Optional[List[str]] = None,
+        fornecedor_cnpj: Optional[List[str]] = None,
+        avs: Optional[bool] = None,
+        facetas: bool = False,
+        campos: Optional[List[str]] = None,
+        incluir_lotes: bool = False
+    ) -> dict:
+        """
+        Retorna os produtos cadastrados, com filtros opcionais por seção, subseção,
+        marca, fornecedor e AVS.
+
+        Com `facetas=True`, a página e as contagens por valor de cada faceta são obtidas
+        em uma única agregação (`$facet`); cada faceta é contada com todos os filtros exceto
+        o seu próprio, para que a barra lateral continue mostrando as demais opções do filtro
+        selecionado. Exige `limit` positivo. As contagens do catálogo sem filtros ficam no
+        cache compartilhado entre workers.
+
+        Por padrão a listagem é enxuta (`CAMPOS_LISTA_PADRAO`, sem lotes); `campos` define a
+        projeção e `incluir_lotes=True` sem `campos` retorna o `Produto` completo.
+        """
+        if facetas and limit <= 0:
+            raise ValueError("Informe um limit positivo ao solicitar facetas.")
+
+        projecao = self._projecao(campos, incluir_lotes, padrao=CAMPOS_LISTA_PADRAO)
         query = {}
+        filtros = {}
 
         if termo_busca:
             regex_term = {"$regex": termo_busca, "$options": "i"}
@@ -39,28 +277,273 @@ class ProdutoService:
             
             query["$or"] = or_conditions
 
-        total = self.collection.count_documents(query)
-        
-        cursor = self.collection.find(query).skip(skip)
-        
-        if limit > 0:
-            cursor = cursor.limit(limit)
+        for campo, valores in (
+            ("secao", secao),
+            ("subsecao", subsecao),
+            ("marca", marca),
+            ("fornecedor_cnpj", fornecedor_cnpj),
+        ):
+            if valores:
+                filtros[campo] = valores[0] if len(valores) == 1 else {"$in": valores}
+
+        if avs is not None:
+            filtros["avs"] = avs
+
+        # `query` (busca textual) é comum a todas as facetas; `filtros`, um por faceta
+        base = dict(query)
+        query.update(filtros)
+
+        contagens = None
+        if facetas and not query:
+            contagens = self._contagens_catalogo()
+
+        if facetas and contagens is None:
+            produtos_data, total, contagens = self._buscar_com_facetas(base, filtros, skip, limit, projecao)
+        else:
+            total = self.collection.count_documents(query)
+            
+            cursor = self.collection.find(query, projecao).skip(skip)
             
-        produtos_data = list(cursor)
+            if limit > 0:
+                cursor = cursor.limit(limit)
+                
+            produtos_data = list(cursor)
+
+        resposta = {
+            "produtos": self._montar_produtos(produtos_data, projecao),
+            "total": total,
+            "skip": skip,
+            "limit": limit if limit > 0 else total
+        }
+        if facetas:
+            resposta["facetas"] = contagens
+        return resposta
+
+    def _buscar_com_facetas(self, base: dict, filtros: dict, skip: int, limit: int, projecao: Optional[dict] = None) -> tuple:
+        """
+        Página, total e contagens das facetas em uma única agregação. A página e o total
+        aplicam `base` e todos os `filtros`; cada faceta aplica `base` e os filtros das demais.
+
+        A agregação começa por um `$match` indexado com a união do que a página e as facetas
+        precisam (o `$match` dentro do `$facet` não usa índice). Uma faceta que dependeria do
+        catálogo inteiro (sem busca e com apenas o próprio filtro) vem das contagens do catálogo em cache.
+        """
+        def restantes(excluir: Optional[str] = None) -> dict:
+            return {campo: valor for campo, valor in filtros.items() if campo != excluir}
+
+        def filtrar(excluir: Optional[str] = None) -> list:
+            condicoes = restantes(excluir)
+            return [{"$match": condicoes}] if condicoes else []
+
+        do_catalogo = [
+            nome for nome, (campo, _) in FACETAS_CATALOGO.items()
+            if not base and not restantes(campo)
+        ]
+        agregadas = {nome: faceta for nome, faceta in FACETAS_CATALOGO.items() if nome not in do_catalogo}
+
+        # Conjuntos de filtros exigidos; um conjunto que contém outro já está coberto por ele
+        conjuntos = [restantes(), *(restantes(campo) for campo, _ in agregadas.values())]
+        minimos = []
+        for conjunto in conjuntos:
+            if conjunto in minimos or any(outro.keys() < conjunto.keys() for outro in conjuntos):
+                continue
+            minimos.append(conjunto)
+
+        condicoes = [base] if base else []
+        if all(minimos):
+            condicoes.append(minimos[0] if len(minimos) == 1 else {"$or": minimos})
+        inicial = condicoes[0] if len(condicoes) == 1 else ({"$and": condicoes} if condicoes else {})
+
+        pagina = [*filtrar(), {"$skip": skip}, {"$limit": limit}]
+        if projecao is not None:
+            pagina.append({"$project": projecao})
+
+        pipeline = [
+            {"$match": inicial},
+            {
+                "$facet": {
+                    "produtos": pagina,
+                    "total": [*filtrar(), {"$count": "total"}],
+                    **{
+                        nome: [
+                            *filtrar(campo),
+                            {"$sortByCount": f"${campo}"},
+                            {"$limit": maximo}
+                        ]
+                        for nome, (campo, maximo) in agregadas.items()
+                    }
+                }
+            }
+        ]
+
+        resultado = next(self.collection.aggregate(pipeline), {})
+        total = (resultado.get("total") or [{"total": 0}])[0]["total"]
+
+        contagens = self._formatar_contagens(resultado, agregadas)
+        if do_catalogo:
+            catalogo = self._contagens_catalogo()
+            for nome in do_catalogo:
+                contagens[nome] = catalogo[nome]
+        contagens = {nome: contagens[nome] for nome in FACETAS_CATALOGO}
+
+        return resultado.get("produtos", []), total, contagens
+
+    def _contagens_catalogo(self) -> dict:
+        """Contagens das facetas no catálogo inteiro, mantidas no cache compartilhado entre workers."""
+        encontrado, contagens, _ = self.cache_facetas.get(CHAVE_CACHE_FACETAS, settings.CACHE_FACETAS_TTL_SEGUNDOS)
+        if encontrado:
+            return contagens
+
+        resultado = next(self.collection.aggregate([
+            {
+                "$facet": {
+                    nome: [{"$sortByCount": f"${campo}"}, {"$limit": maximo}]
+                    for nome, (campo, maximo) in FACETAS_CATALOGO.items()
+                }
+            }
+        ]), {})
+        contagens = self._formatar_contagens(resultado, FACETAS_CATALOGO)
+        self.cache_facetas.set(CHAVE_CACHE_FACETAS, contagens)
+        return contagens
+
+    def _formatar_contagens(self, resultado: dict, facetas: dict) -> dict:
+        """Converte a saída de `$sortByCount` em `{valor, quantidade}`, com o nome dos fornecedores."""
+        contagens = {
+            nome: [
+                {"valor": item["_id"], "quantidade": item["count"]}
+                for item in resultado.get(nome, [])
+                if item["_id"] not in (None, "")
+            ]
+            for nome in facetas
+        }
+
+        if "fornecedor" in contagens:
+            nomes_fornecedores = self.fornecedor_service.get_nomes_por_cnpj(
+                [item["valor"] for item in contagens["fornecedor"]]
+            )
+            for item in contagens["fornecedor"]:
+                item["nome"] = nomes_fornecedores.get(item["valor"])
+
+        return contagens
+
+    @staticmethod
+    def _projecao(campos: Optional[List[str]], incluir_lotes: bool, padrao: Optional[List[str]]) -> Optional[dict]:
+        """
+        Monta a projeção do Mongo para os campos pedidos.
+
+        Retorna None quando o documento completo deve ser carregado (como `Produto`).
+        Sem `campos`, usa `padrao`; se `padrao` também for None, o documento é completo.
+        """
+        if campos is None:
+            if padrao is None or incluir_lotes:
+                return None
+            campos = padrao
+
+        permitidos = (
+            set(Produto.model_fields) - {"fornecedor_nome"}
+        ) | set(CAMPOS_PERSISTIDOS_DERIVADOS) | set(CAMPOS_PROJECAO_CALCULADOS)
+
+        invalidos = [campo for campo in campos if campo not in permitidos]
+        if invalidos:
+            raise ValueError(f"Campos inválidos: {', '.join(invalidos)}.")
+
+        projecao = {"_id": 0, "codigo_lm": 1}
+        for campo in campos:
+            if campo == "lotes":
+                incluir_lotes = True
+            else:
+                projecao[campo] = CAMPOS_PROJECAO_CALCULADOS.get(campo, 1)
+        if incluir_lotes:
+            projecao["lotes"] = 1
+        return projecao
+
+    def _montar_produtos(self, produtos_data: List[dict], projecao: Optional[dict]) -> list:
+        """Converte os documentos em `Produto` (documento completo) ou em dicts projetados, com o nome do fornecedor."""
+        fornecedor_map = self.fornecedor_service.get_nomes_por_cnpj(
+            [data["fornecedor_cnpj"] for data in produtos_data if data.get("fornecedor_cnpj")]
+        )
 
-        fornecedor_service = FornecedorService()
-        todos_fornecedores = fornecedor_service.get_all()
-        fornecedor_map = {f.cnpj: f.nome for f in todos_fornecedores}
-        
         resultados = []
         for data in produtos_data:
-            produto = Produto(**data)
-            if produto.fornecedor_cnpj and produto.fornecedor_cnpj in fornecedor_map:
-                produto.fornecedor_nome = fornecedor_map[produto.fornecedor_cnpj]
+            if projecao is None:
+                produto = Produto(**data)
+                if produto.fornecedor_cnpj and produto.fornecedor_cnpj in fornecedor_map:
+                    produto.fornecedor_nome = fornecedor_map[produto.fornecedor_cnpj]
+            else:
+                produto = data
+                if "fornecedor_cnpj" in projecao:
+                    produto["fornecedor_nome"] = fornecedor_map.get(data.get("fornecedor_cnpj"))
             resultados.append(produto)
+        return resultados
+
+    def get_produto(self, codigo_lm: int, campos: Optional[List[str]] = None, incluir_lotes: bool = True):
+        """Busca um produto retornando apenas os campos pedidos (ou o `Produto` completo)."""
+        projecao = self._projecao(campos, incluir_lotes, padrao=None if incluir_lotes else CAMPOS_LISTA_PADRAO)
+        produto_data = self.collection.find_one({"codigo_lm": codigo_lm}, projecao)
+        if not produto_data:
+            return None
+        return self._montar_produtos([produto_data], projecao)[0]
+
+    def get_reconciliacao(
+        self,
+        tipo: str = "todas",
+        discrepancia_minima: int = 1,
+        cod_secao: Optional[int] = None,
+        ordenar_por: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50
+    ) -> dict:
+        """
+        Lista de trabalho da reconciliação de estoque sobre o catálogo inteiro.
+
+        Filtra e ordena pelos campos derivados persistidos e indexados, sem recalcular
+        a discrepância produto a produto.
+
+        Args:
+            tipo: "falta" (reportado > calculado, lotes a atribuir), "sobra" (calculado > reportado) ou "todas"
+            discrepancia_minima: Valor absoluto mínimo da discrepância
+            cod_secao: Restringe a uma seção
+            ordenar_por: Campo de ordenação (padrão: maior discrepância primeiro)
+        """
+        if tipo not in ("falta", "sobra", "todas"):
+            raise ValueError("Tipo deve ser 'falta', 'sobra' ou 'todas'.")
+        if ordenar_por is not None and ordenar_por not in ORDENACOES_RECONCILIACAO:
+            raise ValueError(f"Ordenação deve ser uma de: {', '.join(sorted(ORDENACOES_RECONCILIACAO))}.")
+
+        minimo = max(discrepancia_minima, 1)
+        if tipo == "falta":
+            query = {"discrepancia_estoque": {"$gte": minimo}}
+            ordenacao = [("discrepancia_estoque", DESCENDING)]
+        elif tipo == "sobra":
+            query = {"discrepancia_estoque": {"$lte": -minimo}}
+            ordenacao = [("discrepancia_estoque", ASCENDING)]
+        else:
+            query = {"discrepancia_absoluta": {"$gte": minimo}}
+            ordenacao = [("discrepancia_absoluta", DESCENDING)]
+
+        if ordenar_por:
+            ordenacao = [(ordenar_por, DESCENDING)]
+        ordenacao.append(("codigo_lm", ASCENDING))
+
+        if cod_secao is not None:
+            query["cod_secao"] = cod_secao
+
+        total = self.relatorios_collection.count_documents(query)
+
+        projecao = {campo: 1 for campo in ItemReconciliacao.model_fields if campo != "valor_discrepancia"}
+        projecao["_id"] = 0
+        cursor = self.relatorios_collection.find(query, projecao).sort(ordenacao).skip(skip)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        itens = []
+        for data in cursor:
+            item = ItemReconciliacao(**data)
+            item.valor_discrepancia = round(item.preco_unit * item.discrepancia_estoque, 2)
+            itens.append(item)
 
         return {
-            "produtos": resultados,
+            "items": itens,
             "total": total,
             "skip": skip,
             "limit": limit if limit > 0 else total
@@ -69,8 +552,12 @@ class ProdutoService:
     def create(self, produto: Produto) -> Produto:
         """Cria um novo produto."""    
         produto_data = produto.model_dump(exclude={'fornecedor_nome'})
+        produto_data["discrepancia_absoluta"] = abs(produto_data["discrepancia_estoque"] or 0)
+        produto_data["atualizado_em"] = datetime.now(timezone.utc)
         
         self.collection.insert_one(produto_data)
+        self.cache_facetas.remover(CHAVE_CACHE_FACETAS)
+        self._invalidar_kpis_secoes(produto_data.get("cod_secao"))
         
         return Produto(**produto_data)
 
@@ -82,13 +569,41 @@ class ProdutoService:
             return Produto(**produto_data)
         return None
 
+    def get_by_ean(self, ean: int) -> Optional[ProdutoEan]:
+        """Busca o registro enxuto de um produto pelo EAN."""
+        produto_data = self.collection.find_one({"ean": ean}, PROJECAO_EAN)
+
+        if produto_data:
+            return ProdutoEan(**produto_data)
+        return None
+
+    def get_by_eans(self, eans: List[int]) -> dict:
+        """
+        Busca vários EANs em uma única consulta pelo índice `ean`. Os itens seguem a ordem
+        dos EANs informados (sem repetições) e os não cadastrados são listados à parte.
+        """
+        unicos = list(dict.fromkeys(eans))
+        encontrados = {}
+        for produto_data in self.collection.find({"ean": {"$in": unicos}}, PROJECAO_EAN):
+            encontrados.setdefault(produto_data["ean"], produto_data)
+
+        return {
+            "items": [ProdutoEan(**encontrados[ean]) for ean in unicos if ean in encontrados],
+            "nao_encontrados": [ean for ean in unicos if ean not in encontrados]
+        }
+
     def adicionar_lote(self, codigo_lm: int, lote: Lote) -> Optional[Produto]:
         """Adiciona um novo lote ao produto e atualiza o estoque calculado."""
         produto_atual = self.get_by_codigo_lm(codigo_lm)
         if not produto_atual:
             return None
         
-        if self.collection.find_one({"lotes.codigo_lote": lote.codigo_lote}):
+        # Códigos de lotes já arquivados também são recusados: o arquivo é indexado por
+        # (codigo_lm, codigo_lote) e um novo arquivamento substituiria o registro (e a perda) anterior
+        if (
+            self.collection.find_one({"lotes.codigo_lote": lote.codigo_lote}, {"_id": 1})
+            or self.arquivados_collection.find_one({"codigo_lote": lote.codigo_lote}, {"_id": 1})
+        ):
             raise ValueError(f"Lote com código {lote.codigo_lote} já existe.")
         
         lote.valor_lote = produto_atual.preco_unit * lote.quantidade_lote
@@ -101,13 +616,19 @@ class ProdutoService:
         
         result = self.collection.update_one(
             {"codigo_lm": codigo_lm},
-            {
-                "$push": {"lotes": lote_data},
-                "$inc": {"estoque_calculado": incremento_estoque} 
-            }
+            [
+                {
+                    "$set": {
+                        "lotes": {"$concatArrays": [{"$ifNull": ["$lotes", []]}, [{"$literal": lote_data}]]},
+                        "estoque_calculado": {"$add": [{"$ifNull": ["$estoque_calculado", 0]}, incremento_estoque]}
+                    }
+                },
+                *PIPELINE_CAMPOS_DERIVADOS
+            ]
         )
 
         if result.modified_count == 1:
+            self._invalidar_kpis_secoes(produto_atual.cod_secao)
             return self.get_by_codigo_lm(codigo_lm)
         
         return None
@@ -132,8 +653,10 @@ class ProdutoService:
         
         result = self.collection.update_one(
             {"codigo_lm": codigo_lm},
-            {"$set": update_data}
+            [*([{"$set": _literal(update_data)}] if update_data else []), *PIPELINE_CAMPOS_DERIVADOS]
         )
+        self.cache_facetas.remover(CHAVE_CACHE_FACETAS)
+        self._invalidar_kpis_secoes(produto_atual.cod_secao, update_data.get("cod_secao", produto_atual.cod_secao))
         
         if result.matched_count == 1:
             return self.get_by_codigo_lm(codigo_lm)
@@ -142,18 +665,140 @@ class ProdutoService:
 
     def delete(self, codigo_lm: int) -> bool:
         """Exclui o produto principal e todos os seus lotes."""
-        result = self.collection.delete_one({"codigo_lm": codigo_lm})
+        removido = self.collection.find_one_and_delete({"codigo_lm": codigo_lm}, {"cod_secao": 1})
+        self.cache_facetas.remover(CHAVE_CACHE_FACETAS)
+        if removido is None:
+            return False
+
+        self.excluidos_collection.update_one(
+            {"_id": codigo_lm},
+            {"$currentDate": {"excluido_em": True}},
+            upsert=True
+        )
+        self._invalidar_kpis_secoes(removido.get("cod_secao"))
+        return True
+
+    def _buscar_lote(self, codigo_lm: int, codigo_lote: str) -> Optional[tuple]:
+        """
+        Busca um único lote pelo código, trazendo do banco apenas o lote encontrado
+        (projeção posicional `lotes.$`), o preço unitário e a seção do produto.
+
+        Returns:
+            (preco_unit, Lote, cod_secao) ou None se o produto ou o lote não existir.
+        """
+        produto_data = self.collection.find_one(
+            {"codigo_lm": codigo_lm, "lotes.codigo_lote": codigo_lote},
+            {"_id": 0, "preco_unit": 1, "cod_secao": 1, "lotes.$": 1}
+        )
+        if not produto_data or not produto_data.get("lotes"):
+            return None
+        return produto_data.get("preco_unit", 0.0), Lote(**produto_data["lotes"][0]), produto_data.get("cod_secao")
+
+    @staticmethod
+    def _codificar_cursor_lote(lote: dict) -> str:
+        valor = {"v": lote["data_validade"].isoformat(), "c": lote["codigo_lote"]}
+        return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode()
+
+    @staticmethod
+    def _decodificar_cursor_lote(cursor: str) -> tuple:
+        try:
+            valor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(valor["v"]), valor["c"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Cursor inválido.")
+
+    def listar_lotes(
+        self,
+        codigo_lm: int,
+        ativo: Optional[bool] = None,
+        vence_ate: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Optional[dict]:
+        """
+        Lista os lotes de um produto ordenados por validade (FEFO), com filtros e
+        paginação por cursor.
 
-        return result.deleted_count == 1
+        O filtro, a ordenação e o recorte da página são feitos no servidor
+        (`$filter`, `$sortArray`, `$slice`), então apenas a página pedida sai do banco.
+
+        Returns:
+            Página de lotes ou None se o produto não existir.
+        """
+        condicoes = []
+        if ativo is not None:
+            condicoes.append({"$eq": ["$$lote.ativo", ativo]})
+        if vence_ate is not None:
+            condicoes.append({"$lte": ["$$lote.data_validade", vence_ate]})
+
+        condicoes_pagina = list(condicoes)
+        if cursor:
+            validade_cursor, codigo_cursor = self._decodificar_cursor_lote(cursor)
+            condicoes_pagina.append({
+                "$or": [
+                    {"$gt": ["$$lote.data_validade", validade_cursor]},
+                    {
+                        "$and": [
+                            {"$eq": ["$$lote.data_validade", validade_cursor]},
+                            {"$gt": ["$$lote.codigo_lote", codigo_cursor]}
+                        ]
+                    }
+                ]
+            })
+
+        def filtrar(condicoes_lote: list) -> dict:
+            return {
+                "$filter": {
+                    "input": {"$ifNull": ["$lotes", []]},
+                    "as": "lote",
+                    "cond": {"$and": condicoes_lote} if condicoes_lote else True
+                }
+            }
+
+        pipeline = [
+            {"$match": {"codigo_lm": codigo_lm}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "total": {"$size": filtrar(condicoes)},
+                    "lotes": {
+                        "$slice": [
+                            {
+                                "$sortArray": {
+                                    "input": filtrar(condicoes_pagina),
+                                    "sortBy": {"data_validade": 1, "codigo_lote": 1}
+                                }
+                            },
+                            limit + 1
+                        ]
+                    }
+                }
+            }
+        ]
+
+        resultado = next(self.collection.aggregate(pipeline), None)
+        if resultado is None:
+            return None
+
+        lotes_data = resultado["lotes"]
+        proximo_cursor = None
+        if len(lotes_data) > limit:
+            lotes_data = lotes_data[:limit]
+            proximo_cursor = self._codificar_cursor_lote(lotes_data[-1])
+
+        return {
+            "items": [Lote(**lote) for lote in lotes_data],
+            "total": resultado["total"],
+            "limit": limit,
+            "proximo_cursor": proximo_cursor
+        }
 
     def update_lote(self, codigo_lm: int, codigo_lote: int, lote_update: Lote) -> Optional[Produto]:
         """Atualiza os campos de um lote específico dentro do produto."""
-        produto_atual = self.get_by_codigo_lm(codigo_lm)
+        encontrado = self._buscar_lote(codigo_lm, codigo_lote)
+        if not encontrado: return None
         
-        if not produto_atual: return None
-        
-        lote_antigo = next((l for l in produto_atual.lotes if l.codigo_lote == codigo_lote), None)
-        if not lote_antigo: return None
+        preco_unit, lote_antigo, cod_secao = encontrado
         
         delta_quantidade = 0
         status_mudou_para_inativo = (lote_update.ativo is False and lote_antigo.ativo is True)
@@ -168,50 +813,398 @@ class ProdutoService:
         
         update_data = lote_update.model_dump(exclude={'codigo_lote', 'fornecedor_nome'}, exclude_unset=True)
         update_data["data_atualizacao_ativo"] = datetime.now(timezone.utc)
-        update_data["valor_lote"] = produto_atual.preco_unit * lote_update.quantidade_lote
+        if status_mudou_para_inativo or status_mudou_para_ativo:
+            # Base da idade de arquivamento dos lotes inativos
+            update_data["data_alteracao_status"] = update_data["data_atualizacao_ativo"]
+        update_data["valor_lote"] = preco_unit * lote_update.quantidade_lote
         update_data.pop('codigo_lote', None) 
         
-        set_fields = {
-            f"lotes.$.{key}": value 
-            for key, value in update_data.items()
-        }
-
         result = self.collection.update_one(
             {"codigo_lm": codigo_lm, "lotes.codigo_lote": codigo_lote},
-            {
-                "$set": set_fields,
-                "$inc": {"estoque_calculado": delta_quantidade}
-            }
+            [
+                {
+                    "$set": {
+                        "lotes": _atualizar_lote(codigo_lote, {"$literal": update_data}),
+                        "estoque_calculado": {"$add": [{"$ifNull": ["$estoque_calculado", 0]}, delta_quantidade]}
+                    }
+                },
+                *PIPELINE_CAMPOS_DERIVADOS
+            ]
         )
 
         if result.modified_count == 1:
+            self._invalidar_kpis_secoes(cod_secao)
             return self.get_by_codigo_lm(codigo_lm)
         
         return None
 
     def deletar_lote(self, codigo_lm: int, codigo_lote: int) -> bool:
         """Remove um lote específico da lista de lotes de um produto."""
-        produto_atual = self.get_by_codigo_lm(codigo_lm)
-        if not produto_atual: return False
+        encontrado = self._buscar_lote(codigo_lm, codigo_lote)
+        if not encontrado: return False
         
-        lote_para_deletar = next((l for l in produto_atual.lotes if l.codigo_lote == codigo_lote), None)
-        if not lote_para_deletar or lote_para_deletar.ativo is False:
+        _, lote_para_deletar, cod_secao = encontrado
+        if lote_para_deletar.ativo is False:
             return False
         
         quantidade_a_subtrair = lote_para_deletar.quantidade_lote
         
         result = self.collection.update_one(
-           {"codigo_lm": codigo_lm, "lotes.codigo_lote": codigo_lote},
+            {"codigo_lm": codigo_lm, "lotes.codigo_lote": codigo_lote},
+            [
+                {
+                    "$set": {
+                        "lotes": _atualizar_lote(codigo_lote, {
+                            "ativo": False,
+                            "data_alteracao_status": datetime.now(timezone.utc)
+                        }),
+                        "estoque_calculado": {"$subtract": [{"$ifNull": ["$estoque_calculado", 0]}, quantidade_a_subtrair]}
+                    }
+                },
+                *PIPELINE_CAMPOS_DERIVADOS
+            ]
+        )
+        
+        if result.modified_count == 1:
+            self._invalidar_kpis_secoes(cod_secao)
+            return True
+        return False
+    
+    def _pipeline_consumo_fefo(self, quantidade: int, token: str) -> list:
+        """
+        Pipeline de update que baixa `quantidade` dos lotes ativos em ordem FEFO
+        (menor data de validade primeiro), de forma atômica no próprio documento.
+        
+        Para cada lote ativo, soma-se a quantidade dos lotes ativos que vencem antes dele
+        (empate desfeito pela posição no array); a baixa do lote é o que sobra da demanda
+        após esses lotes, limitada à sua quantidade. A comparação percorre apenas os lotes
+        ativos, e os inativos são mantidos como estão.
+        
+        O total baixado é registrado em `baixas_recentes` com `token`, para que o chamador
+        leia de volta quanto foi de fato consumido.
+        """
+        quantidade_antes = {
+            "$sum": {
+                "$map": {
+                    "input": "$_ativos",
+                    "as": "outro",
+                    "in": {
+                        "$cond": [
+                            {
+                                "$or": [
+                                    {"$lt": ["$$outro.data_validade", "$$lote.data_validade"]},
+                                    {
+                                        "$and": [
+                                            {"$eq": ["$$outro.data_validade", "$$lote.data_validade"]},
+                                            {"$lt": ["$$outro.i", "$$i"]}
+                                        ]
+                                    }
+                                ]
+                            },
+                            "$$outro.quantidade_lote",
+                            0
+                        ]
+                    }
+                }
+            }
+        }
+        
+        baixa_do_lote = {
+            "$cond": [
+                {"$eq": ["$$lote.ativo", True]},
+                {"$max": [0, {"$min": ["$$lote.quantidade_lote", {"$subtract": [quantidade, quantidade_antes]}]}]},
+                0
+            ]
+        }
+        
+        nova_quantidade = {"$subtract": ["$$lote.quantidade_lote", "$$lote._baixa"]}
+        esgotado = {"$lte": [nova_quantidade, 0]}
+        indices = {"$range": [0, {"$size": "$lotes"}]}
+        
+        return [
             {
                 "$set": {
-                    "lotes.$.ativo": False, 
-                    "lotes.$.data_alteracao_status": datetime.now(timezone.utc)
-                },
-                "$inc": {"estoque_calculado": -quantidade_a_subtrair}
+                    "_ativos": {
+                        "$filter": {
+                            "input": {
+                                "$map": {
+                                    "input": indices,
+                                    "as": "i",
+                                    "in": {
+                                        "$let": {
+                                            "vars": {"lote": {"$arrayElemAt": ["$lotes", "$$i"]}},
+                                            "in": {
+                                                "i": "$$i",
+                                                "ativo": "$$lote.ativo",
+                                                "data_validade": "$$lote.data_validade",
+                                                "quantidade_lote": "$$lote.quantidade_lote"
+                                            }
+                                        }
+                                    }
+                                }
+                            },
+                            "as": "lote",
+                            "cond": {"$eq": ["$$lote.ativo", True]}
+                        }
+                    }
+                }
+            },
+            {
+                "$set": {
+                    "lotes": {
+                        "$map": {
+                            "input": indices,
+                            "as": "i",
+                            "in": {
+                                "$let": {
+                                    "vars": {"lote": {"$arrayElemAt": ["$lotes", "$$i"]}},
+                                    "in": {"$mergeObjects": ["$$lote", {"_baixa": baixa_do_lote}]}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            {
+                "$set": {
+                    "estoque_calculado": {
+                        "$subtract": [{"$ifNull": ["$estoque_calculado", 0]}, {"$sum": "$lotes._baixa"}]
+                    },
+                    "baixas_recentes": {
+                        "$slice": [
+                            {
+                                "$concatArrays": [
+                                    {"$ifNull": ["$baixas_recentes", []]},
+                                    [{"token": token, "quantidade": {"$sum": "$lotes._baixa"}, "em": "$$NOW"}]
+                                ]
+                            },
+                            -MAX_BAIXAS_REGISTRADAS
+                        ]
+                    },
+                    "lotes": {
+                        "$map": {
+                            "input": "$lotes",
+                            "as": "lote",
+                            "in": {
+                                "$cond": [
+                                    {"$gt": ["$$lote._baixa", 0]},
+                                    {
+                                        "$mergeObjects": [
+                                            "$$lote",
+                                            {
+                                                "quantidade_lote": nova_quantidade,
+                                                "valor_lote": {"$multiply": ["$preco_unit", nova_quantidade]},
+                                                "ativo": {"$not": [esgotado]},
+                                                "data_alteracao_status": {"$cond": [esgotado, "$$NOW", "$$lote.data_alteracao_status"]},
+                                                "motivo_inativacao": {"$cond": [esgotado, "consumido", "$$lote.motivo_inativacao"]}
+                                            }
+                                        ]
+                                    },
+                                    "$$lote"
+                                ]
+                            }
+                        }
+                    }
+                }
+            },
+            {"$unset": ["lotes._baixa", "_ativos"]},
+            *PIPELINE_CAMPOS_DERIVADOS
+        ]
+    
+    def consumir_estoque(self, movimentos: List[MovimentoConsumo]) -> dict:
+        """
+        Baixa saídas de estoque (vendas/retiradas) nos lotes ativos em ordem FEFO.
+        
+        Os movimentos são somados por produto e aplicados num único `bulk_write` não
+        ordenado; o update de cada produto calcula a alocação no servidor (sem ler e
+        regravar lote a lote) e registra o total baixado com o token da chamada. O
+        relatório vem de uma única leitura desses registros, portanto reflete o que foi
+        de fato baixado mesmo com consumos concorrentes. Lotes zerados são desativados
+        com motivo "consumido".
+        """
+        demanda = {}
+        for movimento in movimentos:
+            demanda[movimento.codigo_lm] = demanda.get(movimento.codigo_lm, 0) + movimento.quantidade
+
+        token = uuid.uuid4().hex
+        operacoes = [
+            UpdateOne({"codigo_lm": codigo_lm, "lotes.ativo": True}, self._pipeline_consumo_fefo(quantidade, token))
+            for codigo_lm, quantidade in demanda.items()
+        ]
+        if operacoes:
+            self.collection.bulk_write(operacoes, ordered=False)
+
+        baixas = {
+            item["codigo_lm"]: item
+            for item in self.collection.find(
+                {"codigo_lm": {"$in": list(demanda)}, "baixas_recentes.token": token},
+                {"_id": 0, "codigo_lm": 1, "cod_secao": 1, "baixas_recentes": {"$elemMatch": {"token": token}}}
+            )
+        }
+
+        sem_lote_ativo = [codigo for codigo in demanda if codigo not in baixas]
+        existentes = set()
+        if sem_lote_ativo:
+            existentes = {
+                item["codigo_lm"]
+                for item in self.collection.find({"codigo_lm": {"$in": sem_lote_ativo}}, {"_id": 0, "codigo_lm": 1})
             }
-        )
+
+        secoes_afetadas = []
+        nao_alocado = []
+        quantidade_consumida = 0
+        produtos_atualizados = 0
+
+        for codigo_lm, quantidade in demanda.items():
+            baixa = baixas.get(codigo_lm)
+            if baixa is None and codigo_lm not in existentes:
+                continue
+
+            consumido = baixa["baixas_recentes"][0]["quantidade"] if baixa else 0
+            if consumido < quantidade:
+                nao_alocado.append({"codigo_lm": codigo_lm, "quantidade": quantidade - consumido})
+            if consumido > 0:
+                quantidade_consumida += consumido
+                produtos_atualizados += 1
+                secoes_afetadas.append(baixa.get("cod_secao"))
+
+        if secoes_afetadas:
+            self._invalidar_kpis_secoes(*secoes_afetadas)
+        
+        return {
+            "movimentos_recebidos": len(movimentos),
+            "produtos_atualizados": produtos_atualizados,
+            "quantidade_consumida": quantidade_consumida,
+            "nao_alocado": nao_alocado,
+            "produtos_nao_encontrados": [
+                codigo for codigo in sem_lote_ativo if codigo not in existentes
+            ]
+        }
+    
+    @staticmethod
+    def _pipeline_importacao(dados_set: dict, dados_setOnInsert: dict) -> list:
+        """
+        Pipeline de upsert da importação: sobrescreve `dados_set`, preenche `dados_setOnInsert`
+        apenas em documentos novos (sem `_id` antes do upsert) e recalcula os campos derivados.
+        """
+        documento_novo = {"$eq": [{"$type": "$_id"}, "missing"]}
+        return [
+            {
+                "$set": {
+                    **_literal(dados_set),
+                    **{
+                        campo: {"$cond": [documento_novo, {"$literal": valor}, f"${campo}"]}
+                        for campo, valor in dados_setOnInsert.items()
+                    }
+                }
+            },
+            *PIPELINE_CAMPOS_DERIVADOS
+        ]
+    
+    def ler_planilha(self, fonte) -> "pd.DataFrame":
+        """
+        Etapa de leitura da importação: carrega a planilha (caminho ou buffer em memória)
+        e valida as colunas esperadas.
+        """
+        pd = _carregar_pandas()
+        df = pd.read_excel(fonte, engine='openpyxl')
+
+        if not all(col in df.columns for col in COLUNAS_PLANILHA):
+            raise ValueError(f"Arquivo fora do formato. Colunas esperadas: {COLUNAS_PLANILHA}")
+        return df
+
+    def transformar_planilha(self, df: "pd.DataFrame") -> List[UpdateOne]:
+        """Etapa de transformação da importação: converte as linhas da planilha em operações de upsert."""
+        pd = _carregar_pandas()
+
+        # Limpeza de dados
+        df = df.dropna(subset=['Material', 'Seção', 'Subseção'])
+        df = df[df['Material'].astype(str).str.strip() != '']
+        
+        # Extração de código LM e nome do produto
+        df['codigo_lm_str'] = df['Material'].astype(str).str.slice(0, 8).str.strip()
+        df['nome_produto'] = df['Material'].astype(str).str.slice(8).str.strip().str.lstrip('-').str.strip()
+        df['codigo_lm'] = pd.to_numeric(df['codigo_lm_str'], errors='coerce')
+        df['estoque_reportado'] = pd.to_numeric(df['Qtd. Estoque'], errors='coerce').fillna(0).astype(int)
+        
+        # Função para limpar valores monetários
+        def limpar_valor_monetario(valor) -> float:
+            if pd.isna(valor):
+                return 0.0
+            valor_str = str(valor).strip()
+            if ',' in valor_str:
+                valor_str = valor_str.replace('.', '').replace(',', '.')
+            res = pd.to_numeric(valor_str, errors='coerce')
+            return round(float(res), 2) if not pd.isna(res) else 0.0
+        
+        df['estoque_valor_float'] = df['Estoque Valor'].apply(limpar_valor_monetario)
+        
+        # Cálculo do preço unitário
+        df['preco_unit_calculado'] = 0.0
+        mask_valido = df['estoque_reportado'] > 0
+        df.loc[mask_valido, 'preco_unit_calculado'] = (
+            df['estoque_valor_float'] / df['estoque_reportado']
+        ).round(2)
+        
+        # Processamento de seção e subseção
+        secao_split = df['Seção'].astype(str).str.split(' - ', n=1, expand=True)
+        df['cod_secao'] = pd.to_numeric(secao_split[0], errors='coerce')
+        df['secao'] = secao_split[1].str.strip() if secao_split.shape[1] > 1 else None
+        
+        subsecao_split = df['Subseção'].astype(str).str.split(' - ', n=1, expand=True)
+        df['cod_subsecao'] = pd.to_numeric(subsecao_split[0], errors='coerce')
+        df['subsecao'] = subsecao_split[1].str.strip() if subsecao_split.shape[1] > 1 else None
         
-        return result.modified_count == 1
+        # Limpeza final
+        df = df.dropna(subset=['codigo_lm'])
+        df['codigo_lm'] = df['codigo_lm'].astype(int)
+        df = df.where(pd.notna(df), None)
+        
+        # Preparação de operações bulk
+        operacoes_bulk = []
+        for record in df.to_dict("records"):
+            filtro = {"codigo_lm": record['codigo_lm']}
+            
+            # Dados que sempre serão atualizados
+            dados_set = {
+                "estoque_reportado": record['estoque_reportado'],
+                "nome_produto": record['nome_produto'],
+                "cod_secao": record.get('cod_secao'),
+                "secao": record.get('secao'),
+                "cod_subsecao": record.get('cod_subsecao'),
+                "subsecao": record.get('subsecao'),
+                "preco_unit": record.get('preco_unit_calculado', 0.0),
+            }
+            
+            # Dados inseridos apenas se for um produto novo
+            dados_setOnInsert = {
+                "codigo_lm": record['codigo_lm'],
+                "marca": "Aguardando Cadastro",
+                "ficha_tec": "Aguardando Cadastro",
+                "link_prod": "Aguardando Cadastro",
+                "cor": "Aguardando Cadastro",
+                "avs": False,
+                "estoque_calculado": 0,
+                "lotes": [],
+                "fornecedor_cnpj": "" 
+            }
+            
+            operacoes_bulk.append(
+                UpdateOne(
+                    filtro,
+                    self._pipeline_importacao(dados_set, dados_setOnInsert),
+                    upsert=True
+                )
+            )
+        return operacoes_bulk
+
+    def gravar_importacao(self, operacoes_bulk: List[UpdateOne]):
+        """Etapa de escrita da importação: aplica os upserts e invalida o cache de facetas."""
+        resultado = self.collection.bulk_write(operacoes_bulk)
+        self.cache_facetas.remover(CHAVE_CACHE_FACETAS)
+        # A planilha pode mover produtos entre seções: todas as seções são invalidadas
+        invalidar_kpis_secoes(self.cache_kpis_secoes)
+        return resultado
     
     def importar_produtos_from_excel(self) -> dict:
         """Processa arquivos .xlsx de uma pasta específica para importar produtos em massa."""
@@ -244,85 +1237,11 @@ class ProdutoService:
                 continue
 
             try:
-                df = pd.read_excel(processing_file_path, engine='openpyxl')
-
-                colunas_esperadas = ['Material', 'Qtd. Estoque', 'Seção', 'Subseção', 'Estoque Valor', 'Loja']
-                if not all(col in df.columns for col in colunas_esperadas):
-                    raise ValueError(f"Arquivo fora do formato. Colunas esperadas: {colunas_esperadas}")
-                
-                df = df.dropna(subset=['Material', 'Seção', 'Subseção'])
-                df = df[df['Material'].astype(str).str.strip() != '']
-                
-                df['codigo_lm_str'] = df['Material'].astype(str).str.slice(0, 8).str.strip()
-                df['nome_produto'] = df['Material'].astype(str).str.slice(8).str.strip().str.lstrip('-').str.strip()
-                df['codigo_lm'] = pd.to_numeric(df['codigo_lm_str'], errors='coerce')
-                df['estoque_reportado'] = pd.to_numeric(df['Qtd. Estoque'], errors='coerce').fillna(0).astype(int)
-                
-                def limpar_valor_monetario(valor) -> float:
-                    if pd.isna(valor):
-                        return 0.0
-                    valor_str = str(valor).strip()
-                    if ',' in valor_str:
-                        valor_str = valor_str.replace('.', '').replace(',', '.')
-                    res = pd.to_numeric(valor_str, errors='coerce')
-                    return round(float(res), 2) if not pd.isna(res) else 0.0
-                
-                df['estoque_valor_float'] = df['Estoque Valor'].apply(limpar_valor_monetario)
-                
-                df['preco_unit_calculado'] = 0.0
-                mask_valido = df['estoque_reportado'] > 0
-                df.loc[mask_valido, 'preco_unit_calculado'] = (
-                    df['estoque_valor_float'] / df['estoque_reportado']
-                ).round(2)
-                
-                secao_split = df['Seção'].astype(str).str.split(' - ', n=1, expand=True)
-                df['cod_secao'] = pd.to_numeric(secao_split[0], errors='coerce')
-                df['secao'] = secao_split[1].str.strip() if secao_split.shape[1] > 1 else None
-                
-                subsecao_split = df['Subseção'].astype(str).str.split(' - ', n=1, expand=True)
-                df['cod_subsecao'] = pd.to_numeric(subsecao_split[0], errors='coerce')
-                df['subsecao'] = subsecao_split[1].str.strip() if subsecao_split.shape[1] > 1 else None
-                
-                df = df.dropna(subset=['codigo_lm'])
-                df['codigo_lm'] = df['codigo_lm'].astype(int)
-                df = df.where(pd.notna(df), None)
-                
-                operacoes_bulk = []
-                for record in df.to_dict("records"):
-                    filtro = {"codigo_lm": record['codigo_lm']}
-                    
-                    dados_set = {
-                        "estoque_reportado": record['estoque_reportado'],
-                        "nome_produto": record['nome_produto'],
-                        "cod_secao": record.get('cod_secao'),
-                        "secao": record.get('secao'),
-                        "cod_subsecao": record.get('cod_subsecao'),
-                        "subsecao": record.get('subsecao'),
-                        "preco_unit": record.get('preco_unit_calculado', 0.0),
-                    }
-                    
-                    dados_setOnInsert = {
-                        "codigo_lm": record['codigo_lm'],
-                        "marca": "Aguardando Cadastro",
-                        "ficha_tec": "Aguardando Cadastro",
-                        "link_prod": "Aguardando Cadastro",
-                        "cor": "Aguardando Cadastro",
-                        "avs": False,
-                        "estoque_calculado": 0,
-                        "lotes": [],
-                        "fornecedor_cnpj": ""
-                    }
-                    
-                    operacoes_bulk.append(
-                        UpdateOne(
-                            filtro,
-                            {"$set": dados_set, "$setOnInsert": dados_setOnInsert},
-                            upsert=True
-                        )
-                    )
+                df = self.ler_planilha(processing_file_path)
+                operacoes_bulk = self.transformar_planilha(df)
 
                 if operacoes_bulk:
-                    resultado = self.collection.bulk_write(operacoes_bulk)
+                    resultado = self.gravar_importacao(operacoes_bulk)
                     
                     shutil.move(str(processing_file_path), str(processed_folder / processing_file_path.name))
                     
@@ -350,97 +1269,14 @@ class ProdutoService:
     
     def importar_produtos_via_upload(self, file_content: bytes, filename: str) -> dict:
         """Processa um arquivo Excel recebido diretamente via upload (bytes)."""
+        pd = _carregar_pandas()
         try:
             # Lê o Excel diretamente da memória (bytes)
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
-            
-            # Validação de colunas
-            colunas_esperadas = ['Material', 'Qtd. Estoque', 'Seção', 'Subseção', 'Estoque Valor', 'Loja']
-            if not all(col in df.columns for col in colunas_esperadas):
-                raise ValueError(f"Arquivo fora do formato. Colunas esperadas: {colunas_esperadas}")
-            
-            # Limpeza de dados
-            df = df.dropna(subset=['Material', 'Seção', 'Subseção'])
-            df = df[df['Material'].astype(str).str.strip() != '']
-            
-            # Extração de código LM e nome do produto
-            df['codigo_lm_str'] = df['Material'].astype(str).str.slice(0, 8).str.strip()
-            df['nome_produto'] = df['Material'].astype(str).str.slice(8).str.strip().str.lstrip('-').str.strip()
-            df['codigo_lm'] = pd.to_numeric(df['codigo_lm_str'], errors='coerce')
-            df['estoque_reportado'] = pd.to_numeric(df['Qtd. Estoque'], errors='coerce').fillna(0).astype(int)
-            
-            # Função para limpar valores monetários
-            def limpar_valor_monetario(valor) -> float:
-                if pd.isna(valor):
-                    return 0.0
-                valor_str = str(valor).strip()
-                if ',' in valor_str:
-                    valor_str = valor_str.replace('.', '').replace(',', '.')
-                res = pd.to_numeric(valor_str, errors='coerce')
-                return round(float(res), 2) if not pd.isna(res) else 0.0
-            
-            df['estoque_valor_float'] = df['Estoque Valor'].apply(limpar_valor_monetario)
-            
-            # Cálculo do preço unitário
-            df['preco_unit_calculado'] = 0.0
-            mask_valido = df['estoque_reportado'] > 0
-            df.loc[mask_valido, 'preco_unit_calculado'] = (
-                df['estoque_valor_float'] / df['estoque_reportado']
-            ).round(2)
-            
-            # Processamento de seção e subseção
-            secao_split = df['Seção'].astype(str).str.split(' - ', n=1, expand=True)
-            df['cod_secao'] = pd.to_numeric(secao_split[0], errors='coerce')
-            df['secao'] = secao_split[1].str.strip() if secao_split.shape[1] > 1 else None
-            
-            subsecao_split = df['Subseção'].astype(str).str.split(' - ', n=1, expand=True)
-            df['cod_subsecao'] = pd.to_numeric(subsecao_split[0], errors='coerce')
-            df['subsecao'] = subsecao_split[1].str.strip() if subsecao_split.shape[1] > 1 else None
-            
-            # Limpeza final
-            df = df.dropna(subset=['codigo_lm'])
-            df['codigo_lm'] = df['codigo_lm'].astype(int)
-            df = df.where(pd.notna(df), None)
-            
-            # Preparação de operações bulk
-            operacoes_bulk = []
-            for record in df.to_dict("records"):
-                filtro = {"codigo_lm": record['codigo_lm']}
-                
-                # Dados que sempre serão atualizados
-                dados_set = {
-                    "estoque_reportado": record['estoque_reportado'],
-                    "nome_produto": record['nome_produto'],
-                    "cod_secao": record.get('cod_secao'),
-                    "secao": record.get('secao'),
-                    "cod_subsecao": record.get('cod_subsecao'),
-                    "subsecao": record.get('subsecao'),
-                    "preco_unit": record.get('preco_unit_calculado', 0.0),
-                }
-                
-                # Dados inseridos apenas se for um produto novo
-                dados_setOnInsert = {
-                    "codigo_lm": record['codigo_lm'],
-                    "marca": "Aguardando Cadastro",
-                    "ficha_tec": "Aguardando Cadastro",
-                    "link_prod": "Aguardando Cadastro",
-                    "cor": "Aguardando Cadastro",
-                    "avs": False,
-                    "estoque_calculado": 0,
-                    "lotes": [],
-                    "fornecedor_cnpj": "" 
-                }
-                
-                operacoes_bulk.append(
-                    UpdateOne(
-                        filtro,
-                        {"$set": dados_set, "$setOnInsert": dados_setOnInsert},
-                        upsert=True
-                    )
-                )
+            df = self.ler_planilha(io.BytesIO(file_content))
+            operacoes_bulk = self.transformar_planilha(df)
 
             if operacoes_bulk:
-                resultado = self.collection.bulk_write(operacoes_bulk)
+                resultado = self.gravar_importacao(operacoes_bulk)
                 return {
                     "mensagem": "Importação via upload concluída com sucesso.",
                     "detalhes": {
@@ -0,0 +1,65 @@
+import threading
+from collections import Counter
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+
+from app.database.client import get_database
+
+class BufferVisualizacoes:
+    """
+    Acumula incrementos de visualização da base de conhecimento em memória e os grava
+    periodicamente em um único `bulk_write` com `$inc` agregados por item.
+
+    A defasagem entre a leitura e as visualizações reais é limitada ao intervalo de flush.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendentes: Counter = Counter()
+
+    def registrar(self, id: str):
+        """Registra uma visualização (sem acessar o banco)."""
+        with self._lock:
+            self._pendentes[id] += 1
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return sum(self._pendentes.values())
+
+    def flush(self) -> int:
+        """
+        Grava os incrementos acumulados; em caso de erro, eles voltam para o buffer.
+
+        Se o `bulk_write` for aplicado em parte, apenas as operações listadas em
+        `writeErrors` voltam, para não contar duas vezes os incrementos já gravados.
+        """
+        with self._lock:
+            if not self._pendentes:
+                return 0
+            lote, self._pendentes = self._pendentes, Counter()
+
+        db = get_database()
+        try:
+            if db is None:
+                raise ConnectionError("Falha na conexão com o MongoDB.")
+
+            itens = [(id, quantidade) for id, quantidade in lote.items() if ObjectId.is_valid(id)]
+            operacoes = [
+                UpdateOne({"_id": ObjectId(id)}, {"$inc": {"visualizacoes": quantidade}})
+                for id, quantidade in itens
+            ]
+            if operacoes:
+                db['base_conhecimento'].bulk_write(operacoes, ordered=False)
+            return len(operacoes)
+        except BulkWriteError as e:
+            falhas = Counter({itens[erro["index"]][0]: itens[erro["index"]][1] for erro in e.details.get("writeErrors", [])})
+            with self._lock:
+                self._pendentes.update(falhas)
+            raise
+        except Exception:
+            with self._lock:
+                self._pendentes.update(lote)
+            raise
+
+buffer_visualizacoes = BufferVisualizacoes()
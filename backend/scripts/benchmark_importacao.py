@@ -0,0 +1,264 @@
+"""
+Benchmark de vazão da importação de planilhas de estoque.
+
+Gera planilhas sintéticas no formato exato da importação (`Material`, `Qtd. Estoque`,
+`Seção`, `Subseção`, `Estoque Valor`, `Loja`), executa as etapas do importador contra um
+MongoDB local descartável e mede separadamente leitura, transformação e escrita, além do
+pico de memória (RSS) de cada execução.
+
+Uso (a partir da pasta backend/, com um MongoDB local, ex.: `docker run -p 27017:27017 mongo`):
+    python scripts/benchmark_importacao.py --linhas 10000 100000 --tolerancia 20
+
+Cada tamanho roda em um processo separado, para que o pico de RSS não seja contaminado
+pelas execuções anteriores. Os resultados são acumulados em `--resultados` e comparados
+com a execução anterior do mesmo tamanho (ou com `--baseline`); encerra com código 1 se
+alguma métrica piorar além da tolerância ou violar os limites absolutos informados.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SECOES = {
+    1: ("MATERIAIS DE CONSTRUCAO", ["CIMENTOS E ARGAMASSAS", "TIJOLOS E BLOCOS", "AREIA E BRITA"]),
+    2: ("MADEIRAS", ["CHAPAS", "PORTAS", "RODAPES"]),
+    3: ("ELETRICA", ["FIOS E CABOS", "TOMADAS E INTERRUPTORES", "DISJUNTORES"]),
+    4: ("FERRAMENTAS", ["FERRAMENTAS MANUAIS", "FERRAMENTAS ELETRICAS", "ACESSORIOS"]),
+    5: ("TINTAS", ["TINTAS IMOBILIARIAS", "VERNIZES", "SOLVENTES"]),
+    6: ("HIDRAULICA", ["TUBOS E CONEXOES", "REGISTROS", "CAIXAS D'AGUA"]),
+    7: ("JARDIM", ["VASOS", "IRRIGACAO", "ADUBOS E FERTILIZANTES"]),
+    8: ("DECORACAO", ["CORTINAS", "TAPETES", "QUADROS"]),
+    9: ("ILUMINACAO", ["LAMPADAS", "LUMINARIAS", "FITAS LED"]),
+}
+
+PRODUTOS = ["ARGAMASSA", "CIMENTO", "REJUNTE", "TINTA ACRILICA", "MASSA CORRIDA", "SELADOR",
+            "DISJUNTOR", "CABO FLEXIVEL", "TUBO PVC", "JOELHO PVC", "LAMPADA LED", "ADUBO NPK"]
+VARIANTES = ["AC-I", "AC-III", "BRANCO", "CINZA", "FOSCO", "SEMIBRILHO", "10A", "32A", "25MM", "50MM", "9W", "1KG"]
+EMBALAGENS = ["20KG", "50KG", "18L", "3,6L", "900ML", "100M", "6M", "UN", "CX 10UN", "5KG"]
+
+def gerar_planilha(linhas: int, destino: Path, semente: int):
+    """Gera uma planilha sintética com códigos LM únicos e valores no formato exportado pelo ERP."""
+    from openpyxl import Workbook
+
+    aleatorio = random.Random(semente)
+    codigos = aleatorio.sample(range(10_000_000, 99_999_999), linhas)
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet("Estoque")
+    aba.append(["Material", "Qtd. Estoque", "Seção", "Subseção", "Estoque Valor", "Loja"])
+
+    for codigo_lm in codigos:
+        cod_secao = aleatorio.randint(1, len(SECOES))
+        secao, subsecoes = SECOES[cod_secao]
+        indice_subsecao = aleatorio.randrange(len(subsecoes))
+        quantidade = aleatorio.choice([0, 0, aleatorio.randint(1, 20), aleatorio.randint(1, 500)])
+        valor = round(quantidade * aleatorio.uniform(2, 900), 2)
+        # O ERP exporta parte dos valores como texto no formato brasileiro ("1.234,56")
+        if aleatorio.random() < 0.5:
+            valor = f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+        aba.append([
+            f"{codigo_lm} - {aleatorio.choice(PRODUTOS)} {aleatorio.choice(VARIANTES)} {aleatorio.choice(EMBALAGENS)}",
+            quantidade,
+            f"{cod_secao} - {secao}",
+            f"{cod_secao * 100 + indice_subsecao + 1} - {subsecoes[indice_subsecao]}",
+            valor,
+            "0042 - LOJA BENCHMARK"
+        ])
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    planilha.save(destino)
+
+def obter_planilha(linhas: int, diretorio: Path, semente: int) -> Path:
+    """Reaproveita planilhas já geradas (a geração de 1M de linhas leva minutos)."""
+    destino = diretorio / f"estoque_{linhas}_{semente}.xlsx"
+    if not destino.exists():
+        inicio = time.perf_counter()
+        gerar_planilha(linhas, destino, semente)
+        print(f"Planilha de {linhas} linhas gerada em {time.perf_counter() - inicio:.1f}s: {destino}", file=sys.stderr)
+    return destino
+
+def pico_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return round(psutil.Process().memory_info().peak_wset / 1024 / 1024, 1)
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(pico / divisor, 1)
+
+def executar_importacao(planilha: Path) -> dict:
+    """
+    Executa as etapas do importador (as mesmas usadas pelo upload) no banco descartável.
+
+    Roda no processo filho: DB_URI, DB_NAME e CACHE_COMPARTILHADO_DIR já foram
+    sobrescritos pelo processo pai antes da importação dos módulos da aplicação.
+    """
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.database.client import connect_to_mongo, close_mongo_connection, get_database
+
+    connect_to_mongo()
+    if get_database() is None:
+        raise ConnectionError("Falha na conexão com o MongoDB do benchmark.")
+
+    from app.services.produto_service import ProdutoService
+
+    db = get_database()
+    db["produtos"].drop()
+    service = ProdutoService()
+    service.criar_indices()
+
+    conteudo = planilha.read_bytes()
+    tempos = {}
+
+    inicio = time.perf_counter()
+    df = service.ler_planilha(io.BytesIO(conteudo))
+    tempos["leitura"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    operacoes = service.transformar_planilha(df)
+    tempos["transformacao"] = time.perf_counter() - inicio
+    del df
+
+    # Primeira carga (produtos novos) e reimportação diária (produtos existentes)
+    inicio = time.perf_counter()
+    resultado = service.gravar_importacao(operacoes)
+    tempos["escrita_insercao"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    service.gravar_importacao(operacoes)
+    tempos["escrita_atualizacao"] = time.perf_counter() - inicio
+
+    db.client.drop_database(db.name)
+    close_mongo_connection()
+
+    total = tempos["leitura"] + tempos["transformacao"] + tempos["escrita_insercao"]
+    return {
+        "linhas": len(operacoes),
+        "produtos_criados": resultado.upserted_count,
+        "tempos_segundos": {etapa: round(segundos, 3) for etapa, segundos in tempos.items()},
+        "linhas_por_segundo": round(len(operacoes) / total, 1) if total else None,
+        "pico_rss_mb": pico_rss_mb()
+    }
+
+def medir(linhas: int, planilha: Path, args) -> dict:
+    ambiente = {
+        **os.environ,
+        "DB_URI": args.db_uri,
+        "DB_NAME": args.banco,
+        "CACHE_COMPARTILHADO_DIR": os.path.join(tempfile.gettempdir(), "sgep-benchmark-cache")
+    }
+    processo = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--executar", str(planilha)],
+        cwd=BACKEND_DIR,
+        env=ambiente,
+        capture_output=True,
+        text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha no benchmark de {linhas} linhas:\n{processo.stderr}")
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+def comparar(atual: dict, referencia: dict, args) -> list:
+    """Retorna as violações de tolerância e dos limites absolutos."""
+    falhas = []
+    fator = 1 + args.tolerancia / 100
+
+    if referencia:
+        for etapa, segundos in atual["tempos_segundos"].items():
+            anterior = referencia["tempos_segundos"].get(etapa)
+            if anterior and segundos > anterior * fator:
+                falhas.append(f"{etapa}: {segundos}s (referência {anterior}s, tolerância {args.tolerancia}%)")
+        if atual["pico_rss_mb"] and referencia.get("pico_rss_mb") and atual["pico_rss_mb"] > referencia["pico_rss_mb"] * fator:
+            falhas.append(f"pico_rss_mb: {atual['pico_rss_mb']} (referência {referencia['pico_rss_mb']})")
+
+    if args.min_linhas_por_segundo and (atual["linhas_por_segundo"] or 0) < args.min_linhas_por_segundo:
+        falhas.append(f"linhas_por_segundo: {atual['linhas_por_segundo']} (mínimo {args.min_linhas_por_segundo})")
+    if args.max_rss_mb and atual["pico_rss_mb"] and atual["pico_rss_mb"] > args.max_rss_mb:
+        falhas.append(f"pico_rss_mb: {atual['pico_rss_mb']} (máximo {args.max_rss_mb})")
+    return falhas
+
+def carregar_execucoes(caminho: Path) -> list:
+    if not caminho.exists():
+        return []
+    with open(caminho, "r", encoding="utf-8") as arquivo:
+        return json.load(arquivo).get("execucoes", [])
+
+def referencia_para(execucoes: list, linhas: int) -> dict:
+    anteriores = [execucao for execucao in execucoes if execucao["linhas_solicitadas"] == linhas]
+    return anteriores[-1] if anteriores else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a vazão da importação de planilhas de estoque.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--db-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--banco", default="sgep_benchmark")
+    parser.add_argument("--dir-planilhas", type=Path, default=Path(tempfile.gettempdir()) / "sgep-benchmark")
+    parser.add_argument("--resultados", type=Path, default=BACKEND_DIR / "scripts" / "resultados" / "benchmark_importacao.json")
+    parser.add_argument("--baseline", type=Path, default=None, help="Arquivo de resultados usado como referência no lugar do histórico.")
+    parser.add_argument("--tolerancia", type=float, default=20.0, help="Piora máxima (%%) de cada etapa e do pico de RSS.")
+    parser.add_argument("--min-linhas-por-segundo", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    parser.add_argument("--nao-salvar", action="store_true")
+    parser.add_argument("--executar", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        print(json.dumps(executar_importacao(args.executar)))
+        return
+
+    for linhas in args.linhas:
+        if not 10_000 <= linhas <= 1_000_000:
+            parser.error("--linhas deve estar entre 10000 e 1000000.")
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.configs.config import settings
+    if args.banco == settings.DB_NAME:
+        parser.error("O banco do benchmark não pode ser o banco configurado da aplicação (é apagado ao final).")
+
+    execucoes = carregar_execucoes(args.resultados)
+    referencias = carregar_execucoes(args.baseline) if args.baseline else execucoes
+
+    novas = []
+    falhas = []
+    for linhas in args.linhas:
+        planilha = obter_planilha(linhas, args.dir_planilhas, args.semente)
+        resultado = {
+            "executado_em": datetime.now(timezone.utc).isoformat(),
+            "linhas_solicitadas": linhas,
+            "semente": args.semente,
+            **medir(linhas, planilha, args)
+        }
+        for falha in comparar(resultado, referencia_para(referencias, linhas), args):
+            falhas.append(f"[{linhas} linhas] {falha}")
+        novas.append(resultado)
+
+    print(json.dumps(novas, indent=2, ensure_ascii=False))
+
+    if not args.nao_salvar:
+        args.resultados.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.resultados, "w", encoding="utf-8") as arquivo:
+            json.dump({"execucoes": execucoes + novas}, arquivo, indent=2, ensure_ascii=False)
+
+    if falhas:
+        print("Regressões na importação:\n" + "\n".join(falhas), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
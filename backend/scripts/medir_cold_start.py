@@ -0,0 +1,63 @@
+"""
+Mede o cold start da API: do início do processo uvicorn até a primeira resposta servida.
+
+Uso (a partir da pasta backend/, com o MongoDB configurado no .env):
+    python scripts/medir_cold_start.py --limite-segundos 5
+
+Encerra com código 1 se o tempo ultrapassar o limite, para uso em pipelines de CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+def medir(porta: int, timeout: float) -> dict:
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{porta}/sistema/inicializacao"
+        while time.perf_counter() - inicio < timeout:
+            if processo.poll() is not None:
+                raise RuntimeError(f"O servidor encerrou durante a inicialização (código {processo.returncode}).")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resposta:
+                    perfil = json.loads(resposta.read())
+                return {
+                    "primeira_resposta_segundos": round(time.perf_counter() - inicio, 3),
+                    "perfil_worker": perfil
+                }
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        raise TimeoutError(f"Sem resposta em {timeout}s.")
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de cold start da API.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--limite-segundos", type=float, default=None)
+    args = parser.parse_args()
+
+    resultado = medir(args.porta, args.timeout)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    if args.limite_segundos is not None and resultado["primeira_resposta_segundos"] > args.limite_segundos:
+        print(f"Cold start acima do limite de {args.limite_segundos}s.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Change stream do dashboard: agrupamento das rajadas de alterações (debounce), distribuição
+para vários assinantes e reabertura do stream após um invalidate.
+
+Requer um replica set local (um único nó basta), informado em TEST_MONGO_RS_URI, por exemplo:
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0
+    mongosh --eval 'rs.initiate()'
+    TEST_MONGO_RS_URI="mongodb://localhost:27017/?replicaSet=rs0" python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+URI_REPLICA_SET = os.getenv("TEST_MONGO_RS_URI")
+
+pytestmark = pytest.mark.skipif(not URI_REPLICA_SET, reason="TEST_MONGO_RS_URI não configurada (replica set local).")
+
+pytest.importorskip("pymongo")
+
+from app.configs.config import settings
+from app.database import client as cliente_mongo
+from app.services.dashboard_stream_service import DashboardStreamService
+
+BANCO_TESTE = "sgep_teste_stream"
+DEBOUNCE_SEGUNDOS = 0.5
+
+class KpisContados:
+    """Substitui `KpisCompartilhados`: conta os recálculos e devolve o número do recálculo."""
+
+    def __init__(self):
+        self.chamadas = []
+        self.cache = SimpleNamespace(eh_lider=lambda: True)
+
+    def get_dashboard_kpis(self, gerado_apos=None):
+        self.chamadas.append(gerado_apos)
+        numero = len(self.chamadas)
+        return SimpleNamespace(model_dump_json=lambda: json.dumps({"recalculo": numero}))
+
+@pytest.fixture(scope="module")
+def banco():
+    settings.DB_URI = URI_REPLICA_SET
+    settings.DB_NAME = BANCO_TESTE
+    cliente_mongo.connect_to_mongo()
+    db = cliente_mongo.get_database()
+    if db is None:
+        pytest.skip("Replica set indisponível.")
+    db.drop_collection("produtos")
+
+    yield db
+
+    cliente_mongo.client.drop_database(BANCO_TESTE)
+    cliente_mongo.close_mongo_connection()
+
+async def _aguardar_recalculo(kpis: KpisContados, escrever, prazo_segundos: float = 15) -> None:
+    """Repete `escrever` até o watcher sinalizar um recálculo (o stream abre de forma assíncrona)."""
+    prazo = time.monotonic() + prazo_segundos
+    inicial = len(kpis.chamadas)
+    while len(kpis.chamadas) == inicial:
+        if time.monotonic() > prazo:
+            pytest.fail("O change stream não sinalizou a alteração.")
+        await asyncio.to_thread(escrever)
+        await asyncio.sleep(DEBOUNCE_SEGUNDOS * 3)
+
+def _executar(cenario):
+    async def com_servico():
+        servico = DashboardStreamService(debounce_segundos=DEBOUNCE_SEGUNDOS, fallback_segundos=60)
+        kpis = KpisContados()
+        await servico.iniciar(kpis)
+        try:
+            await cenario(servico, kpis)
+        finally:
+            await servico.parar()
+    asyncio.run(com_servico())
+
+def test_rajada_gera_um_recalculo_para_todos_os_assinantes(banco):
+    produtos = banco["produtos"]
+
+    async def cenario(servico, kpis):
+        filas = [await servico.assinar() for _ in range(3)]
+        for fila in filas:
+            await asyncio.wait_for(fila.get(), 5)
+
+        await _aguardar_recalculo(kpis, lambda: produtos.insert_one({"codigo_lm": 0}))
+        for fila in filas:
+            await asyncio.wait_for(fila.get(), 5)
+        antes = len(kpis.chamadas)
+
+        await asyncio.to_thread(produtos.insert_many, [{"codigo_lm": codigo} for codigo in range(1, 21)])
+        await asyncio.sleep(DEBOUNCE_SEGUNDOS * 4)
+
+        assert len(kpis.chamadas) == antes + 1
+        assert kpis.chamadas[-1] is not None
+        mensagens = [json.loads(await asyncio.wait_for(fila.get(), 5)) for fila in filas]
+        assert mensagens == [{"recalculo": antes + 1}] * len(filas)
+
+    _executar(cenario)
+
+def test_stream_reaberto_apos_invalidate(banco):
+    produtos = banco["produtos"]
+
+    async def cenario(servico, kpis):
+        await _aguardar_recalculo(kpis, lambda: produtos.insert_one({"codigo_lm": 100}))
+
+        await asyncio.to_thread(banco.drop_collection, "produtos")
+        await asyncio.sleep(DEBOUNCE_SEGUNDOS * 3)
+
+        await _aguardar_recalculo(kpis, lambda: produtos.insert_one({"codigo_lm": 101}))
+        assert servico._watcher.is_alive()
+
+    _executar(cenario)
@@ -0,0 +1,111 @@
+"""
+Roteamento das leituras por read preference (perfis "dashboard", "historico" e "relatorios").
+
+Requer um replica set local com ao menos um secundário, informado em TEST_MONGO_RS_URI, por exemplo:
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0-1
+    mongosh --eval 'rs.initiate({_id: "rs0", members: [{_id: 0, host: "localhost:27017"}, {_id: 1, host: "localhost:27018"}]})'
+    TEST_MONGO_RS_URI="mongodb://localhost:27017/?replicaSet=rs0" python -m pytest tests
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+URI_REPLICA_SET = os.getenv("TEST_MONGO_RS_URI")
+
+pytestmark = pytest.mark.skipif(not URI_REPLICA_SET, reason="TEST_MONGO_RS_URI não configurada (replica set local).")
+
+pytest.importorskip("pymongo")
+
+from pymongo import WriteConcern
+from app.configs.config import settings
+from app.database import client as cliente_mongo
+from app.database.metricas_consultas import metricas_consultas
+
+BANCO_TESTE = "sgep_teste_roteamento"
+
+@pytest.fixture(scope="module")
+def banco():
+    settings.DB_URI = URI_REPLICA_SET
+    settings.DB_NAME = BANCO_TESTE
+    for perfil in cliente_mongo.PERFIS_LEITURA:
+        cliente_mongo.PERFIS_LEITURA[perfil] = "secondaryPreferred"
+    cliente_mongo.connect_to_mongo()
+    db = cliente_mongo.get_database()
+    if db is None:
+        pytest.skip("Replica set indisponível.")
+
+    prazo = time.monotonic() + 30
+    while not cliente_mongo.client.secondaries:
+        if time.monotonic() > prazo:
+            pytest.skip("O replica set não tem secundários disponíveis.")
+        time.sleep(0.5)
+
+    agora = datetime.now()
+    db.get_collection("produtos", write_concern=WriteConcern(w="majority")).insert_one({
+        "codigo_lm": 1,
+        "nome_produto": "Produto Teste",
+        "preco_unit": 10.0,
+        "estoque_calculado": 5,
+        "estoque_reportado": 8,
+        "discrepancia_estoque": 3,
+        "discrepancia_absoluta": 3,
+        "cod_secao": 1,
+        "secao": "Seção Teste",
+        "fornecedor_cnpj": "",
+        "lotes": [{
+            "codigo_lote": "L1",
+            "data_fabricacao": agora - timedelta(days=10),
+            "data_validade": agora + timedelta(days=20),
+            "prazo_validade_meses": 1,
+            "quantidade_lote": 5,
+            "ativo": True,
+            "valor_lote": 50.0
+        }]
+    })
+
+    yield db
+
+    cliente_mongo.client.drop_database(BANCO_TESTE)
+    cliente_mongo.close_mongo_connection()
+
+def _tipos_por_origem(servico: str) -> set:
+    return set(metricas_consultas.resumo()["por_origem"].get(servico, {}))
+
+def test_leituras_do_dashboard_vao_ao_secundario(banco):
+    from app.services.dashboard_service import DashboardService
+
+    service = DashboardService()
+    metricas_consultas.limpar()
+    service.get_dashboard_kpis()
+
+    assert _tipos_por_origem("DashboardService") == {"RSSecondary"}
+
+def test_leituras_do_historico_vao_ao_secundario(banco):
+    from app.services.historico_service import HistoricoService
+
+    service = HistoricoService()
+    metricas_consultas.limpar()
+    service.get_historico(granularidade="dia", tipo="loja")
+
+    assert _tipos_por_origem("HistoricoService") == {"RSSecondary"}
+
+def test_relatorios_vao_ao_secundario(banco):
+    from app.services.produto_service import ProdutoService
+
+    service = ProdutoService()
+    metricas_consultas.limpar()
+    service.get_reconciliacao()
+
+    assert _tipos_por_origem("ProdutoService") == {"RSSecondary"}
+
+def test_leituras_do_crud_vao_ao_primario(banco):
+    from app.services.produto_service import ProdutoService
+
+    service = ProdutoService()
+    metricas_consultas.limpar()
+    assert service.get_by_codigo_lm(1) is not None
+
+    assert _tipos_por_origem("ProdutoService") == {"RSPrimary"}
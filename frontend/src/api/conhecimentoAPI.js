@@ -82,4 +82,16 @@ export const deletarConhecimento = async (id) => {
         console.error('Erro ao deletar conhecimento:', error);
         throw error;
     }
-};
\ No newline at end of file
+};
+
+export const conectarChat = (sessaoId, onResposta) => {
+    const wsUrl = API_URL.replace(/^http/, 'ws');
+    const params = sessaoId ? `?sessao_id=${encodeURIComponent(sessaoId)}` : '';
+    const socket = new WebSocket(`${wsUrl}/bot/ws${params}`);
+    socket.onmessage = (event) => onResposta(JSON.parse(event.data));
+    socket.onerror = (error) => console.error('Erro no chat:', error);
+    return {
+        enviar: (mensagem) => socket.send(JSON.stringify({ mensagem })),
+        fechar: () => socket.close()
+    };
+};
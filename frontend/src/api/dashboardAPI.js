@@ -20,4 +20,45 @@ export const getProductStatus = async (nomeProduto) => {
         console.error('Erro ao buscar status do produto:', error);
         throw error;
     }
-};
\ No newline at end of file
+};
+
+export const getProductsStatus = async (codigosLm) => {
+    try {
+        const response = await axios.post(`${API_URL}/dashboard/status-produtos`, { codigos_lm: codigosLm });
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao buscar status dos produtos:', error);
+        throw error;
+    }
+};
+
+export const getKpisSecoes = async () => {
+    try {
+        const response = await axios.get(`${API_URL}/dashboard/secoes`);
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao buscar KPIs por seção:', error);
+        throw error;
+    }
+};
+
+export const getKpisSecao = async (codSecao) => {
+    try {
+        const response = await axios.get(`${API_URL}/dashboard/secoes/${codSecao}`);
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao buscar KPIs da seção:', error);
+        throw error;
+    }
+};
+
+export const subscribeDashboard = (onData) => {
+    const source = new EventSource(`${API_URL}/dashboard/stream`);
+    source.addEventListener('kpis', (event) => {
+        onData(JSON.parse(event.data));
+    });
+    source.onerror = (error) => {
+        console.error('Erro no stream do dashboard:', error);
+    };
+    return () => source.close();
+};
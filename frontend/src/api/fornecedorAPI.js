@@ -50,4 +50,23 @@ export const deleteFornecedor = async (cnpj) => {
     console.error('Erro ao deletar fornecedor:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+export const upsertFornecedoresEmMassa = async (fornecedores) => {
+  try {
+    const response = await axios.post(`${API_URL}/fornecedores/bulk`, { fornecedores });
+    return response.data;
+  } catch (error) {
+    console.error('Erro ao cadastrar fornecedores em massa:', error);
+    throw error;
+  }
+};
+
+export const getFornecedoresByCNPJs = async (cnpjs) => {
+  try {
+    const response = await axios.post(`${API_URL}/fornecedores/lookup`, { cnpjs });
+    return response.data;
+  } catch (error) {
+    console.error('Erro ao buscar fornecedores:', error);
+    throw error;
+  }
+};
@@ -38,4 +38,19 @@ export const deleteLote = async (codigo_lm, codigo_lote) => {
         console.error("Erro em deleteLote:", error.response?.data || error.message);
         return false;
     }
-};
\ No newline at end of file
+};
+export const listarLotes = async (codigo_lm, { ativo, venceAte, cursor, limit = 50 } = {}) => {
+    try {
+        const params = new URLSearchParams();
+        params.append('limit', limit);
+        if (ativo !== undefined && ativo !== null) params.append('ativo', ativo);
+        if (venceAte) params.append('vence_ate', venceAte);
+        if (cursor) params.append('cursor', cursor);
+
+        const response = await axios.get(`${API_URL}/produtos/${codigo_lm}/lotes?${params.toString()}`);
+        return response.data;
+    } catch (error) {
+        console.error("Erro em listarLotes:", error.response?.data || error.message);
+        throw new Error(error.response?.data?.detail || 'Falha ao listar os lotes');
+    }
+};
@@ -30,7 +30,7 @@ export const updateProduto = async (codigo_lm, produtoData) => {
     }
 };
 
-export const getProdutos = async (skip = 0, limit = 50, termo = '') => {
+export const getProdutos = async (skip = 0, limit = 50, termo = '', filtros = {}, facets = false) => {
     try {
         const params = new URLSearchParams();
         params.append('skip', skip);
@@ -38,6 +38,17 @@ export const getProdutos = async (skip = 0, limit = 50, termo = '') => {
         if (termo) {
             params.append('termo', termo);
         }
+        // filtros: { secao: [...], subsecao: [...], marca: [...], fornecedor: [...], avs: true/false }
+        Object.entries(filtros).forEach(([campo, valor]) => {
+            if (Array.isArray(valor)) {
+                valor.forEach((v) => params.append(campo, v));
+            } else if (valor !== undefined && valor !== null && valor !== '') {
+                params.append(campo, valor);
+            }
+        });
+        if (facets) {
+            params.append('facets', 'true');
+        }
         
         const response = await axios.get(`${API_URL}/produtos/?${params.toString()}`);
         return response.data;
@@ -47,6 +58,36 @@ export const getProdutos = async (skip = 0, limit = 50, termo = '') => {
     }
 };
 
+export const getProdutoById = async (codigo_lm) => {
+    try {
+        const response = await axios.get(`${API_URL}/produtos/${codigo_lm}`);
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao buscar produto:', error);
+        throw error;
+    }
+};
+
+export const getProdutoByEan = async (ean) => {
+    try {
+        const response = await axios.get(`${API_URL}/produtos/ean/${ean}`);
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao buscar produto por EAN:', error);
+        throw error;
+    }
+};
+
+export const lookupEans = async (eans) => {
+    try {
+        const response = await axios.post(`${API_URL}/produtos/ean/lookup`, { eans });
+        return response.data;
+    } catch (error) {
+        console.error('Erro ao consultar EANs:', error);
+        throw error;
+    }
+};
+
 export const deleteProduto = async (codigo_lm) => {
     try {
         await axios.delete(`${API_URL}/produtos/${codigo_lm}`);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getDashboardData, getProductStatus } from '../api/dashboardAPI';
+import { getDashboardData, getProductStatus, subscribeDashboard } from '../api/dashboardAPI';
 import '../styles/Dashboard.css';
 import { PieChart, Pie, Cell, ResponsiveContainer, Legend, Tooltip } from 'recharts';
 import { TbRefresh, TbAlertTriangle } from 'react-icons/tb';
@@ -27,6 +27,10 @@ const Dashboard = () => {
         fetchData();
     }, []);
 
+    useEffect(() => {
+        return subscribeDashboard((result) => setData(result));
+    }, []);
+
     const handleProductClick = async (nomeProduto) => {
         if (selectedProduct === nomeProduto) return;
         
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { FaEdit, FaTrashAlt, FaListUl, FaInfoCircle, FaCheckCircle, FaExclamationTriangle, FaTimesCircle, FaClock, FaChevronLeft, FaChevronRight } from 'react-icons/fa';
 import '../styles/Estoque.css';
-import { getProdutos, deleteProduto } from '../api/produtoAPI';
+import { getProdutos, getProdutoById, deleteProduto } from '../api/produtoAPI';
 import LotesModal from '../components/LotesModal';
 import ConfirmDeleteModal from '../components/ConfirmDeleteModal';
 import CadastroProduto from '../components/CadastrarProduto';
@@ -76,18 +76,18 @@ const Estoque = () => {
     }
   };
 
-  const getValidadeMaisProxima = (lotes) => {
-    if (!lotes || lotes.length === 0) return null;
-
-    const lotesAtivos = lotes.filter(l => l.ativo === true);
-    if (lotesAtivos.length === 0) return null;
-
-    const dataMaisProxima = lotesAtivos.reduce((dataAntiga, loteAtual) => {
-      const dataLote = new Date(loteAtual.data_validade);
-      return dataLote < dataAntiga ? dataLote : dataAntiga;
-    }, new Date(lotesAtivos[0].data_validade));
+  // A listagem é enxuta (sem lotes): a validade mais próxima já vem calculada pela API
+  const getValidadeMaisProxima = (produto) => {
+    return produto.proxima_validade ? new Date(produto.proxima_validade) : null;
+  };
 
-    return dataMaisProxima;
+  const carregarProdutoCompleto = async (produto) => {
+    try {
+      return await getProdutoById(produto.codigo_lm);
+    } catch (error) {
+      console.error("Erro ao carregar produto:", error);
+      return null;
+    }
   };
 
   const formatarData = (data) => {
@@ -160,8 +160,10 @@ const Estoque = () => {
     setSearchTerm(e.target.value);
   };
 
-  const handleOpenLotesModal = (produto) => {
-    setProdutoSelecionado(produto);
+  const handleOpenLotesModal = async (produto) => {
+    const produtoCompleto = await carregarProdutoCompleto(produto);
+    if (!produtoCompleto) return;
+    setProdutoSelecionado(produtoCompleto);
     setIsModalOpen(true);
   };
 
@@ -174,11 +176,7 @@ const Estoque = () => {
     await carregarDados(paginaAtual, searchTerm);
     
     if (produtoSelecionado) {
-      const skip = (paginaAtual - 1) * itensPorPagina;
-      const dados = await getProdutos(skip, itensPorPagina, searchTerm);
-      const produtoAtualizado = dados.produtos.find(
-        p => p.codigo_lm === produtoSelecionado.codigo_lm
-      );
+      const produtoAtualizado = await carregarProdutoCompleto(produtoSelecionado);
       if (produtoAtualizado) {
         setProdutoSelecionado(produtoAtualizado);
       }
@@ -214,8 +212,10 @@ const Estoque = () => {
     setIsCadastroOpen(true);
   };
 
-  const handleOpenEdicao = (produto) => {
-    setProdutoParaEditar(produto);
+  const handleOpenEdicao = async (produto) => {
+    const produtoCompleto = await carregarProdutoCompleto(produto);
+    if (!produtoCompleto) return;
+    setProdutoParaEditar(produtoCompleto);
     setIsCadastroOpen(true);
   };
 
@@ -229,8 +229,10 @@ const Estoque = () => {
     setIsCadastroOpen(false);
   };
 
-  const handleOpenDetalheModal = (produto) => {
-    setProdutoDetalhe(produto);
+  const handleOpenDetalheModal = async (produto) => {
+    const produtoCompleto = await carregarProdutoCompleto(produto);
+    if (!produtoCompleto) return;
+    setProdutoDetalhe(produtoCompleto);
     setIsDetalheModalOpen(true);
   };
 
@@ -314,7 +316,7 @@ const Estoque = () => {
               </tr>
             ) : (
               produtosFiltrados.map((produto) => {
-                const validadeProxima = getValidadeMaisProxima(produto.lotes);
+                const validadeProxima = getValidadeMaisProxima(produto);
                 const statusInfo = getStatusEtiqueta(validadeProxima);
 
                 return (